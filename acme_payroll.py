@@ -1,12 +1,73 @@
-from datetime import time, datetime
+import argparse
+import csv
+import glob
+import json
+import locale
+import mmap
+import os
 import sys
-from io import StringIO
-from typing import TextIO
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import time, datetime
+from io import BytesIO, StringIO, TextIOWrapper
+from itertools import chain, islice
+from typing import TextIO, Iterable, Iterator, Optional
 
+from memory_report import MemoryReport
+from metrics import Metrics, NO_METRICS
 from payroll import EmployeeSchedule, WeekdayWorkHours, DayRange, WorkHoursWage, PayRate, Payroll
+from schedule_cache import SourceKey, cache_filename, read_schedules_cache, iter_cached_schedules, \
+    write_schedules_cache
 
 WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
 TIME_FORMAT = '%H:%M'
+MIN_LINES = 5
+CHUNK_SIZE = 4 * 1024 * 1024
+OUTPUT_BATCH_SIZE = 4096
+# file extension of each output format, for batch runs writing one payroll per file
+OUTPUT_EXTENSIONS = {'text': 'txt', 'csv': 'csv', 'jsonl': 'jsonl'}
+
+
+# zero padded times and weekdays recognized by the fast path, any other spelling goes through strptime
+HH_MM_TIMES = {f'{hour:02d}:{minute:02d}': time(hour=hour, minute=minute) for hour in range(24) for minute in range(60)}
+WEEKDAY_NUMBERS = {weekday_string: weekday for weekday, weekday_string in enumerate(WEEKDAYS)}
+# same lookups for the bytes reader
+HH_MM_TIMES_BYTES = {time_string.encode(): time_value for time_string, time_value in HH_MM_TIMES.items()}
+WEEKDAY_NUMBERS_BYTES = {weekday_string.encode(): weekday for weekday_string, weekday in WEEKDAY_NUMBERS.items()}
+# encoding open() uses in text mode
+TEXT_ENCODING = locale.getpreferredencoding(False)
+
+
+def parse_work_period(work_period_string: str) -> WeekdayWorkHours:
+    """
+    Parses a work period into a WeekdayWorkHours, using strptime to read times
+
+    :param work_period_string: work period as DDHH:MM-HH:MM
+    :return: WeekdayWorkHours
+    """
+    try:
+        # split schedule into day and time range
+        weekday_string = work_period_string[:2]
+        time_range_string = work_period_string[2:].strip()
+    except IndexError:
+        raise ValueError(f'Invalid schedule format: {work_period_string}')
+
+    try:
+        # split time range to start and end
+        time_start_string, time_end_string = time_range_string.split('-')
+    except ValueError:
+        raise ValueError(f'Invalid time range: {time_range_string}')
+
+    time_start = datetime.strptime(time_start_string, TIME_FORMAT).time()
+    time_end = datetime.strptime(time_end_string, TIME_FORMAT).time()
+
+    try:
+        weekday = WEEKDAYS.index(weekday_string)
+    except ValueError:
+        raise ValueError(f'Invalid day input: {weekday_string}')
+
+    return WeekdayWorkHours(weekday, time_start, time_end)
 
 
 def parse_employee_schedule(data_line: str) -> EmployeeSchedule:
@@ -26,33 +87,57 @@ def parse_employee_schedule(data_line: str) -> EmployeeSchedule:
 
     for work_period_string in work_hours_string:
         try:
-            try:
-                # split schedule into day and time range
-                weekday_string = work_period_string[:2]
-                time_range_string = work_period_string[2:].strip()
-            except IndexError:
-                raise ValueError(f'Invalid schedule format: {work_period_string}')
+            # fast path for well-formed DDHH:MM-HH:MM periods, optionally followed by whitespace
+            weekday = WEEKDAY_NUMBERS.get(work_period_string[:2])
+            time_start = HH_MM_TIMES.get(work_period_string[2:7])
+            time_end = HH_MM_TIMES.get(work_period_string[8:13])
+
+            if weekday is not None and time_start is not None and time_end is not None \
+                    and work_period_string[7] == '-' and work_period_string[13:].strip() == '':
+                work_hours.append(WeekdayWorkHours(weekday, time_start, time_end))
+            else:
+                # anything else gets parsed and reported the strptime way
+                work_hours.append(parse_work_period(work_period_string))
 
-            try:
-                # split time range to start and end
-                time_start_string, time_end_string = time_range_string.split('-')
-            except ValueError:
-                raise ValueError(f'Invalid time range: {time_range_string}')
+        except ValueError as ve:
+            raise ValueError(f"Error when trying to parse {name}'s schedule - {ve}")
 
-            time_start = datetime.strptime(time_start_string, TIME_FORMAT).time()
-            time_end = datetime.strptime(time_end_string, TIME_FORMAT).time()
+    return EmployeeSchedule(name, work_hours)
 
-            try:
-                weekday = WEEKDAYS.index(weekday_string)
-            except ValueError:
-                raise ValueError(f'Invalid day input: {weekday_string}')
 
-            work_hours.append(WeekdayWorkHours(weekday, time_start, time_end))
+def iter_employees_schedules_from_txt(file: Iterable[str], min_lines: int,
+                                      rejects: Optional['RejectLog'] = None) -> Iterator[EmployeeSchedule]:
+    """
+    Lazily parses each line into an EmployeeSchedule,
+    only the first min_lines lines are held in memory to check there's enough data
 
-        except ValueError as ve:
-            raise ValueError(f"Error when trying to parse {name}'s schedule - {ve}")
+    :param file: file to load, or any iterable of lines
+    :param min_lines: minimum amount of lines expected
+    :param rejects: lenient mode, malformed lines and duplicated employees are recorded here and skipped
+    :return: an iterator of EmployeeSchedules
+    """
+    file = iter(file)
+    first_lines = list(islice(file, min_lines))
 
-    return EmployeeSchedule(name, work_hours)
+    if len(first_lines) < min_lines:
+        raise ValueError(f'Insufficient data, supply at least {min_lines} sets of data - supplied {len(first_lines)}')
+
+    if rejects is None:
+        for data_line in chain(first_lines, file):
+            yield parse_employee_schedule(data_line)
+        return
+
+    names = set()
+    for line_number, data_line in enumerate(chain(first_lines, file), start=1):
+        try:
+            schedule = parse_employee_schedule(data_line)
+            if schedule.name in names:
+                raise ValueError('found duplicated employee in payroll')
+        except ValueError as ve:
+            rejects.reject(line_number, data_line.rstrip('\r\n').encode(TEXT_ENCODING), ve)
+        else:
+            names.add(schedule.name)
+            yield schedule
 
 
 def parse_employees_schedules_from_txt(file: TextIO, min_lines: int) -> list[EmployeeSchedule]:
@@ -63,14 +148,273 @@ def parse_employees_schedules_from_txt(file: TextIO, min_lines: int) -> list[Emp
     :param min_lines: minimum amount of lines expected
     :return: a list of EmployeeSchedules
     """
-    data_lines = file.readlines()
+    return list(iter_employees_schedules_from_txt(file, min_lines))
+
+
+def parse_employee_schedule_bytes(data: bytes, line_start: int, line_end: int) -> EmployeeSchedule:
+    """
+    Parses an employee schedule data line straight from a bytes buffer, only the name gets decoded,
+    lines with any period outside the zero padded format are decoded and go through parse_employee_schedule.
+    Periods are tokenized with split and slices, which run in C, tokenizing by offsets takes an index and a shift per
+    byte in bytecode and was measured slower. Either way most of the time goes into building the shifts,
+    so this reads about as fast as the txt reader, it saves decoding each line rather than time
+
+    :param data: bytes buffer, like bytes or mmap
+    :param line_start: line start offset
+    :param line_end: line end offset, exclusive, without the line break
+    :return: EmployeeSchedule
+    """
+    name_end = data.find(b'=', line_start, line_end)
+
+    if name_end != -1:
+        name = data[line_start:name_end].decode(TEXT_ENCODING)
+        work_hours: list[WeekdayWorkHours] = []
+
+        for work_period in data[name_end + 1:line_end].split(b','):
+            weekday = WEEKDAY_NUMBERS_BYTES.get(work_period[:2])
+            time_start = HH_MM_TIMES_BYTES.get(work_period[2:7])
+            time_end = HH_MM_TIMES_BYTES.get(work_period[8:])
+
+            # exact DDHH:MM-HH:MM periods only, the end time lookup already checks the length
+            if weekday is None or time_start is None or time_end is None or work_period[7] != 45:
+                break
+
+            try:
+                work_hours.append(WeekdayWorkHours(weekday, time_start, time_end))
+            except ValueError as ve:
+                raise ValueError(f"Error when trying to parse {name}'s schedule - {ve}")
+        else:
+            return EmployeeSchedule(name, work_hours)
+
+    # anything else gets parsed and reported the str way
+    return parse_employee_schedule(data[line_start:line_end].decode(TEXT_ENCODING))
+
+
+class RejectLog:
+    """Malformed data lines of a lenient run, written in batches to a reject file as json lines"""
+
+    def __init__(self, output: Optional[TextIO] = None, batch_size: int = OUTPUT_BATCH_SIZE):
+        """
+        Creates an empty reject log
+
+        :param output: reject file, rejected lines are only counted if None
+        :param batch_size: rejected lines per write
+        """
+        self.output = output
+        self.batch_size = batch_size
+        self.rejected = 0
+        self._batch: list[str] = []
+
+    def reject(self, line_number: int, data_line: bytes, error: Exception):
+        """
+        Records a rejected data line
+
+        :param line_number: line number, starting at 1
+        :param data_line: data line, without the line break
+        :param error: reason the line was rejected
+        """
+        self.rejected += 1
+        if self.output is None:
+            return
+
+        self._batch.append(json.dumps({
+            'line': line_number, 'error': str(error), 'data': data_line.decode(TEXT_ENCODING, errors='replace')
+        }) + '\n')
+        if len(self._batch) == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes every rejected line recorded so far"""
+        if self._batch:
+            self.output.write(''.join(self._batch))
+            self._batch.clear()
+
+
+def count_lines_from_bytes(data: bytes, max_lines: int) -> int:
+    """
+    Counts the lines of a bytes buffer, up to max_lines
+
+    :param data: bytes buffer, like bytes or mmap
+    :param max_lines: stop counting after this many lines
+    :return: amount of lines
+    """
+    data_size = len(data)
+    lines = 0
+    line_start = 0
 
-    if len(data_lines) < min_lines:
-        raise ValueError(f'Insufficient data, supply at least {min_lines} sets of data - supplied {len(data_lines)}')
+    while lines < max_lines and line_start < data_size:
+        line_end = data.find(b'\n', line_start)
+        line_start = data_size if line_end == -1 else line_end + 1
+        lines += 1
 
-    employee_schedules = [parse_employee_schedule(data_line) for data_line in data_lines]
+    return lines
 
-    return employee_schedules
+
+def iter_employees_schedules_from_bytes(data: bytes, min_lines: int,
+                                        rejects: Optional[RejectLog] = None) -> Iterator[EmployeeSchedule]:
+    """
+    Lazily parses each line of a bytes buffer into an EmployeeSchedule,
+    carriage returns ending a line are dropped
+
+    :param data: bytes buffer, like bytes or mmap
+    :param min_lines: minimum amount of lines expected
+    :param rejects: lenient mode, malformed lines and duplicated employees are recorded here and skipped
+    :return: an iterator of EmployeeSchedules
+    """
+    lines = count_lines_from_bytes(data, max_lines=min_lines)
+    if lines < min_lines:
+        raise ValueError(f'Insufficient data, supply at least {min_lines} sets of data - supplied {lines}')
+
+    data_size = len(data)
+    line_start = 0
+    line_number = 0
+    names = set()
+    while line_start < data_size:
+        line_end = data.find(b'\n', line_start)
+        if line_end == -1:
+            line_end = data_size
+        next_line_start = line_end + 1
+        line_number += 1
+
+        if line_end > line_start and data[line_end - 1] == 13:
+            # drop the carriage return of windows line breaks
+            line_end -= 1
+
+        if rejects is None:
+            yield parse_employee_schedule_bytes(data, line_start, line_end)
+        else:
+            try:
+                schedule = parse_employee_schedule_bytes(data, line_start, line_end)
+                if schedule.name in names:
+                    raise ValueError('found duplicated employee in payroll')
+            except ValueError as ve:
+                rejects.reject(line_number, data[line_start:line_end], ve)
+            else:
+                names.add(schedule.name)
+                yield schedule
+
+        line_start = next_line_start
+
+
+def iter_employees_schedules_from_mmap(filename: str, min_lines: int,
+                                       rejects: Optional[RejectLog] = None) -> Iterator[EmployeeSchedule]:
+    """
+    Lazily parses each line of a memory mapped file into an EmployeeSchedule
+
+    :param filename: file to load
+    :param min_lines: minimum amount of lines expected
+    :param rejects: lenient mode, malformed lines and duplicated employees are recorded here and skipped
+    :return: an iterator of EmployeeSchedules
+    """
+    with open(filename, 'rb') as data_file:
+        if os.fstat(data_file.fileno()).st_size == 0:
+            # empty files can't be mapped
+            yield from iter_employees_schedules_from_bytes(b'', min_lines, rejects)
+            return
+
+        with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from iter_employees_schedules_from_bytes(data, min_lines, rejects)
+
+
+def iter_employees_schedules_from_file(filename: str, min_lines: int, rejects: Optional[RejectLog] = None,
+                                      bytes_reader: bool = False) -> Iterator[EmployeeSchedule]:
+    """
+    Lazily parses each line of a schedules file, streamed in text mode unless the bytes reader is picked
+
+    :param filename: file to load
+    :param min_lines: minimum amount of lines expected
+    :param rejects: lenient mode, malformed lines and duplicated employees are recorded here and skipped
+    :param bytes_reader: parse the memory mapped file with the bytes reader instead
+    :return: an iterator of EmployeeSchedules
+    """
+    if bytes_reader:
+        yield from iter_employees_schedules_from_mmap(filename, min_lines, rejects)
+        return
+
+    with open(filename, 'r') as data_file:
+        yield from iter_employees_schedules_from_txt(data_file, min_lines, rejects)
+
+
+def iter_employees_schedules_cached(filename: str, min_lines: int, cache_dir: str, verify_hash: bool = False,
+                                    rejects: Optional[RejectLog] = None,
+                                    bytes_reader: bool = False) -> Iterator[EmployeeSchedule]:
+    """
+    Loads employee schedules from the cache when it's up to date,
+    otherwise parses the file and caches the schedules once every line parsed,
+    files with rejected lines aren't cached so later runs report them again
+
+    :param filename: schedules filename
+    :param min_lines: minimum amount of lines expected
+    :param cache_dir: cache directory
+    :param verify_hash: hash the file contents instead of trusting its modification time
+    :param rejects: lenient mode, malformed lines and duplicated employees are recorded here and skipped
+    :param bytes_reader: parse the file with the bytes reader instead of streaming it in text mode
+    :return: an iterator of EmployeeSchedules
+    """
+    key = SourceKey(filename, verify_hash)
+    cache_file = cache_filename(filename, cache_dir)
+
+    columns = read_schedules_cache(cache_file, key)
+    if columns is not None:
+        employees = len(columns[0])
+        if employees < min_lines:
+            raise ValueError(f'Insufficient data, supply at least {min_lines} sets of data - supplied {employees}')
+        yield from iter_cached_schedules(*columns)
+        return
+
+    names: list[str] = []
+    shift_counts = array('I')
+    weekdays = array('B')
+    minute_starts = array('H')
+    minute_ends = array('H')
+    cacheable = True
+    rejected = rejects.rejected if rejects is not None else 0
+
+    for schedule in iter_employees_schedules_from_file(filename, min_lines, rejects, bytes_reader):
+        if cacheable:
+            names.append(schedule.name)
+            shift_counts.append(len(schedule.work_hours))
+            for work_hours in schedule.work_hours:
+                # exact times with seconds can't be stored as minutes
+                cacheable = cacheable and work_hours.minute_aligned
+                weekdays.append(work_hours.weekday)
+                minute_starts.append(work_hours.minute_start)
+                minute_ends.append(work_hours.minute_end)
+
+        yield schedule
+
+    if cacheable and (rejects is None or rejects.rejected == rejected):
+        try:
+            write_schedules_cache(cache_file, key, names, shift_counts, weekdays, minute_starts, minute_ends)
+        except OSError:
+            # the cache only saves parsing next time, the payroll is already out
+            pass
+
+
+def iter_employees_payroll(schedules: Iterable[EmployeeSchedule], payroll: Payroll,
+                           check_duplicates: bool = True) -> Iterator[tuple[str, int]]:
+    """
+    Prices employee schedules as they come, without adding them to the payroll
+
+    :param schedules: employee schedules
+    :param payroll: payroll holding the pay rates
+    :param check_duplicates: raise on duplicated employees, off when the schedules are known to be unique
+    :return: an iterator of employee-salary tuples
+    """
+    if not check_duplicates:
+        calculate_salary = payroll.calculate_salary
+        for schedule in schedules:
+            yield schedule.name, calculate_salary(schedule)
+        return
+
+    names = set()
+
+    for schedule in schedules:
+        if schedule.name in names:
+            raise ValueError('found duplicated employee in payroll')
+        names.add(schedule.name)
+
+        yield schedule.name, payroll.calculate_salary(schedule)
 
 
 def set_up_payroll() -> Payroll:
@@ -101,38 +445,535 @@ def set_up_payroll() -> Payroll:
     return Payroll(rates=pay_rates)
 
 
-def print_payroll_from_file(filename: str):
+def format_text_rows(salaries: list[tuple[str, int]]) -> str:
+    """human readable lines, one per employee"""
+    return ''.join([f'The amount to pay {name} is: {salary} USD\n' for name, salary in salaries])
+
+
+def format_csv_rows(salaries: list[tuple[str, int]]) -> str:
+    """csv rows, quoting names as needed"""
+    rows = StringIO()
+    csv.writer(rows, lineterminator='\n').writerows(salaries)
+    return rows.getvalue()
+
+
+def format_jsonl_rows(salaries: list[tuple[str, int]]) -> str:
+    """json objects, one per line"""
+    return ''.join([json.dumps({'name': name, 'salary': salary}) + '\n' for name, salary in salaries])
+
+
+# output formats by name, as header and rows formatter
+OUTPUT_FORMATS = {
+    'text': ('', format_text_rows),
+    'csv': ('name,salary\n', format_csv_rows),
+    'jsonl': ('', format_jsonl_rows),
+}
+
+
+def write_payroll(salaries: Iterable[tuple[str, int]], output: TextIO, output_format: str = 'text',
+                  batch_size: int = OUTPUT_BATCH_SIZE) -> int:
+    """
+    Writes employee salaries in batches, each batch formatted into a single string and written at once,
+    salaries already received are written even if the iterable fails
+
+    :param salaries: employee-salary tuples
+    :param output: file to write to
+    :param output_format: one of OUTPUT_FORMATS
+    :param batch_size: salaries per write
+    :return: amount of salaries written
+    """
+    try:
+        header, format_rows = OUTPUT_FORMATS[output_format]
+    except KeyError:
+        raise ValueError(f'Invalid output format: {output_format}')
+
+    written = 0
+    batch = []
+    if header:
+        output.write(header)
+
+    try:
+        for salary in salaries:
+            batch.append(salary)
+            if len(batch) == batch_size:
+                output.write(format_rows(batch))
+                written += len(batch)
+                batch.clear()
+    finally:
+        if batch:
+            output.write(format_rows(batch))
+            written += len(batch)
+        output.flush()
+
+    return written
+
+
+def print_payroll_from_file(filename: str, metrics: Optional[Metrics] = None, output: Optional[TextIO] = None,
+                            output_format: str = 'text', cache_dir: Optional[str] = None, verify_hash: bool = False,
+                            rejects: Optional[RejectLog] = None, bytes_reader: bool = False):
     """
     Parses employee schedules file, prints payroll
 
     :param filename: schedules filename
+    :param metrics: optional metrics recording the rates, parse, price, write and reject stages
+    :param output: file to write the payroll to, defaults to stdout
+    :param output_format: one of OUTPUT_FORMATS
+    :param cache_dir: optional directory caching parsed schedules between runs
+    :param verify_hash: check cached schedules against the file contents hash instead of its modification time
+    :param rejects: lenient mode, malformed lines and duplicated employees are recorded here instead of aborting
+    :param bytes_reader: parse the memory mapped file with the bytes reader instead of streaming it in text mode
     """
-    # load schedules from file
-    try:
-        with open(filename, 'r') as data_file:
-            schedules = parse_employees_schedules_from_txt(data_file, min_lines=5)
-    except FileNotFoundError:
-        print(f'File {sys.argv[1]} does not exist')
+    if not os.path.isfile(filename):
+        print(f'File {filename} does not exist')
         return
 
-    payroll = set_up_payroll()
+    metrics = metrics or NO_METRICS
+    with metrics.stage('rates'):
+        payroll = set_up_payroll()
+
+    # stream schedules from the file or the cache, printing each salary as soon as it's priced
+    if cache_dir is None:
+        schedules = iter_employees_schedules_from_file(filename, MIN_LINES, rejects, bytes_reader)
+    else:
+        schedules = iter_employees_schedules_cached(filename, MIN_LINES, cache_dir, verify_hash, rejects, bytes_reader)
+    schedules = metrics.iter('parse', schedules)
+    # the lenient parser already skips duplicated employees
+    salaries = metrics.iter('price', iter_employees_payroll(schedules, payroll, check_duplicates=rejects is None))
+    with metrics.stage('write'):
+        written = write_payroll(salaries, output or sys.stdout, output_format)
+    metrics.count('write', written)
+
+    if rejects is not None:
+        rejects.flush()
+        metrics.count('reject', rejects.rejected)
+
+
+def profile_payroll_memory(filename: str, output: Optional[TextIO] = None, output_format: str = 'text',
+                           rejects: Optional[RejectLog] = None, bytes_reader: bool = False) -> Optional[MemoryReport]:
+    """
+    Prints the payroll of a file one stage at a time, each stage keeping its results as a payroll does,
+    measuring the memory of each stage and of each type kept
 
-    # add schedules to payroll
-    for schedule in schedules:
-        payroll.add_employee_schedule(schedule)
+    :param filename: schedules filename
+    :param output: file to write the payroll to, defaults to stdout
+    :param output_format: one of OUTPUT_FORMATS
+    :param rejects: lenient mode, malformed lines and duplicated employees are recorded here instead of aborting
+    :param bytes_reader: read the file as bytes and parse it with the bytes reader instead of reading text lines
+    :return: memory report of the rates, read, parse, payroll, price and write stages, None if the file doesn't exist
+    """
+    if not os.path.isfile(filename):
+        print(f'File {filename} does not exist')
+        return None
+
+    report = MemoryReport()
+    with report.tracing():
+        with report.stage('rates'):
+            payroll = set_up_payroll()
+        with report.stage('read'):
+            with open(filename, 'rb' if bytes_reader else 'r') as data_file:
+                data = data_file.read() if bytes_reader else data_file.readlines()
+        with report.stage('parse'):
+            if bytes_reader:
+                schedules = list(iter_employees_schedules_from_bytes(data, MIN_LINES, rejects))
+            else:
+                schedules = list(iter_employees_schedules_from_txt(data, MIN_LINES, rejects))
+        with report.stage('payroll'):
+            for schedule in schedules:
+                payroll.add_employee_schedule(schedule)
+        with report.stage('price'):
+            salaries = payroll.get_employees_payroll()
+        with report.stage('write'):
+            write_payroll(salaries, output or sys.stdout, output_format)
+
+        report.employees = len(schedules)
+        report.shifts = sum(len(schedule.work_hours) for schedule in schedules)
+        report.count_objects(payroll, salaries)
+
+    if rejects is not None:
+        rejects.flush()
+    return report
+
+
+def find_file_chunks(filename: str, chunk_size: int) -> list[tuple[int, int]]:
+    """
+    Splits a file into byte ranges of about chunk_size bytes, each one ending on a line boundary
 
-    # get salaries
-    salaries = payroll.get_employees_payroll()
+    :param filename: file to split
+    :param chunk_size: approximate chunk size in bytes
+    :return: list of start-end byte offsets, end exclusive
+    """
+    chunks = []
 
-    # print salaries
-    for salary in salaries:
-        print(f'The amount to pay {salary[0]} is: {salary[1]} USD')
+    with open(filename, 'rb') as data_file:
+        file_size = os.fstat(data_file.fileno()).st_size
+        chunk_start = 0
 
+        while chunk_start < file_size:
+            # move the chunk end forward to the start of the next line
+            data_file.seek(min(chunk_start + chunk_size, file_size))
+            data_file.readline()
+            chunk_end = data_file.tell()
 
-if __name__ == '__main__':
-    try:
-        print_payroll_from_file(sys.argv[1])
-    except IndexError:
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = chunk_end
+
+    return chunks
+
+
+# payroll of each worker process, set up once by the pool initializer
+_worker_payroll: Optional[Payroll] = None
+
+
+def _init_worker():
+    global _worker_payroll
+    _worker_payroll = set_up_payroll()
+
+
+def _price_file_chunk(filename: str, chunk_start: int, chunk_end: int,
+                      bytes_reader: bool = False) -> list[tuple[str, int]]:
+    """
+    Parses and prices the employee schedules in a byte range of a file
+
+    :param filename: schedules filename
+    :param chunk_start: start byte offset
+    :param chunk_end: end byte offset, exclusive
+    :param bytes_reader: parse the chunk with the bytes reader instead of decoding it into text lines
+    :return: list of employee-salary tuples in line order
+    """
+    with open(filename, 'rb') as data_file:
+        data_file.seek(chunk_start)
+        chunk = data_file.read(chunk_end - chunk_start)
+
+    if bytes_reader:
+        schedules = iter_employees_schedules_from_bytes(chunk, min_lines=0)
+    else:
+        # decode the same way open() does in text mode
+        schedules = map(parse_employee_schedule, TextIOWrapper(BytesIO(chunk), encoding=TEXT_ENCODING))
+    return [(schedule.name, _worker_payroll.calculate_salary(schedule)) for schedule in schedules]
+
+
+def iter_payroll_from_file_parallel(filename: str, min_lines: int, workers: Optional[int] = None,
+                                    chunk_size: int = CHUNK_SIZE,
+                                    bytes_reader: bool = False) -> Iterator[tuple[str, int]]:
+    """
+    Parses and prices a schedules file in a pool of worker processes, one file chunk at a time
+
+    :param filename: schedules filename
+    :param min_lines: minimum amount of lines expected
+    :param workers: amount of worker processes, defaults to the cpu count
+    :param chunk_size: approximate chunk size in bytes
+    :param bytes_reader: parse chunks with the bytes reader instead of decoding them into text lines
+    :return: an iterator of employee-salary tuples in file order
+    """
+    with open(filename, 'rb') as data_file:
+        lines = sum(1 for _ in islice(data_file, min_lines))
+    if lines < min_lines:
+        raise ValueError(f'Insufficient data, supply at least {min_lines} sets of data - supplied {lines}')
+
+    chunks = iter(find_file_chunks(filename, chunk_size))
+    names = set()
+
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        # keep a bounded window of chunks in flight, consumed in file order
+        pending = deque(executor.submit(_price_file_chunk, filename, *chunk, bytes_reader)
+                        for chunk in islice(chunks, workers * 2))
+
+        while pending:
+            salaries = pending.popleft().result()
+            for chunk in islice(chunks, 1):
+                pending.append(executor.submit(_price_file_chunk, filename, *chunk, bytes_reader))
+
+            for name, salary in salaries:
+                # duplicates may come from different chunks
+                if name in names:
+                    raise ValueError('found duplicated employee in payroll')
+                names.add(name)
+
+                yield name, salary
+
+
+def print_payroll_from_file_parallel(filename: str, workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                                     metrics: Optional[Metrics] = None, output: Optional[TextIO] = None,
+                                     output_format: str = 'text', bytes_reader: bool = False):
+    """
+    Parses employee schedules file in a pool of worker processes, prints payroll
+
+    :param filename: schedules filename
+    :param workers: amount of worker processes, defaults to the cpu count
+    :param chunk_size: approximate chunk size in bytes
+    :param metrics: optional metrics recording the time waiting on workers and the write stage
+    :param output: file to write the payroll to, defaults to stdout
+    :param output_format: one of OUTPUT_FORMATS
+    :param bytes_reader: parse chunks with the bytes reader instead of decoding them into text lines
+    """
+    if not os.path.isfile(filename):
+        print(f'File {filename} does not exist')
+        return
+
+    metrics = metrics or NO_METRICS
+    salaries = metrics.iter('workers', iter_payroll_from_file_parallel(filename, MIN_LINES, workers, chunk_size,
+                                                                       bytes_reader))
+    with metrics.stage('write'):
+        written = write_payroll(salaries, output or sys.stdout, output_format)
+    metrics.count('write', written)
+
+
+class FilePayroll:
+    """Payroll of a single schedules file of a batch run, or the error that stopped it"""
+
+    def __init__(self, filename: str, salaries: Optional[list[tuple[str, int]]] = None, error: Optional[str] = None):
+        """
+        :param filename: schedules filename
+        :param salaries: employee-salary tuples in file order
+        :param error: error message, when the file couldn't be priced
+        """
+        self.filename = filename
+        self.salaries = salaries or []
+        self.error = error
+
+    @property
+    def total(self) -> int:
+        """amount of money paid to every employee of the file"""
+        return sum(salary for _, salary in self.salaries)
+
+
+def find_schedule_files(path: str) -> list[str]:
+    """
+    Lists the schedules files of a batch run
+
+    :param path: directory, every .txt file in it gets picked, or a glob pattern
+    :return: sorted list of filenames
+    """
+    if os.path.isdir(path):
+        path = os.path.join(glob.escape(path), '*.txt')
+
+    return sorted(filename for filename in glob.glob(path) if os.path.isfile(filename))
+
+
+def payroll_output_filenames(filenames: list[str], output_dir: str, output_format: str) -> dict[str, str]:
+    """
+    Names the payroll file of each schedules file of a batch run after its path relative to the directory every
+    schedules file is in, so files named alike in different directories don't overwrite each other
+
+    :param filenames: schedules filenames
+    :param output_dir: directory payroll files get written to
+    :param output_format: one of OUTPUT_FORMATS
+    :return: payroll filename by schedules filename
+    """
+    common_dir = os.path.commonpath([os.path.dirname(os.path.abspath(filename)) for filename in filenames])
+
+    payroll_filenames = {}
+    written_by = {}
+    for filename in filenames:
+        name = os.path.splitext(os.path.relpath(os.path.abspath(filename), common_dir))[0]
+        payroll_filename = os.path.join(output_dir, f'{name}.{OUTPUT_EXTENSIONS[output_format]}')
+        if payroll_filename in written_by:
+            raise ValueError(f'{written_by[payroll_filename]} and {filename} would both be written to '
+                             f'{payroll_filename}')
+        written_by[payroll_filename] = filename
+        payroll_filenames[filename] = payroll_filename
+
+    return payroll_filenames
+
+
+def _price_file(filename: str, bytes_reader: bool = False) -> list[tuple[str, int]]:
+    """
+    Parses and prices a whole schedules file in a worker process
+
+    :param filename: schedules filename
+    :param bytes_reader: parse the memory mapped file with the bytes reader instead of streaming it in text mode
+    :return: list of employee-salary tuples in line order
+    """
+    schedules = iter_employees_schedules_from_file(filename, MIN_LINES, bytes_reader=bytes_reader)
+    return list(iter_employees_payroll(schedules, _worker_payroll))
+
+
+def iter_payroll_from_files(filenames: Iterable[str], workers: Optional[int] = None,
+                            bytes_reader: bool = False) -> Iterator[FilePayroll]:
+    """
+    Prices schedules files in a pool of worker processes, a file that fails is reported without stopping the others
+
+    :param filenames: schedules filenames
+    :param workers: amount of files priced at once, defaults to the cpu count
+    :param bytes_reader: parse files with the bytes reader instead of streaming them in text mode
+    :return: an iterator of file payrolls, in the order of filenames
+    """
+    filenames = iter(filenames)
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        # keep a bounded window of files in flight, consumed in order
+        pending = deque(
+            (filename, executor.submit(_price_file, filename, bytes_reader))
+            for filename in islice(filenames, workers * 2)
+        )
+
+        while pending:
+            filename, salaries = pending.popleft()
+            for next_filename in islice(filenames, 1):
+                pending.append((next_filename, executor.submit(_price_file, next_filename, bytes_reader)))
+
+            try:
+                file_payroll = FilePayroll(filename, salaries=salaries.result())
+            except (ValueError, OSError) as e:
+                file_payroll = FilePayroll(filename, error=str(e))
+            yield file_payroll
+
+
+def print_payroll_from_files(path: str, workers: Optional[int] = None, metrics: Optional[Metrics] = None,
+                             output: Optional[TextIO] = None, output_format: str = 'text',
+                             output_dir: Optional[str] = None, bytes_reader: bool = False) -> list[FilePayroll]:
+    """
+    Prices every schedules file of a directory or glob pattern, prints each file payroll and a roll-up of all of them
+
+    :param path: directory, every .txt file in it gets picked, or a glob pattern
+    :param workers: amount of files priced at once, defaults to the cpu count
+    :param metrics: optional metrics recording the time waiting on workers and the write stage
+    :param output: file to write payrolls and the roll-up to, defaults to stdout
+    :param output_format: one of OUTPUT_FORMATS
+    :param output_dir: write each file payroll to its own file in this directory, named after its path relative to
+        the directory every file is in, only the roll-up gets printed
+    :param bytes_reader: parse files with the bytes reader instead of streaming them in text mode
+    :return: list of file payrolls
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f'Invalid output format: {output_format}')
+
+    output = output or sys.stdout
+    filenames = find_schedule_files(path)
+    if not filenames:
+        print(f'No schedule files found in {path}', file=output)
+        return []
+
+    metrics = metrics or NO_METRICS
+    if output_dir is not None:
+        # every name is checked before pricing, a collision fails the run before anything gets written
+        payroll_filenames = payroll_output_filenames(filenames, output_dir, output_format)
+        os.makedirs(output_dir, exist_ok=True)
+
+    file_payrolls = []
+    for file_payroll in metrics.iter('workers', iter_payroll_from_files(filenames, workers, bytes_reader)):
+        file_payrolls.append(file_payroll)
+
+        with metrics.stage('write', items=len(file_payroll.salaries)):
+            if output_dir is not None:
+                if file_payroll.error is None:
+                    payroll_filename = payroll_filenames[file_payroll.filename]
+                    os.makedirs(os.path.dirname(payroll_filename), exist_ok=True)
+                    with open(payroll_filename, 'w', newline='') as payroll_file:
+                        write_payroll(file_payroll.salaries, payroll_file, output_format)
+            else:
+                output.write(f'== {file_payroll.filename} ==\n')
+                if file_payroll.error is None:
+                    write_payroll(file_payroll.salaries, output, output_format)
+                else:
+                    output.write(f'Error while parsing the input data; {file_payroll.error}\n')
+
+    failed = [file_payroll for file_payroll in file_payrolls if file_payroll.error is not None]
+    output.write('== roll-up ==\n')
+    for file_payroll in file_payrolls:
+        if file_payroll.error is None:
+            output.write(f'{file_payroll.filename}: {len(file_payroll.salaries)} employees, {file_payroll.total} USD\n')
+        else:
+            output.write(f'{file_payroll.filename}: failed - {file_payroll.error}\n')
+    output.write(f'Total: {len(file_payrolls) - len(failed)} files priced, {len(failed)} failed, '
+                 f'{sum(len(file_payroll.salaries) for file_payroll in file_payrolls)} employees, '
+                 f'{sum(file_payroll.total for file_payroll in file_payrolls)} USD\n')
+    output.flush()
+
+    return file_payrolls
+
+
+def main(args: Optional[list[str]] = None):
+    """
+    Command line entry point
+
+    :param args: command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description='Prints the ACME payroll of an employee schedules file')
+    parser.add_argument('filename', nargs='?', help='employee schedules txt file')
+    parser.add_argument('-j', '--workers', type=int,
+                        help='parse and price the file in this many processes, or this many files at once with --batch')
+    parser.add_argument('--batch', action='store_true',
+                        help='filename is a directory or glob pattern, price every file plus a roll-up')
+    parser.add_argument('--output-dir', help='with --batch, write each file payroll to this directory')
+    parser.add_argument('--profile', action='store_true', help='print time spent per stage to stderr')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='print memory kept per stage and per type to stderr, holding every schedule in memory')
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='text', help='payroll output format')
+    parser.add_argument('-o', '--output', help='write the payroll to this file instead of stdout')
+    parser.add_argument('--cache-dir', help='cache parsed schedules in this directory, reused until the file changes')
+    parser.add_argument('--verify-hash', action='store_true',
+                        help='check the cache against the file contents hash instead of its modification time')
+    parser.add_argument('--reject-file',
+                        help='lenient mode, write malformed lines to this file as json lines and keep going')
+    parser.add_argument('--bytes-reader', action='store_true',
+                        help='parse the memory mapped file as bytes instead of streaming it in text mode')
+    arguments = parser.parse_args(args)
+
+    if arguments.filename is None:
         print('File argument not supplied')
+        return
+    if arguments.workers is not None and arguments.workers < 1:
+        parser.error('--workers must be at least 1')
+    if (arguments.workers or arguments.batch) and arguments.reject_file:
+        parser.error('--reject-file is not supported along --workers or --batch')
+    if (arguments.workers or arguments.batch) and (arguments.cache_dir or arguments.verify_hash):
+        parser.error('--cache-dir and --verify-hash are not supported along --workers or --batch')
+    if arguments.verify_hash and not arguments.cache_dir:
+        parser.error('--verify-hash requires --cache-dir')
+    if arguments.output_dir and not arguments.batch:
+        parser.error('--output-dir requires --batch')
+    if arguments.memory_report and (arguments.workers or arguments.batch or arguments.cache_dir):
+        parser.error('--memory-report is not supported along --workers, --batch or --cache-dir')
+
+    metrics = Metrics(enabled=arguments.profile)
+    try:
+        output = open(arguments.output, 'w', newline='') if arguments.output else sys.stdout
+    except OSError as e:
+        print(f'Error while opening the output file; {e}')
+        return
+    try:
+        reject_output = open(arguments.reject_file, 'w') if arguments.reject_file else None
+    except OSError as e:
+        print(f'Error while opening the reject file; {e}')
+        if output is not sys.stdout:
+            output.close()
+        return
+    rejects = RejectLog(reject_output) if reject_output else None
+    try:
+        if arguments.batch:
+            print_payroll_from_files(arguments.filename, workers=arguments.workers, metrics=metrics, output=output,
+                                     output_format=arguments.format, output_dir=arguments.output_dir,
+                                     bytes_reader=arguments.bytes_reader)
+        elif arguments.memory_report:
+            memory_report = profile_payroll_memory(arguments.filename, output=output, output_format=arguments.format,
+                                                   rejects=rejects, bytes_reader=arguments.bytes_reader)
+            if memory_report is not None:
+                print(memory_report.summary(), file=sys.stderr)
+        elif arguments.workers:
+            print_payroll_from_file_parallel(arguments.filename, workers=arguments.workers, metrics=metrics,
+                                             output=output, output_format=arguments.format,
+                                             bytes_reader=arguments.bytes_reader)
+        else:
+            print_payroll_from_file(arguments.filename, metrics=metrics, output=output,
+                                    output_format=arguments.format, cache_dir=arguments.cache_dir,
+                                    verify_hash=arguments.verify_hash, rejects=rejects,
+                                    bytes_reader=arguments.bytes_reader)
     except ValueError as ve:
         print(f'Error while parsing the input data; {ve}')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if rejects is not None:
+            rejects.flush()
+            reject_output.close()
+            print(f'Rejected {rejects.rejected} lines, written to {arguments.reject_file}', file=sys.stderr)
+        if arguments.profile:
+            print(metrics.summary(), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
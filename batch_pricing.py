@@ -0,0 +1,190 @@
+from array import array
+from typing import Optional, Sequence
+from weakref import WeakKeyDictionary
+
+from payroll import MINUTES_PER_DAY, Payroll, RateTable
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BACKENDS = ('numpy', 'array')
+
+# per minute lookups of each rate table, kept as long as the rate table lives
+_minute_tables: 'WeakKeyDictionary[RateTable, tuple]' = WeakKeyDictionary()
+_numpy_minute_tables: 'WeakKeyDictionary[RateTable, tuple]' = WeakKeyDictionary()
+
+
+def default_backend() -> str:
+    """numpy when installed, the standard library array fallback otherwise"""
+    return 'numpy' if numpy is not None else 'array'
+
+
+def employee_ids_from_counts(shift_counts: Sequence[int]) -> array:
+    """
+    Expands shifts per employee into the employee id of each shift, as laid out by the schedules cache
+
+    :param shift_counts: shifts per employee
+    :return: employee id column
+    """
+    employee_ids = array('I')
+    for employee, shift_count in enumerate(shift_counts):
+        employee_ids.extend([employee] * shift_count)
+    return employee_ids
+
+
+def price_shifts(rate_table: RateTable, employee_ids: Sequence[int], weekdays: Sequence[int],
+                 minute_starts: Sequence[int], minute_ends: Sequence[int], employees: int,
+                 backend: Optional[str] = None) -> list[int]:
+    """
+    Prices shift columns at once, salaries match RateTable.calculate_salary of each shift added up per employee
+
+    :param rate_table: compiled rate table
+    :param employee_ids: employee of each shift, from 0 to employees - 1
+    :param weekdays: weekday of each shift
+    :param minute_starts: start minute of the day of each shift
+    :param minute_ends: end minute of the day of each shift, 0 ends at midnight
+    :param employees: amount of employees
+    :param backend: numpy or array, defaults to numpy when installed
+    :return: salary of each employee id
+    """
+    backend = backend or default_backend()
+    if backend not in BACKENDS:
+        raise ValueError(f'unknown pricing backend {backend}, expected one of {", ".join(BACKENDS)}')
+    if not rate_table.compiled:
+        raise ValueError('rate table has wages with seconds precision, shifts must be priced one at a time')
+    if not len(employee_ids) == len(weekdays) == len(minute_starts) == len(minute_ends):
+        raise ValueError('shift columns have different lengths')
+
+    if backend == 'numpy':
+        if numpy is None:
+            raise ValueError('numpy pricing backend requires numpy to be installed')
+        return _price_shifts_numpy(rate_table, employee_ids, weekdays, minute_starts, minute_ends, employees)
+    return _price_shifts_array(rate_table, employee_ids, weekdays, minute_starts, minute_ends, employees)
+
+
+def _minute_rate_table(rate_table: RateTable) -> tuple[list[int], list[int], list[int], list[int]]:
+    """
+    Folds the rate table into lookups by minute of the week, a shift spanning many bands is priced as
+    minute_heads[start] + minute_tails[end], one within a band as its hours times minute_amounts[start].
+    Pieces of a band shorter than an hour are worth 0, so no shift needs the band bounds checked
+
+    :param rate_table: compiled rate table
+    :return: band, band amount, price from the minute to its band end less every band up to it,
+        price of every band before the minute plus its band start up to the minute
+    """
+    try:
+        return _minute_tables[rate_table]
+    except KeyError:
+        pass
+
+    minute_bands = rate_table.minute_bands
+    minute_amounts = []
+    minute_heads = []
+    minute_tails = []
+    for minute_of_week, band in enumerate(minute_bands):
+        minute = minute_of_week % MINUTES_PER_DAY
+        amount = rate_table.band_amounts[band]
+        minute_amounts.append(amount)
+        minute_heads.append((rate_table.band_ends[band] - minute + 1) // 60 * amount - rate_table.wage_prefix[band + 1])
+        minute_tails.append(rate_table.wage_prefix[band] + (minute - rate_table.band_starts[band] + 1) // 60 * amount)
+
+    tables = _minute_tables[rate_table] = (minute_bands, minute_amounts, minute_heads, minute_tails)
+    return tables
+
+
+def _price_shifts_array(rate_table: RateTable, employee_ids: Sequence[int], weekdays: Sequence[int],
+                        minute_starts: Sequence[int], minute_ends: Sequence[int], employees: int) -> list[int]:
+    """single pass over the columns, with every lookup bound to a local"""
+    minute_bands, minute_amounts, minute_heads, minute_tails = _minute_rate_table(rate_table)
+    last_minute = MINUTES_PER_DAY - 1
+    salaries = array('q', bytes(8 * employees))
+
+    for employee, weekday, minute_start, minute_end in zip(employee_ids, weekdays, minute_starts, minute_ends):
+        if minute_end == 0:
+            minute_end = last_minute
+        if minute_start > minute_end:
+            raise ValueError("Invalid time range")
+
+        day_offset = weekday * MINUTES_PER_DAY
+        start = day_offset + minute_start
+        end = day_offset + minute_end
+        if minute_bands[start] == minute_bands[end]:
+            salaries[employee] += (minute_end - minute_start + 1) // 60 * minute_amounts[start]
+        else:
+            salaries[employee] += minute_heads[start] + minute_tails[end]
+
+    return salaries.tolist()
+
+
+def _price_shifts_numpy(rate_table: RateTable, employee_ids: Sequence[int], weekdays: Sequence[int],
+                        minute_starts: Sequence[int], minute_ends: Sequence[int], employees: int) -> list[int]:
+    """same arithmetic as the array backend, over whole columns"""
+    try:
+        minute_bands, minute_amounts, minute_heads, minute_tails = _numpy_minute_tables[rate_table]
+    except KeyError:
+        minute_bands, minute_amounts, minute_heads, minute_tails = _numpy_minute_tables[rate_table] = tuple(
+            numpy.asarray(values, dtype=numpy.int64) for values in _minute_rate_table(rate_table)
+        )
+
+    minute_starts = numpy.asarray(minute_starts, dtype=numpy.intp)
+    minute_ends = numpy.asarray(minute_ends, dtype=numpy.intp)
+    minute_ends = numpy.where(minute_ends == 0, MINUTES_PER_DAY - 1, minute_ends)
+    if (minute_starts > minute_ends).any():
+        raise ValueError("Invalid time range")
+
+    day_offsets = numpy.asarray(weekdays, dtype=numpy.intp) * MINUTES_PER_DAY
+    starts = day_offsets + minute_starts
+    ends = day_offsets + minute_ends
+    shift_salaries = numpy.where(
+        minute_bands[starts] == minute_bands[ends],
+        (minute_ends - minute_starts + 1) // 60 * minute_amounts[starts],
+        minute_heads[starts] + minute_tails[ends]
+    )
+
+    salaries = numpy.zeros(employees, dtype=numpy.int64)
+    numpy.add.at(salaries, numpy.asarray(employee_ids, dtype=numpy.intp), shift_salaries)
+    return salaries.tolist()
+
+
+def price_payroll(payroll: Payroll, backend: Optional[str] = None) -> tuple[tuple[str, int], ...]:
+    """
+    Prices every employee of a payroll in batches, one per rate table,
+    employees with seconds precision shifts or rates get priced one shift at a time
+
+    :param payroll: payroll holding pay rates and schedules
+    :param backend: numpy or array, defaults to numpy when installed
+    :return: tuple of employee-salary tuples, aligned with Payroll.employee_schedules
+    """
+    snapshot = payroll.snapshot()
+    schedules = [schedule for schedule, _ in snapshot]
+    salaries = [0] * len(schedules)
+    # shift columns of each rate table, employee ids point into schedules
+    columns: dict[int, tuple[RateTable, array, array, array, array]] = {}
+
+    for employee, (schedule, group) in enumerate(snapshot):
+        rate_table = payroll.get_rate_table(group)
+        if not rate_table.compiled or not all(work_hours.minute_aligned for work_hours in schedule.work_hours):
+            salaries[employee] = payroll.calculate_salary(schedule, group)
+            continue
+
+        try:
+            _, employee_ids, weekdays, minute_starts, minute_ends = columns[id(rate_table)]
+        except KeyError:
+            _, employee_ids, weekdays, minute_starts, minute_ends = columns[id(rate_table)] = (
+                rate_table, array('I'), array('B'), array('H'), array('H')
+            )
+
+        for work_hours in schedule.work_hours:
+            employee_ids.append(employee)
+            weekdays.append(work_hours.weekday)
+            minute_starts.append(work_hours.minute_start)
+            minute_ends.append(work_hours.minute_end)
+
+    for rate_table, employee_ids, weekdays, minute_starts, minute_ends in columns.values():
+        table_salaries = price_shifts(rate_table, employee_ids, weekdays, minute_starts, minute_ends, len(schedules),
+                                      backend)
+        salaries = [salary + table_salary for salary, table_salary in zip(salaries, table_salaries)]
+
+    return tuple((schedule.name, salary) for schedule, salary in zip(schedules, salaries))
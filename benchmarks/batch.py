@@ -0,0 +1,44 @@
+"""Benchmark of batch pricing over shift columns against pricing one employee at a time"""
+import argparse
+import timeit
+from array import array
+
+from acme_payroll import parse_employee_schedule, set_up_payroll
+from batch_pricing import BACKENDS, employee_ids_from_counts, numpy, price_shifts
+from benchmarks.workload import generate_schedule_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=100000, help='priced employee schedules')
+    parser.add_argument('--shifts', type=int, default=5, help='shifts per employee')
+    args = parser.parse_args()
+
+    payroll = set_up_payroll()
+    data_lines = generate_schedule_lines(args.employees, args.shifts)
+    schedules = [parse_employee_schedule(data_line) for data_line in data_lines]
+    shift_counts = array('I', [len(schedule.work_hours) for schedule in schedules])
+    columns = (
+        employee_ids_from_counts(shift_counts),
+        array('B', [work_hours.weekday for schedule in schedules for work_hours in schedule.work_hours]),
+        array('H', [work_hours.minute_start for schedule in schedules for work_hours in schedule.work_hours]),
+        array('H', [work_hours.minute_end for schedule in schedules for work_hours in schedule.work_hours]),
+    )
+
+    timings = {'objects': min(timeit.repeat(
+        lambda: [payroll.calculate_salary(schedule) for schedule in schedules], number=1, repeat=3
+    ))}
+    for backend in BACKENDS:
+        if backend == 'numpy' and numpy is None:
+            continue
+        timings[backend] = min(timeit.repeat(
+            lambda: price_shifts(payroll.rate_table, *columns, employees=len(schedules), backend=backend),
+            number=1, repeat=3
+        ))
+
+    for label, seconds in timings.items():
+        print(f'{label:>8}: {args.employees / seconds:>12,.0f} employees/s {timings["objects"] / seconds:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark of a payroll shared between feed threads adding schedules and a thread reporting the payroll"""
+import argparse
+import threading
+import time
+
+from acme_payroll import parse_employee_schedule, set_up_payroll
+from benchmarks.workload import generate_schedule_lines
+
+
+def run(schedules: list, threads: int) -> tuple[float, int]:
+    """
+    Adds the schedules split between feed threads, while a reporter thread keeps pricing the payroll
+
+    :param schedules: employee schedules
+    :param threads: feed threads
+    :return: seconds to add every schedule, reports taken meanwhile
+    """
+    payroll = set_up_payroll()
+    feeds = [schedules[feed::threads] for feed in range(threads)]
+    adding = threading.Event()
+    adding.set()
+    reports = 0
+
+    def add_schedules(feed: list):
+        for schedule in feed:
+            payroll.add_employee_schedule(schedule)
+
+    def report():
+        nonlocal reports
+        while adding.is_set():
+            payroll.get_employees_payroll()
+            reports += 1
+
+    writers = [threading.Thread(target=add_schedules, args=(feed,)) for feed in feeds]
+    reporter = threading.Thread(target=report)
+    start = time.perf_counter()
+    reporter.start()
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    seconds = time.perf_counter() - start
+    adding.clear()
+    reporter.join()
+
+    return seconds, reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=200000, help='added employee schedules')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8], help='feed thread counts')
+    args = parser.parse_args()
+
+    schedules = [parse_employee_schedule(data_line) for data_line in generate_schedule_lines(args.employees)]
+    for threads in args.threads:
+        seconds, reports = run(schedules, threads)
+        print(f'{threads:>3} feeds: {args.employees / seconds:>12,.0f} adds/s {reports:>6,} reports')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+Differential check of every pricing engine against WorkHoursWage.get_wage over adversarial rates and shifts,
+reporting mismatches and the speed of each engine relative to the reference
+"""
+import argparse
+import random
+import sys
+import time as timer
+from datetime import time
+from typing import Callable, Optional
+
+from batch_pricing import BACKENDS, numpy, price_payroll
+from payroll import MINUTES_PER_DAY, DayRange, EmployeeSchedule, PayRate, Payroll, ShiftPriceCache, WeekdayWorkHours, \
+    WorkHoursWage
+from payroll_rollup import rollup_payroll
+
+# prepares an engine over rates and schedules, the returned callable prices every schedule in order
+Engine = Callable[[list[PayRate], list[EmployeeSchedule]], Callable[[], list[int]]]
+
+
+def _minute_time(minute: int, second: int = 0) -> time:
+    return time(hour=minute // 60, minute=minute % 60, second=second)
+
+
+def generate_rates(rng: random.Random, seconds_share: float = 0.1) -> list[PayRate]:
+    """
+    Generates pay rates covering the week in random day ranges, with wage bands cut around hour bounds,
+    bands shorter than an hour, 00:01 starts, 00:00 ends, and now and then a cut with seconds precision
+
+    :param rng: random generator
+    :param seconds_share: share of rates with a band cut with seconds precision
+    :return: list of pay rates
+    """
+    day_cuts = sorted(rng.sample(range(1, 7), rng.randrange(3)))
+    day_ranges = [DayRange(start, end - 1) for start, end in zip([0, *day_cuts], [*day_cuts, 7])]
+
+    rates = []
+    for day_range in day_ranges:
+        cut_pool = [hour * 60 + offset for hour in range(1, 24) for offset in (-1, 0, 1)]
+        cuts = sorted(set(rng.sample(cut_pool, rng.randrange(1, 6)) + [rng.randrange(2, MINUTES_PER_DAY)
+                                                                      for _ in range(rng.randrange(2))]))
+        starts = [0, *cuts]
+        ends = [cut - 1 for cut in cuts] + [MINUTES_PER_DAY - 1]
+        seconds = [0] * len(starts)
+        # a cut with seconds starts its band a few seconds into the minute, the band has to last past that minute
+        seconds_bands = [band for band in range(1, len(starts)) if ends[band] > starts[band]]
+        if seconds_bands and rng.random() < seconds_share:
+            seconds[rng.choice(seconds_bands)] = rng.randrange(1, 60)
+
+        hourly_wages = []
+        for band, (band_start, band_end) in enumerate(zip(starts, ends)):
+            if band == 0:
+                time_start = rng.choice((time(hour=0), time(hour=0, minute=1)))
+            else:
+                time_start = _minute_time(band_start, seconds[band])
+            if band == len(starts) - 1:
+                time_end = rng.choice((time(hour=23, minute=59), time(hour=0)))
+            else:
+                time_end = _minute_time(band_end, seconds[band + 1])
+            hourly_wages.append(WorkHoursWage(time_start=time_start, time_end=time_end, amount=rng.randrange(51)))
+
+        rates.append(PayRate(day_range=day_range, hourly_wages=hourly_wages))
+
+    return rates
+
+
+def generate_schedules(rng: random.Random, rates: list[PayRate], employees: int, shifts: int = 5,
+                       seconds_share: float = 0.05) -> list[EmployeeSchedule]:
+    """
+    Generates schedules with shifts starting and ending on band bounds and a minute around them, at 00:00, 00:01
+    and 23:59, empty and single minute shifts, and now and then times with seconds precision
+
+    :param rng: random generator
+    :param rates: pay rates the shifts get priced with, their band bounds are picked often
+    :param employees: amount of employees
+    :param shifts: shifts per employee
+    :param seconds_share: share of shifts with seconds precision
+    :return: list of employee schedules
+    """
+    bounds = {0, 1, MINUTES_PER_DAY - 1}
+    for rate in rates:
+        for hourly_wage in rate.hourly_wages:
+            for minute in (hourly_wage.minute_start, hourly_wage.minute_end):
+                bounds.update(bound % MINUTES_PER_DAY for bound in (minute - 1, minute, minute + 1))
+    bounds = sorted(bounds)
+
+    def pick_minute() -> int:
+        return rng.choice(bounds) if rng.random() < 0.7 else rng.randrange(MINUTES_PER_DAY)
+
+    schedules = []
+    for employee in range(employees):
+        work_hours = []
+        for _ in range(rng.randrange(shifts + 1)):
+            minute_start, minute_end = sorted((pick_minute(), pick_minute()))
+            second_start = second_end = 0
+            if rng.random() < seconds_share:
+                second_start, second_end = rng.randrange(60), rng.randrange(60)
+                if minute_start == minute_end:
+                    second_start, second_end = sorted((second_start, second_end))
+            if rng.random() < 0.2:
+                # ends at midnight, get_wage takes it as 23:59, so a shift can't start after that
+                minute_end = second_end = 0
+                if minute_start == MINUTES_PER_DAY - 1:
+                    second_start = 0
+            shift = WeekdayWorkHours(weekday=rng.randrange(7), time_start=_minute_time(minute_start, second_start),
+                                     time_end=_minute_time(minute_end, second_end))
+            # shifts of a day can touch but not overlap, nor start at once
+            if all(other.weekday != shift.weekday or other.time_start != shift.time_start
+                   and (shift.time_start >= other.time_end or other.time_start >= shift.time_end)
+                   for other in work_hours):
+                work_hours.append(shift)
+        schedules.append(EmployeeSchedule(name=f'EMPLOYEE{employee}', work_hours=work_hours))
+
+    return schedules
+
+
+def reference_engine(rates: list[PayRate], schedules: list[EmployeeSchedule]) -> Callable[[], list[int]]:
+    """
+    Prices every shift adding up WorkHoursWage.get_wage of every band of the first rate covering the weekday,
+    the semantics every other engine has to match
+    """
+    weekday_wages = [next(rate for rate in rates if rate.day_range.contains(weekday)).hourly_wages
+                     for weekday in range(7)]
+
+    def run() -> list[int]:
+        return [
+            sum(hourly_wage.get_wage(work_hours.time_start, work_hours.time_end)
+                for work_hours in schedule.work_hours for hourly_wage in weekday_wages[work_hours.weekday])
+            for schedule in schedules
+        ]
+
+    return run
+
+
+def _payroll(rates: list[PayRate], schedules: list[EmployeeSchedule], **kwargs) -> Payroll:
+    payroll = Payroll(list(rates), **kwargs)
+    for schedule in schedules:
+        payroll.add_employee_schedule(schedule)
+    return payroll
+
+
+def rate_table_engine(rates: list[PayRate], schedules: list[EmployeeSchedule]) -> Callable[[], list[int]]:
+    """Prices every shift with the compiled rate table"""
+    calculate_salary = _payroll(rates, []).rate_table.calculate_salary
+
+    def run() -> list[int]:
+        return [sum(calculate_salary(work_hours) for work_hours in schedule.work_hours) for schedule in schedules]
+
+    return run
+
+
+def payroll_engine(rates: list[PayRate], schedules: list[EmployeeSchedule]) -> Callable[[], list[int]]:
+    """Prices every employee of a payroll"""
+    payroll = _payroll(rates, schedules)
+    return lambda: [salary for _, salary in payroll.get_employees_payroll()]
+
+
+def shift_cache_engine(rates: list[PayRate], schedules: list[EmployeeSchedule]) -> Callable[[], list[int]]:
+    """Prices every employee of a payroll caching shift prices"""
+    payroll = _payroll(rates, schedules, shift_cache=ShiftPriceCache(maxsize=4096))
+    return lambda: [salary for _, salary in payroll.get_employees_payroll()]
+
+
+def batch_engine(backend: str) -> Engine:
+    """Prices every employee of a payroll with a batch pricing backend"""
+    def prepare(rates: list[PayRate], schedules: list[EmployeeSchedule]) -> Callable[[], list[int]]:
+        payroll = _payroll(rates, schedules)
+        return lambda: [salary for _, salary in price_payroll(payroll, backend)]
+
+    return prepare
+
+
+def rollup_engine(rates: list[PayRate], schedules: list[EmployeeSchedule]) -> Callable[[], list[int]]:
+    """Adds up the pay of every employee of a payroll rollup"""
+    payroll = _payroll(rates, schedules)
+    return lambda: [pay for _, _, pay in rollup_payroll(payroll).totals_by_employee()]
+
+
+ENGINES: dict[str, Engine] = {
+    'rate_table': rate_table_engine,
+    'payroll': payroll_engine,
+    'shift_cache': shift_cache_engine,
+    **{f'batch_{backend}': batch_engine(backend) for backend in BACKENDS if backend != 'numpy' or numpy is not None},
+    'rollup': rollup_engine,
+}
+
+
+class EngineResult:
+    """Seconds an engine took and the employees it priced differently from the reference"""
+
+    __slots__ = ('seconds', 'mismatches')
+
+    def __init__(self):
+        self.seconds = 0.0
+        # employee name, schedule, reference salary and engine salary
+        self.mismatches: list[tuple[str, EmployeeSchedule, int, int]] = []
+
+
+def compare_engines(rates: list[PayRate], schedules: list[EmployeeSchedule],
+                    engines: Optional[dict[str, Engine]] = None,
+                    results: Optional[dict[str, EngineResult]] = None) -> dict[str, EngineResult]:
+    """
+    Prices the schedules with the reference engine and every other engine, timing each one
+
+    :param rates: pay rates
+    :param schedules: employee schedules
+    :param engines: engines to compare by name, defaults to ENGINES
+    :param results: results to add to, keyed by engine name, the reference engine result included
+    :return: results by engine name, the reference engine one under reference
+    """
+    results = {} if results is None else results
+    expected = None
+
+    for name, engine in {'reference': reference_engine, **(engines or ENGINES)}.items():
+        run = engine(rates, schedules)
+        start = timer.perf_counter()
+        salaries = run()
+        result = results.setdefault(name, EngineResult())
+        result.seconds += timer.perf_counter() - start
+
+        if expected is None:
+            expected = salaries
+            continue
+        result.mismatches.extend(
+            (schedule.name, schedule, expected_salary, salary)
+            for schedule, expected_salary, salary in zip(schedules, expected, salaries) if salary != expected_salary
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=20, help='rounds, each one with new rates and schedules')
+    parser.add_argument('--employees', type=int, default=2000, help='employees per round')
+    parser.add_argument('--shifts', type=int, default=5, help='most shifts per employee')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--rate-seconds-share', type=float, default=0.1,
+                        help='share of rates with a band cut with seconds precision')
+    parser.add_argument('--seconds-share', type=float, default=0.05, help='share of shifts with seconds precision')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES), help='engines to compare')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engines = {name: ENGINES[name] for name in args.engines}
+    results: dict[str, EngineResult] = {}
+    for _ in range(args.rounds):
+        rates = generate_rates(rng, args.rate_seconds_share)
+        schedules = generate_schedules(rng, rates, args.employees, args.shifts, args.seconds_share)
+        compare_engines(rates, schedules, engines, results)
+
+    reference_seconds = results['reference'].seconds
+    for name, result in results.items():
+        print(f'{name:>12}: {len(result.mismatches):>8,} mismatches {reference_seconds / result.seconds:>8.1f}x')
+    for name, result in results.items():
+        for employee, schedule, expected_salary, salary in result.mismatches[:5]:
+            print(f'{name}: {employee} {schedule.work_hours} expected {expected_salary}, got {salary}', file=sys.stderr)
+
+    if any(result.mismatches for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
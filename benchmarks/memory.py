@@ -0,0 +1,32 @@
+"""Memory held per parsed shift by the payroll model objects"""
+import argparse
+import tracemalloc
+
+from acme_payroll import parse_employee_schedule, parse_work_period
+from benchmarks.parser import DATA_LINES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=100000, help='parsed employee schedules')
+    args = parser.parse_args()
+
+    data_lines = [f'{i}{DATA_LINES[i % len(DATA_LINES)]}' for i in range(args.employees)]
+    work_periods = [data_line.split('=')[1].split(',') for data_line in data_lines]
+    shifts = sum(map(len, work_periods))
+
+    for label, parse in (
+        ('schedules', lambda: [parse_employee_schedule(data_line) for data_line in data_lines]),
+        ('periods', lambda: [[parse_work_period(period) for period in periods] for periods in work_periods]),
+    ):
+        tracemalloc.start()
+        parsed = parse()
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del parsed
+
+        print(f'{label:>9}: {retained / shifts:,.1f} bytes/shift')
+
+
+if __name__ == '__main__':
+    main()
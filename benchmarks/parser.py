@@ -0,0 +1,49 @@
+"""Micro-benchmark of the schedule parser fast path against the strptime parser"""
+import argparse
+import timeit
+
+from acme_payroll import parse_employee_schedule, parse_work_period
+from payroll import EmployeeSchedule
+
+DATA_LINES = [
+    'TOM=WE08:00-15:00,TH01:00-03:00,SA09:00-12:00',
+    'MARIA=MO10:00-18:00,TU10:00-12:00,TH01:00-03:00,FR21:00-22:00',
+    'CESAR=FR10:00-22:00,TU11:00-12:00,TH01:00-03:00,TH14:00-16:00,SU16:00-20:00',
+    'RITA=MO09:30-12:30,TH11:30-14:30,SU20:30-22:30,SA22:00-23:00',
+    'GEORGE=MO18:00-22:00,FR18:00-00:00,SA22:00-00:00,SU16:00-00:00',
+]
+
+
+def parse_employee_schedule_strptime(data_line: str) -> EmployeeSchedule:
+    """
+    Parses employee schedule data line reading every work period through strptime
+
+    :param data_line: employee schedule data line
+    :return: EmployeeSchedule
+    """
+    name, schedule = data_line.split('=')
+    return EmployeeSchedule(name, [parse_work_period(work_period) for work_period in schedule.split(',')])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=20000, help='parses per data line')
+    args = parser.parse_args()
+
+    for data_line in DATA_LINES:
+        fast = parse_employee_schedule(data_line)
+        reference = parse_employee_schedule_strptime(data_line)
+        assert fast.name == reference.name and fast.work_hours == reference.work_hours, data_line
+
+    timings = {}
+    for label, parse in (('strptime', parse_employee_schedule_strptime), ('fast', parse_employee_schedule)):
+        timings[label] = min(timeit.repeat(
+            lambda: [parse(data_line) for data_line in DATA_LINES], number=args.number // len(DATA_LINES), repeat=3
+        ))
+        print(f'{label:>8}: {args.number / timings[label]:,.0f} lines/s')
+
+    print(f' speedup: {timings["strptime"] / timings["fast"]:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
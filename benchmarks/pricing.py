@@ -0,0 +1,33 @@
+"""Benchmark of shift pricing with and without the shift price cache"""
+import argparse
+import timeit
+
+from acme_payroll import parse_employee_schedule, set_up_payroll
+from benchmarks.parser import DATA_LINES
+from payroll import ShiftPriceCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=20000, help='priced employee schedules')
+    parser.add_argument('--cache-size', type=int, default=1024, help='shift price cache size')
+    args = parser.parse_args()
+
+    schedules = [parse_employee_schedule(f'{i}{DATA_LINES[i % len(DATA_LINES)]}') for i in range(args.employees)]
+    payroll = set_up_payroll()
+    shift_cache = ShiftPriceCache(args.cache_size)
+
+    timings = {}
+    for label, cache in (('uncached', None), ('cached', shift_cache)):
+        payroll.shift_cache = cache
+        timings[label] = min(timeit.repeat(
+            lambda: [payroll.calculate_salary(schedule) for schedule in schedules], number=1, repeat=3
+        ))
+        print(f'{label:>8}: {args.employees / timings[label]:,.0f} employees/s')
+
+    print(f' speedup: {timings["uncached"] / timings["cached"]:.1f}x')
+    print(f'   cache: {shift_cache.hits:,} hits, {shift_cache.misses:,} misses, {shift_cache.evictions:,} evictions')
+
+
+if __name__ == '__main__':
+    main()
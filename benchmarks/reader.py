@@ -0,0 +1,47 @@
+"""
+Benchmark of the memory mapped bytes reader against the txt reader, both spend most of their time building the shifts,
+so they read about as many lines per second
+"""
+import argparse
+import os
+import tempfile
+import timeit
+from collections import deque
+
+from acme_payroll import iter_employees_schedules_from_txt, iter_employees_schedules_from_mmap
+from benchmarks.parser import DATA_LINES
+
+
+def read_txt(filename: str):
+    with open(filename, 'r') as data_file:
+        deque(iter_employees_schedules_from_txt(data_file, min_lines=5), maxlen=0)
+
+
+def read_mmap(filename: str):
+    deque(iter_employees_schedules_from_mmap(filename, min_lines=5), maxlen=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=100000, help='lines in the schedules file')
+    args = parser.parse_args()
+
+    data_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+    with data_file:
+        for i in range(args.lines):
+            data_line = DATA_LINES[i % len(DATA_LINES)]
+            data_file.write(f'{i}{data_line}\n')
+
+    try:
+        timings = {}
+        for label, read in (('txt', read_txt), ('mmap', read_mmap)):
+            timings[label] = min(timeit.repeat(lambda: read(data_file.name), number=1, repeat=3))
+            print(f'{label:>8}: {args.lines / timings[label]:,.0f} lines/s')
+
+        print(f' speedup: {timings["txt"] / timings["mmap"]:.1f}x')
+    finally:
+        os.remove(data_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Scaling benchmark of every payroll stage over synthetic workloads, reported as JSON"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from acme_payroll import iter_employees_schedules_from_file, set_up_payroll
+from benchmarks.workload import generate_schedule_lines
+
+
+def git_revision() -> Optional[str]:
+    """short hash of the checked out commit, if any"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_stages(filename: str, stage: Callable[[str, Callable], None]):
+    """
+    Runs every payroll stage in order over a schedules file
+
+    :param filename: schedules filename
+    :param stage: runs and measures a named stage function, returning its result
+    """
+    schedules = stage('parse', lambda: list(iter_employees_schedules_from_file(filename, min_lines=0)))
+    payroll = stage('payroll', set_up_payroll)
+    stage('add_employee_schedule', lambda: [payroll.add_employee_schedule(schedule) for schedule in schedules])
+    stage('get_employees_payroll', payroll.get_employees_payroll)
+
+
+def benchmark(filename: str, employees: int, shifts: int, memory: bool) -> dict:
+    """
+    Times every payroll stage, then measures its peak memory in a second traced run
+
+    :param filename: schedules filename
+    :param employees: amount of employees in the file
+    :param shifts: shifts per employee
+    :param memory: measure peak memory too
+    :return: stage results, by stage name
+    """
+    # employee schedules are what parse, add and get go through, payroll set up is a single item
+    items = {'parse': employees, 'payroll': 1, 'add_employee_schedule': employees, 'get_employees_payroll': employees}
+    stages = {}
+
+    def timed_stage(name, function):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        stages[name] = {'seconds': seconds, 'items_per_second': items[name] / seconds if seconds else None,
+                        'shifts_per_second': items[name] * shifts / seconds if seconds and items[name] > 1 else None}
+        return result
+
+    def traced_stage(name, function):
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+        stages[name]['peak_bytes'] = peak - start
+        return result
+
+    run_stages(filename, timed_stage)
+
+    if memory:
+        tracemalloc.start()
+        try:
+            run_stages(filename, traced_stage)
+        finally:
+            tracemalloc.stop()
+
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, nargs='+', default=[10000, 100000], help='employee counts to run')
+    parser.add_argument('--shifts', type=int, default=5, help='shifts per employee')
+    parser.add_argument('--midnight-share', type=float, default=0.1, help='share of shifts ending at 00:00')
+    parser.add_argument('--seed', type=int, default=0, help='workload random seed')
+    parser.add_argument('--skip-memory', action='store_true', help="don't run the traced pass measuring memory")
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'workload': {'shifts': args.shifts, 'midnight_share': args.midnight_share, 'seed': args.seed},
+        'runs': [],
+    }
+
+    for employees in args.employees:
+        data_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        with data_file:
+            for data_line in generate_schedule_lines(employees, args.shifts, args.midnight_share, args.seed):
+                data_file.write(data_line + '\n')
+
+        try:
+            stages = benchmark(data_file.name, employees, args.shifts, memory=not args.skip_memory)
+        finally:
+            os.remove(data_file.name)
+
+        report['runs'].append({'employees': employees, 'stages': stages})
+        print(f'{employees:,} employees done', file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Request latency of the payroll service under concurrent clients"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.workload import generate_schedule_lines
+from payroll_service import PayrollService
+
+
+async def client(host: str, port: int, data_lines: list[bytes]) -> list[float]:
+    """sends one line at a time, waiting for each answer"""
+    reader, writer = await asyncio.open_connection(host, port)
+    latencies = []
+
+    for data_line in data_lines:
+        start = time.perf_counter()
+        writer.write(data_line)
+        await reader.readline()
+        latencies.append(time.perf_counter() - start)
+
+    writer.close()
+    await writer.wait_closed()
+    return latencies
+
+
+async def run(clients: int, requests: int):
+    service = PayrollService()
+    server = await service.start_server()
+    host, port = server.sockets[0].getsockname()[:2]
+
+    data_lines = [f'{data_line}\n'.encode() for data_line in generate_schedule_lines(clients * requests)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        client(host, port, data_lines[i * requests:(i + 1) * requests]) for i in range(clients)
+    ))
+    seconds = time.perf_counter() - start
+
+    server.close()
+    await server.wait_closed()
+    await service.close()
+
+    latencies = sorted(latency for latencies in results for latency in latencies)
+    print(f'{len(latencies) / seconds:,.0f} requests/s')
+    print(f'latency p50 {statistics.median(latencies) * 1000:.2f} ms, '
+          f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=100, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=100, help='requests per client')
+    args = parser.parse_args()
+
+    asyncio.run(run(args.clients, args.requests))
+
+
+if __name__ == '__main__':
+    main()
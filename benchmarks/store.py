@@ -0,0 +1,48 @@
+"""Benchmark of loading a roster into the sqlite store and pricing it back, against parsing and pricing the file"""
+import argparse
+import os
+import tempfile
+import time
+
+from acme_payroll import MIN_LINES, iter_employees_payroll, iter_employees_schedules_from_file, set_up_payroll
+from benchmarks.workload import generate_schedule_lines
+from schedule_store import ScheduleStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=100000, help='employee schedules in the roster')
+    parser.add_argument('--shifts', type=int, default=5, help='shifts per employee')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        filename = os.path.join(data_dir, 'schedules.txt')
+        with open(filename, 'w') as data_file:
+            data_file.writelines(f'{data_line}\n' for data_line in generate_schedule_lines(args.employees, args.shifts))
+
+        timings = {}
+        start = time.perf_counter()
+        for _ in iter_employees_payroll(iter_employees_schedules_from_file(filename, MIN_LINES), set_up_payroll()):
+            pass
+        timings['parse and price file'] = time.perf_counter() - start
+
+        with ScheduleStore(os.path.join(data_dir, 'payroll.sqlite')) as store:
+            start = time.perf_counter()
+            roster_id = store.save_roster(filename, iter_employees_schedules_from_file(filename, MIN_LINES))
+            timings['load roster'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            store.price_roster(roster_id)
+            timings['price stored roster'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in store.iter_schedules(roster_id):
+                pass
+            timings['reload schedules'] = time.perf_counter() - start
+
+    for label, seconds in timings.items():
+        print(f'{label:>20}: {seconds:>8.2f}s {args.employees / seconds:>12,.0f} employees/s')
+
+
+if __name__ == '__main__':
+    main()
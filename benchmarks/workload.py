@@ -0,0 +1,70 @@
+"""Deterministic synthetic employee schedules generator"""
+import argparse
+import random
+import sys
+from typing import Iterator
+
+from acme_payroll import WEEKDAYS
+from payroll import MINUTES_PER_DAY
+
+
+def generate_schedule_lines(employees: int, shifts: int = 5, midnight_share: float = 0.1,
+                            seed: int = 0) -> Iterator[str]:
+    """
+    Generates employee schedule data lines, the same arguments always generate the same lines
+
+    :param employees: amount of employees
+    :param shifts: shifts per employee, from 1 up to 5040, spread over the week without overlapping
+    :param midnight_share: share of every shift ending at 00:00, only the last shift of a day can end at midnight,
+        so days with n shifts end at midnight with a chance of n times the share, up to always
+    :param seed: random seed
+    :return: an iterator of data lines, without line breaks
+    """
+    if not 1 <= shifts <= 7 * MINUTES_PER_DAY // 2:
+        raise ValueError(f'shifts must be between 1 and {7 * MINUTES_PER_DAY // 2} - supplied {shifts}')
+    if not 0 <= midnight_share <= 1:
+        raise ValueError(f'midnight share must be between 0 and 1 - supplied {midnight_share}')
+
+    rng = random.Random(seed)
+    # each shift gets its own slot of the day, days with more than one shift are split in equal slots,
+    # the last shift of each day gets the rest of the day
+    slots_per_day = -(-shifts // 7)
+    slot_minutes = MINUTES_PER_DAY // slots_per_day
+    day_shifts = [len(range(weekday, shifts, 7)) for weekday in range(7)]
+
+    for employee in range(employees):
+        work_periods = []
+
+        for shift in range(shifts):
+            weekday = shift % 7
+            slot = shift // 7
+            slot_start = slot * slot_minutes
+            last_shift = slot == day_shifts[weekday] - 1
+            slot_end = MINUTES_PER_DAY if last_shift else slot_start + slot_minutes
+
+            minute_start = slot_start + rng.randrange(slot_minutes // 2)
+            if last_shift and rng.random() < midnight_share * day_shifts[weekday]:
+                minute_end = 0
+            else:
+                minute_end = rng.randrange(minute_start + 1, slot_end)
+
+            work_periods.append(f'{WEEKDAYS[weekday]}{minute_start // 60:02d}:{minute_start % 60:02d}-'
+                                f'{minute_end // 60:02d}:{minute_end % 60:02d}')
+
+        yield f'EMPLOYEE{employee}=' + ','.join(work_periods)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('employees', type=int, help='amount of employees')
+    parser.add_argument('--shifts', type=int, default=5, help='shifts per employee')
+    parser.add_argument('--midnight-share', type=float, default=0.1, help='share of shifts ending at 00:00')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    for data_line in generate_schedule_lines(args.employees, args.shifts, args.midnight_share, args.seed):
+        sys.stdout.write(data_line + '\n')
+
+
+if __name__ == '__main__':
+    main()
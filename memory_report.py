@@ -0,0 +1,144 @@
+import gc
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Iterator
+
+
+class StageMemory:
+    """Memory a single stage allocated and kept, and its peak over the memory in use before it started"""
+
+    __slots__ = ('retained', 'peak')
+
+    def __init__(self):
+        self.retained = 0
+        self.peak = 0
+
+
+class TypeMemory:
+    """Objects of a single type reachable from the payroll, and their size"""
+
+    __slots__ = ('objects', 'size')
+
+    def __init__(self):
+        self.objects = 0
+        self.size = 0
+
+
+class MemoryReport:
+    """
+    Records memory per stage and per type with tracemalloc, stages are measured from snapshots of the traced memory,
+    types by walking the objects the stages kept
+    """
+
+    def __init__(self):
+        self.stages: dict[str, StageMemory] = {}
+        self.types: dict[str, TypeMemory] = {}
+        self.employees = 0
+        self.shifts = 0
+        # peak of the whole run over the memory in use when tracing started
+        self.peak = 0
+        self._baseline = 0
+        # objects tracked by the garbage collector when tracing started, kept alive so their ids stay unique
+        self._preexisting: dict[int, object] = {}
+
+    @contextmanager
+    def tracing(self) -> Iterator[None]:
+        """
+        Traces allocations within the block, stages and types can only be measured while tracing,
+        tracing already started elsewhere is left running
+        """
+        self._preexisting = {id(obj): obj for obj in gc.get_objects()}
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            if started:
+                tracemalloc.stop()
+            self._preexisting = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Measures the memory a block of code keeps, and its peak
+
+        :param name: stage name
+        """
+        try:
+            stage = self.stages[name]
+        except KeyError:
+            stage = self.stages[name] = StageMemory()
+
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            stage.retained += after - before
+            stage.peak = max(stage.peak, peak - before)
+            self.peak = max(self.peak, peak - self._baseline)
+
+    def count_objects(self, *roots: object):
+        """
+        Adds up the size of every object reachable from the roots by type. Objects allocated before tracing
+        started, like classes, interned strings or cached times shared by every shift, aren't counted nor walked
+
+        :param roots: objects to walk, like the payroll and its salaries
+        """
+        seen = set()
+        pending = list(roots)
+        while pending:
+            obj = pending.pop()
+            if id(obj) in seen or isinstance(obj, (type, ModuleType)):
+                continue
+            seen.add(id(obj))
+            if gc.is_tracked(obj):
+                # tracemalloc misses the traceback of instances allocated along their dict, so tracked objects
+                # get told apart by the ones tracked when tracing started
+                shared = id(obj) in self._preexisting
+            else:
+                shared = tracemalloc.get_object_traceback(obj) is None
+            if shared:
+                continue
+
+            try:
+                type_memory = self.types[type(obj).__qualname__]
+            except KeyError:
+                type_memory = self.types[type(obj).__qualname__] = TypeMemory()
+            type_memory.objects += 1
+            type_memory.size += sys.getsizeof(obj)
+            pending.extend(gc.get_referents(obj))
+
+    def _per_item(self, size: int) -> str:
+        per_employee = size / self.employees if self.employees else 0.0
+        per_shift = size / self.shifts if self.shifts else 0.0
+        return f'{per_employee:>12,.1f}{per_shift:>12,.1f}'
+
+    def summary(self) -> str:
+        """
+        Formats every stage in the order they were first measured, then every type largest first
+
+        :return: one line per stage plus the total, and one line per type plus the total
+        """
+        lines = [f'{"stage":<24}{"retained":>14}{"peak":>14}{"B/employee":>12}{"B/shift":>12}']
+        for name, stage in self.stages.items():
+            lines.append(f'{name:<24}{stage.retained:>14,}{stage.peak:>14,}{self._per_item(stage.retained)}')
+        retained = sum(stage.retained for stage in self.stages.values())
+        lines.append(f'{"total":<24}{retained:>14,}{self.peak:>14,}{self._per_item(retained)}')
+
+        lines.append('')
+        lines.append(f'{"type":<24}{"objects":>14}{"size":>14}{"B/employee":>12}{"B/shift":>12}')
+        for name, type_memory in sorted(self.types.items(), key=lambda item: item[1].size, reverse=True):
+            lines.append(
+                f'{name:<24}{type_memory.objects:>14,}{type_memory.size:>14,}{self._per_item(type_memory.size)}'
+            )
+        objects = sum(type_memory.objects for type_memory in self.types.values())
+        size = sum(type_memory.size for type_memory in self.types.values())
+        lines.append(f'{"total":<24}{objects:>14,}{size:>14,}{self._per_item(size)}')
+
+        return '\n'.join(lines)
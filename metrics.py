@@ -0,0 +1,132 @@
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from typing import Iterable, Iterator, TypeVar, ContextManager
+
+T = TypeVar('T')
+
+
+class StageMetrics:
+    """Wall time, calls and items of a single stage"""
+
+    __slots__ = ('seconds', 'calls', 'items')
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.items = 0
+
+    @property
+    def items_per_second(self) -> float:
+        """items processed per second spent in the stage"""
+        return self.items / self.seconds if self.seconds else 0.0
+
+
+class Metrics:
+    """Records wall time, call counts and item counts per stage"""
+
+    def __init__(self, enabled: bool = True):
+        """
+        Creates an empty metrics record
+
+        :param enabled: when disabled stages aren't measured, and iterables pass through untouched
+        """
+        self.enabled = enabled
+        self.stages: dict[str, StageMetrics] = {}
+        # stages being measured, innermost last, time spent in an inner stage isn't added to the outer ones
+        self._stack: list[StageMetrics] = []
+        self._resumed = 0.0
+
+    def _enter(self, name: str) -> StageMetrics:
+        now = perf_counter()
+        if self._stack:
+            self._stack[-1].seconds += now - self._resumed
+
+        try:
+            stage = self.stages[name]
+        except KeyError:
+            stage = self.stages[name] = StageMetrics()
+        stage.calls += 1
+
+        self._stack.append(stage)
+        self._resumed = now
+        return stage
+
+    def _exit(self):
+        now = perf_counter()
+        self._stack.pop().seconds += now - self._resumed
+        self._resumed = now
+
+    def stage(self, name: str, items: int = 0) -> ContextManager[None]:
+        """
+        Measures a block of code as a stage
+
+        :param name: stage name
+        :param items: amount of items the block processes
+        :return: context manager measuring the block
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._measure(name, items)
+
+    @contextmanager
+    def _measure(self, name: str, items: int):
+        stage = self._enter(name)
+        try:
+            yield
+        finally:
+            stage.items += items
+            self._exit()
+
+    def iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Measures the time spent producing each item of an iterable as a stage
+
+        :param name: stage name
+        :param iterable: items to measure
+        :return: iterator of the same items
+        """
+        if not self.enabled:
+            return iter(iterable)
+        return self._measure_iter(name, iter(iterable))
+
+    def _measure_iter(self, name: str, iterator: Iterator[T]) -> Iterator[T]:
+        while True:
+            stage = self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+
+            stage.items += 1
+            yield item
+
+    def count(self, name: str, items: int):
+        """
+        Adds items to a stage without measuring time
+
+        :param name: stage name
+        :param items: amount of items
+        """
+        if self.enabled:
+            self.stages.setdefault(name, StageMetrics()).items += items
+
+    def summary(self) -> str:
+        """
+        Formats every stage in the order they were first measured
+
+        :return: one line per stage, plus the total
+        """
+        lines = [f'{"stage":<24}{"calls":>12}{"items":>12}{"seconds":>12}{"items/s":>14}']
+        for name, stage in self.stages.items():
+            lines.append(
+                f'{name:<24}{stage.calls:>12,}{stage.items:>12,}{stage.seconds:>12.3f}{stage.items_per_second:>14,.0f}'
+            )
+        lines.append(f'{"total":<24}{"":>36}{sum(stage.seconds for stage in self.stages.values()):>12.3f}')
+
+        return '\n'.join(lines)
+
+
+# shared disabled metrics, used when no metrics are supplied
+NO_METRICS = Metrics(enabled=False)
@@ -1,10 +1,25 @@
 import calendar
-from datetime import time, timedelta, datetime
+import heapq
+import threading
+from collections import OrderedDict
+from datetime import date, time, timedelta, datetime
+from typing import Iterable, Iterator, Optional
+
+from metrics import Metrics, NO_METRICS
+
+DEFAULT_GROUP = 'default'
+
+MINUTES_PER_DAY = 24 * 60
+# shared minute numbers and time views of every minute of the day
+MINUTES = list(range(MINUTES_PER_DAY))
+MINUTE_TIMES = [time(hour=minute // 60, minute=minute % 60) for minute in MINUTES]
 
 
 class DayRange:
     """Weekday range, defined by inclusive start and end days"""
 
+    __slots__ = ('weekday_start', 'weekday_end')
+
     def __init__(self, weekday_start: int, weekday_end: int):
         """
         Weekday range, 0 = monday, 6 = sunday
@@ -33,7 +48,10 @@ class DayRange:
 
 
 class WorkHours:
-    """Time range, defined by start and end time"""
+    """Time range, defined by start and end time, stored as minutes of the day"""
+
+    # time ranges with seconds precision also keep their exact times
+    __slots__ = ('minute_start', 'minute_end', '_exact_times')
 
     def __init__(self, time_start, time_end):
         """
@@ -52,13 +70,37 @@ class WorkHours:
         if time_start > time_end:
             raise ValueError("time_start can't be grater than time_end")
 
-        self.time_start = time_start
-        self.time_end = time_end
+        self.minute_start = _to_minutes(time_start)
+        self.minute_end = _to_minutes(time_end)
+        self._exact_times = None
+        if not (_is_minute_aligned(time_start) and _is_minute_aligned(time_end)):
+            self._exact_times = (time_start, time_end)
+
+    @property
+    def time_start(self) -> time:
+        """time start inclusive"""
+        if self._exact_times is None:
+            return MINUTE_TIMES[self.minute_start]
+        return self._exact_times[0]
+
+    @property
+    def time_end(self) -> time:
+        """time end inclusive"""
+        if self._exact_times is None:
+            return MINUTE_TIMES[self.minute_end]
+        return self._exact_times[1]
+
+    @property
+    def minute_aligned(self) -> bool:
+        """time range has no seconds or microseconds"""
+        return self._exact_times is None
 
 
 class WeekdayWorkHours(WorkHours):
     """Work schedule defined by day of the week and time range"""
 
+    __slots__ = ('weekday',)
+
     def __init__(self, weekday: int, time_start: time, time_end: time):
         """
         Define work hours through day of the week, and time range
@@ -73,6 +115,23 @@ class WeekdayWorkHours(WorkHours):
 
         self.weekday = weekday
 
+    @classmethod
+    def from_minutes(cls, weekday: int, minute_start: int, minute_end: int) -> 'WeekdayWorkHours':
+        """
+        Creates work hours from minutes of the day that were already validated, skipping validation
+
+        :param weekday: day of the week, 0 - monday, 6 - sunday
+        :param minute_start: minute of the day inclusive
+        :param minute_end: minute of the day inclusive
+        :return: WeekdayWorkHours
+        """
+        work_hours = cls.__new__(cls)
+        work_hours.weekday = weekday
+        work_hours.minute_start = MINUTES[minute_start]
+        work_hours.minute_end = MINUTES[minute_end]
+        work_hours._exact_times = None
+        return work_hours
+
     def __eq__(self, other):
         return self.weekday == other.weekday and \
                self.time_start == other.time_start and \
@@ -85,6 +144,8 @@ class WeekdayWorkHours(WorkHours):
 class WorkHoursWage(WorkHours):
     """Wage for a time range"""
 
+    __slots__ = ('amount',)
+
     def __init__(self, time_start: time, time_end: time, amount: int):
         """
         Wage in a determinate time range
@@ -108,6 +169,16 @@ class WorkHoursWage(WorkHours):
         :param time_end: schedule end
         :return: amount of money
         """
+        return self.get_hours(time_start, time_end) * self.amount
+
+    def get_hours(self, time_start: time, time_end: time) -> int:
+        """
+        Calculates whole hours of the supplied schedule worked within this wage time range
+
+        :param time_start: schedule start
+        :param time_end: schedule end
+        :return: hours worked, truncated
+        """
         if time_end == time(hour=0, minute=0):
             # shift 1 minute back to keep time in same day
             time_end = time(hour=23, minute=59)
@@ -123,7 +194,7 @@ class WorkHoursWage(WorkHours):
             seconds_worked = (clamp_time_end - clamp_time_start).seconds + 60
             hours_worked = int(seconds_worked / 3600)
 
-        return hours_worked * self.amount
+        return hours_worked
 
 
 class PayRate:
@@ -179,9 +250,253 @@ class PayRate:
         return salary
 
 
+class RateTable:
+    """Pay rates compiled into a minute of the week wage band table"""
+
+    def __init__(self, rates: list[PayRate], weekday_rates: Optional[list[PayRate]] = None):
+        """
+        Compiles pay rates so every minute of the week points to the wage band covering it,
+        full band wages are accumulated into prefix sums so a shift is priced in constant time
+        regardless of the amount of wage bands
+
+        :param rates: pay rates covering all 7 days
+        :param weekday_rates: pay rate applying on each weekday, defaults to the first of rates covering it
+        """
+        self.rates = rates
+        if weekday_rates is None:
+            weekday_rates = [next(rate for rate in rates if rate.day_range.contains(weekday)) for weekday in range(7)]
+        self.weekday_rates = weekday_rates
+
+        # wage band bounds in minutes of the day, bands are laid out in weekday order
+        self.band_starts: list[int] = []
+        self.band_ends: list[int] = []
+        self.band_amounts: list[int] = []
+        self.band_wages: list[WorkHoursWage] = []
+        # wage_prefix[i] is the wage of working every band before band i in full
+        self.wage_prefix: list[int] = [0]
+        self.minute_bands: list[int] = [0] * (7 * MINUTES_PER_DAY)
+
+        # wages defined with seconds precision are priced by the rates themselves
+        self.compiled = all(hourly_wage.minute_aligned for rate in weekday_rates for hourly_wage in rate.hourly_wages)
+        if not self.compiled:
+            return
+
+        for weekday, rate in enumerate(weekday_rates):
+            day_offset = weekday * MINUTES_PER_DAY
+
+            for hourly_wage in rate.hourly_wages:
+                band = len(self.band_starts)
+                band_start = hourly_wage.minute_start
+                band_end = hourly_wage.minute_end
+
+                self.band_starts.append(band_start)
+                self.band_ends.append(band_end)
+                self.band_amounts.append(hourly_wage.amount)
+                self.band_wages.append(hourly_wage)
+                # hours get truncated per band, same as WorkHoursWage.get_wage
+                self.wage_prefix.append(self.wage_prefix[-1] + (band_end - band_start + 1) // 60 * hourly_wage.amount)
+                self.minute_bands[day_offset + band_start:day_offset + band_end + 1] = \
+                    [band] * (band_end - band_start + 1)
+
+    def calculate_salary(self, schedule: WeekdayWorkHours) -> int:
+        """
+        Calculate salary for supplied schedule, matches PayRate.calculate_salary of the weekday pay rate
+
+        :param schedule: worked day and hours
+        :return: amount of money
+        """
+        if not self.compiled or not schedule.minute_aligned:
+            return self.weekday_rates[schedule.weekday].calculate_salary(schedule)
+
+        minute_start = schedule.minute_start
+        minute_end = schedule.minute_end
+        if minute_end == 0:
+            # shift 1 minute back to keep time in same day
+            minute_end = MINUTES_PER_DAY - 1
+        if minute_start > minute_end:
+            raise ValueError("Invalid time range")
+
+        day_offset = schedule.weekday * MINUTES_PER_DAY
+        first_band = self.minute_bands[day_offset + minute_start]
+        last_band = self.minute_bands[day_offset + minute_end]
+        first_start = self.band_starts[first_band]
+        first_end = self.band_ends[first_band]
+
+        if first_band == last_band:
+            if minute_end > first_start and minute_start < first_end:
+                return (minute_end - minute_start + 1) // 60 * self.band_amounts[first_band]
+            return 0
+
+        # bands in between are worked in full
+        salary = self.wage_prefix[last_band] - self.wage_prefix[first_band + 1]
+        if minute_start < first_end:
+            salary += (first_end - minute_start + 1) // 60 * self.band_amounts[first_band]
+        last_start = self.band_starts[last_band]
+        if minute_end > last_start:
+            salary += (minute_end - last_start + 1) // 60 * self.band_amounts[last_band]
+
+        return salary
+
+
+class ShiftPriceCache:
+    """Size bounded least recently used cache of shift prices, can be shared between payrolls"""
+
+    def __init__(self, maxsize: int):
+        """
+        Creates an empty cache
+
+        :param maxsize: maximum amount of cached shift prices
+        """
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # keyed by rate table and shift, most recently used last
+        self._prices: OrderedDict[tuple, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._prices)
+
+    def calculate_salary(self, rate_table: RateTable, schedule: WeekdayWorkHours) -> int:
+        """
+        Calculate salary for supplied schedule, reusing the price of an identical shift
+
+        :param rate_table: rate table pricing the shift
+        :param schedule: worked day and hours
+        :return: amount of money
+        """
+        return self.calculate_shifts_salary(rate_table, (schedule,))
+
+    def calculate_shifts_salary(self, rate_table: RateTable, schedules: Iterable[WeekdayWorkHours]) -> int:
+        """
+        Calculate salary for every supplied schedule, reusing the price of identical shifts,
+        the lock is taken once for all of them, missing shifts are priced within it as the rate table takes
+        constant time
+
+        :param rate_table: rate table pricing the shifts
+        :param schedules: worked days and hours, like the shifts of an employee
+        :return: amount of money
+        """
+        prices = self._prices
+        salary = 0
+
+        with self._lock:
+            for schedule in schedules:
+                if schedule.minute_aligned:
+                    key = (rate_table, schedule.weekday, schedule.minute_start, schedule.minute_end)
+                else:
+                    key = (rate_table, schedule.weekday, schedule.time_start, schedule.time_end)
+
+                price = prices.get(key)
+                if price is None:
+                    self.misses += 1
+                    price = prices[key] = rate_table.calculate_salary(schedule)
+                    if len(prices) > self.maxsize:
+                        prices.popitem(last=False)
+                        self.evictions += 1
+                else:
+                    self.hits += 1
+                    prices.move_to_end(key)
+                salary += price
+
+        return salary
+
+    def clear(self):
+        """Drops every cached price and resets the statistics"""
+        with self._lock:
+            self._prices.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+def _to_minutes(value: time) -> int:
+    """minutes elapsed since 00:00, shared between all time ranges"""
+    return MINUTES[value.hour * 60 + value.minute]
+
+
+def _is_minute_aligned(value: time) -> bool:
+    """time has no seconds or microseconds"""
+    return not (value.second or value.microsecond)
+
+
+def _sort_week_rates(rates: list[PayRate]):
+    """orders rates by weekday, checking they cover all 7 days without overlapping"""
+    rates.sort(key=lambda r: r.day_range.weekday_start)
+
+    last_day = 0
+    for rate in rates:
+        if last_day != rate.day_range.weekday_start:
+            raise ValueError(
+                f'payroll rates are missing days between day {last_day} and {rate.day_range.weekday_start}'
+            )
+        elif last_day > rate.day_range.weekday_start:
+            raise ValueError('payroll rates have overlapping days')
+
+        last_day = rate.day_range.weekday_end + 1
+
+    if last_day != 7:
+        raise ValueError('payroll rates are missing days')
+
+
+class RateSet:
+    """Pay rates of a contract, applying to employee groups over a date range"""
+
+    def __init__(self, rates: list[PayRate], groups: list[str], effective_from: Optional[date] = None,
+                 effective_to: Optional[date] = None):
+        """
+        Creates a rate set, days outside the date range are paid with the payroll rates
+
+        :param rates: pay rates covering all 7 days
+        :param groups: employee groups paid with this rate set
+        :param effective_from: first day the rates apply, inclusive, unbounded if None
+        :param effective_to: last day the rates apply, inclusive, unbounded if None
+        """
+        if isinstance(groups, str):
+            # a single name would be taken as one group per letter
+            raise ValueError(f"groups must be a list of group names, not a single name - supplied '{groups}'")
+        if not groups:
+            raise ValueError('rate set must apply to at least one group')
+        if effective_from is not None and effective_to is not None and effective_to < effective_from:
+            raise ValueError("effective_from can't be grater than effective_to")
+
+        _sort_week_rates(rates)
+
+        self.rates = rates
+        self.groups = frozenset(groups)
+        self.effective_from = effective_from
+        self.effective_to = effective_to
+
+    def is_effective(self, day: Optional[date]) -> bool:
+        """
+        Check if the rates apply on a day
+
+        :param day: day to check, if None only rate sets without date range apply
+        :return: do the rates apply
+        """
+        if day is None:
+            return self.effective_from is None and self.effective_to is None
+
+        return (self.effective_from is None or self.effective_from <= day) and \
+            (self.effective_to is None or day <= self.effective_to)
+
+    def get_rate(self, weekday: int) -> PayRate:
+        """
+        Pay rate covering a day of the week
+
+        :param weekday: day of the week
+        :return: pay rate
+        """
+        return next(rate for rate in self.rates if rate.day_range.contains(weekday))
+
+
 class EmployeeSchedule:
     """Individual employee worked hours"""
 
+    __slots__ = ('name', 'work_hours')
+
     def __init__(self, name: str, work_hours: list[WeekdayWorkHours]):
         """
         Create employee schedule based on worked hours
@@ -206,60 +521,385 @@ class EmployeeSchedule:
 
 
 class Payroll:
-    """Holds pay rates and employee schedules"""
-
-    def __init__(self, rates: list[PayRate]):
+    """
+    Holds pay rates and employee schedules, safe to share between threads:
+    changes hold a lock only to update the payroll, pricing works on a snapshot outside of it
+    """
+
+    def __init__(self, rates: list[PayRate], shift_cache: Optional[ShiftPriceCache] = None,
+                 metrics: Optional[Metrics] = None, rate_sets: Optional[list[RateSet]] = None,
+                 period_start: Optional[date] = None):
         """
         Creates a payroll with the supplied pay rates
 
-        :param rates: list of pay rates
+        :param rates: list of pay rates, for every group and day without a rate set
+        :param shift_cache: optional cache of shift prices, only worth it for rates or shifts with seconds precision,
+            a compiled rate table prices a shift about as fast as a cache lookup
+        :param metrics: optional metrics recording the rates and price stages, not to be shared between threads
+        :param rate_sets: optional rate sets of employee groups
+        :param period_start: monday of the week paid, picks the rate sets effective each day
         """
-        # order rates by weekday
-        rates.sort(key=lambda r: r.day_range.weekday_start)
+        self.shift_cache = shift_cache
+        self.metrics = metrics or NO_METRICS
+        # guards every change, bumping the version, salaries priced against an older version aren't kept
+        self._lock = threading.Lock()
+        self._version = 0
+        self._rates_version = 0
+        self._rate_sets: list[RateSet] = list(rate_sets or [])
+        self._period_start = None
+        # rate tables compiled by the pay rate of each weekday, shared between groups, and each group table
+        self._rate_tables: dict[tuple[PayRate, ...], RateTable] = {}
+        self._group_rate_tables: dict[str, RateTable] = {}
+        # employee schedules indexed by name, in insertion order
+        self._employee_schedules: dict[str, EmployeeSchedule] = {}
+        self._employee_groups: dict[str, str] = {}
+        # salary of every employee in payroll order, patched by each change, and the schedules not priced yet,
+        # whose salary is stale or None
+        self._salaries: dict[str, Optional[int]] = {}
+        self._unpriced: dict[str, EmployeeSchedule] = {}
+        self._employees_payroll: Optional[tuple[tuple[str, int], ...]] = None
 
-        # check rates cover all 7 days
-        last_day = 0
-        for rate in rates:
-            if last_day != rate.day_range.weekday_start:
-                raise ValueError(
-                    f'payroll rates are missing days between day {last_day} and {rate.day_range.weekday_start}'
-                )
-            elif last_day > rate.day_range.weekday_start:
-                raise ValueError('payroll rates have overlapping days')
+        self.rates = rates
+        self.period_start = period_start
 
-            last_day = rate.day_range.weekday_end + 1
+    @property
+    def rates(self) -> list[PayRate]:
+        """pay rates ordered by weekday"""
+        return self._rates
 
-        if last_day != 7:
-            raise ValueError('payroll rates are missing days')
+    @rates.setter
+    def rates(self, rates: list[PayRate]):
+        """
+        Sets the pay rates, every salary gets priced again
 
-        self.rates = rates
-        self.employee_schedules: list[EmployeeSchedule] = []
+        :param rates: list of pay rates
+        """
+        with self.metrics.stage('rates', items=len(rates)):
+            _sort_week_rates(rates)
+            rate_table = RateTable(rates)
+
+        with self._lock:
+            self._rates = rates
+            self.rate_table = rate_table
+            self._clear_rate_tables()
+
+    @property
+    def period_start(self) -> Optional[date]:
+        """monday of the week paid, if None only rate sets without date range apply"""
+        return self._period_start
+
+    @period_start.setter
+    def period_start(self, period_start: Optional[date]):
+        if period_start is not None and period_start.weekday() != 0:
+            raise ValueError(f'period start {period_start} is not a monday')
+
+        with self._lock:
+            self._period_start = period_start
+            self._clear_rate_tables()
+
+    @property
+    def rate_sets(self) -> list[RateSet]:
+        """rate sets in the order they were added"""
+        with self._lock:
+            return list(self._rate_sets)
+
+    def add_rate_set(self, rate_set: RateSet):
+        """
+        Adds a rate set, every salary gets priced again
 
-    def add_employee_schedule(self, schedule: EmployeeSchedule):
+        :param rate_set: rate set
+        """
+        with self._lock:
+            self._rate_sets.append(rate_set)
+            self._clear_rate_tables()
+
+    def _clear_rate_tables(self):
+        """drops rate tables and every salary priced with them, callers hold the lock"""
+        self._version += 1
+        self._rates_version += 1
+        self._rate_tables = {tuple(self.rate_table.weekday_rates): self.rate_table}
+        self._group_rate_tables.clear()
+        self._unpriced = self._employee_schedules.copy()
+        self._employees_payroll = None
+
+    def get_rate_table(self, group: str = DEFAULT_GROUP) -> RateTable:
+        """
+        Rate table of an employee group, each day paid with the latest effective rate set of the group,
+        or the payroll rates if there's none, groups paid the same share their rate table
+
+        :param group: employee group
+        :return: compiled rate table
+        """
+        with self._lock:
+            return self._get_rate_table(group)
+
+    def _get_rate_table(self, group: str) -> RateTable:
+        """rate table of an employee group, callers hold the lock"""
+        try:
+            return self._group_rate_tables[group]
+        except KeyError:
+            pass
+
+        weekday_rates = []
+        for weekday, rate in enumerate(self.rate_table.weekday_rates):
+            day = None if self._period_start is None else self._period_start + timedelta(days=weekday)
+            rate_sets = [rate_set for rate_set in self._rate_sets
+                         if group in rate_set.groups and rate_set.is_effective(day)]
+            if rate_sets:
+                # later changes take over, the last added wins between sets starting on the same day
+                latest = max(reversed(rate_sets), key=lambda rate_set: rate_set.effective_from or date.min)
+                rate = latest.get_rate(weekday)
+            weekday_rates.append(rate)
+
+        key = tuple(weekday_rates)
+        rate_table = self._rate_tables.get(key)
+        if rate_table is None:
+            with self.metrics.stage('rates', items=len(set(weekday_rates))):
+                rate_table = RateTable(list(dict.fromkeys(weekday_rates)), weekday_rates)
+            self._rate_tables[key] = rate_table
+
+        self._group_rate_tables[group] = rate_table
+        return rate_table
+
+    @property
+    def employee_schedules(self) -> list[EmployeeSchedule]:
+        """employee schedules in the order they were added"""
+        with self._lock:
+            return list(self._employee_schedules.values())
+
+    def snapshot(self) -> list[tuple[EmployeeSchedule, str]]:
+        """
+        Employee schedules along their group, in the order they were added, as of a single point in time
+
+        :return: list of schedule-group tuples
+        """
+        with self._lock:
+            schedules = list(self._employee_schedules.values())
+            groups = self._employee_groups.copy()
+        return [(schedule, groups.get(schedule.name, DEFAULT_GROUP)) for schedule in schedules]
+
+    def add_employee_schedule(self, schedule: EmployeeSchedule, group: str = DEFAULT_GROUP):
         """
         Adds employee schedule to payroll
 
         :param schedule: employee schedule
+        :param group: employee group, picks the rate sets paying the employee
+        """
+        with self._lock:
+            if schedule.name in self._employee_schedules:
+                raise ValueError('found duplicated employee in payroll')
+
+            self._employee_schedules[schedule.name] = schedule
+            if group != DEFAULT_GROUP:
+                self._employee_groups[schedule.name] = group
+            self._salaries[schedule.name] = None
+            self._unpriced[schedule.name] = schedule
+            self._version += 1
+            self._employees_payroll = None
+
+    def get_employee_group(self, name: str) -> str:
+        """
+        Looks up an employee group
+
+        :param name: employee name
+        :return: employee group
+        """
+        with self._lock:
+            if name not in self._employee_schedules:
+                raise ValueError(f'employee {name} not found in payroll')
+
+            return self._employee_groups.get(name, DEFAULT_GROUP)
+
+    def get_employee_schedule(self, name: str) -> EmployeeSchedule:
+        """
+        Looks up an employee schedule
+
+        :param name: employee name
+        :return: employee schedule
+        """
+        try:
+            return self._employee_schedules[name]
+        except KeyError:
+            raise ValueError(f'employee {name} not found in payroll')
+
+    def replace_employee_schedule(self, schedule: EmployeeSchedule, group: Optional[str] = None):
+        """
+        Replaces an existing employee schedule, keeping its position in the payroll
+
+        :param schedule: new employee schedule
+        :param group: new employee group, keeps the current one if None
+        """
+        with self._lock:
+            if schedule.name not in self._employee_schedules:
+                raise ValueError(f'employee {schedule.name} not found in payroll')
+
+            self._employee_schedules[schedule.name] = schedule
+            if group == DEFAULT_GROUP:
+                self._employee_groups.pop(schedule.name, None)
+            elif group is not None:
+                self._employee_groups[schedule.name] = group
+            self._unpriced[schedule.name] = schedule
+            self._version += 1
+            self._employees_payroll = None
+
+    def remove_employee_schedule(self, name: str) -> EmployeeSchedule:
+        """
+        Removes an employee schedule from payroll
+
+        :param name: employee name
+        :return: removed employee schedule
+        """
+        with self._lock:
+            try:
+                schedule = self._employee_schedules.pop(name)
+            except KeyError:
+                raise ValueError(f'employee {name} not found in payroll')
+
+            self._employee_groups.pop(name, None)
+            del self._salaries[name]
+            self._unpriced.pop(name, None)
+            self._version += 1
+            self._employees_payroll = None
+            return schedule
+
+    def calculate_salary(self, schedule: EmployeeSchedule, group: str = DEFAULT_GROUP) -> int:
+        """
+        Calculates an employee salary based on pay rates
+
+        :param schedule: employee schedule
+        :param group: employee group, picks the rate sets paying the employee
+        :return: amount of money
+        """
+        rate_table = self.rate_table if group == DEFAULT_GROUP and not self._rate_sets else self.get_rate_table(group)
+        return self._price_schedule(schedule, rate_table)
+
+    def _price_schedule(self, schedule: EmployeeSchedule, rate_table: RateTable) -> int:
+        """salary of a schedule priced with a rate table taken along the schedule"""
+        if self.shift_cache is not None:
+            return self.shift_cache.calculate_shifts_salary(rate_table, schedule.work_hours)
+
+        calculate_salary = rate_table.calculate_salary
+        return sum(calculate_salary(work_hours) for work_hours in schedule.work_hours)
+
+    def _snapshot_pricing(self) -> tuple[dict[str, EmployeeSchedule], dict[str, str], dict[str, RateTable]]:
+        """
+        Copies of the schedules not priced yet and of the groups, and the rate table of every group, as of now,
+        callers hold the lock. Only copies in C are taken, so writers wait as little as possible
+        """
+        groups = self._employee_groups.copy()
+        rate_tables = {group: self._get_rate_table(group) for group in {DEFAULT_GROUP, *groups.values()}}
+        return self._unpriced.copy(), groups, rate_tables
+
+    def _keep_salary(self, name: str, schedule: EmployeeSchedule, group: str, salary: int, rates_version: int):
+        """keeps a salary priced from a snapshot as long as nothing it depends on changed, callers hold the lock"""
+        if rates_version == self._rates_version and self._unpriced.get(name) is schedule \
+                and self._employee_groups.get(name, DEFAULT_GROUP) == group:
+            self._salaries[name] = salary
+            del self._unpriced[name]
+
+    def get_employee_salary(self, name: str) -> int:
         """
-        if any([employee.name == schedule.name for employee in self.employee_schedules]):
-            raise ValueError('found duplicated employee in payroll')
+        Calculates an employee salary, reusing it until the schedule or pay rates change
 
-        self.employee_schedules.append(schedule)
+        :param name: employee name
+        :return: amount of money
+        """
+        with self._lock:
+            if name not in self._employee_schedules:
+                raise ValueError(f'employee {name} not found in payroll')
+            schedule = self._unpriced.get(name)
+            if schedule is None:
+                return self._salaries[name]
+
+            group = self._employee_groups.get(name, DEFAULT_GROUP)
+            rate_table = self._get_rate_table(group)
+            rates_version = self._rates_version
+
+        salary = self._price_schedule(schedule, rate_table)
+        with self._lock:
+            self._keep_salary(name, schedule, group, salary, rates_version)
+        return salary
 
     def get_employees_payroll(self) -> tuple[tuple[str, int], ...]:
         """
-        Calculates employees salaries based on pay rates and schedules
+        Calculates employees salaries based on pay rates and schedules, as of a single point in time,
+        only employees added or replaced since the last call get priced, with the rate tables of that point in time
 
         :returns: tuple of employee-salary tuples
         """
-        payroll = []
-
-        for employee in self.employee_schedules:
-            salary = 0
-            for work_hours in employee.work_hours:
-                for rate in self.rates:
-                    salary += rate.calculate_salary(work_hours)
+        with self._lock:
+            if self._employees_payroll is not None:
+                return self._employees_payroll
+            if not self._unpriced:
+                self._employees_payroll = tuple(self._salaries.items())
+                return self._employees_payroll
+
+            version = self._version
+            rates_version = self._rates_version
+            salaries = self._salaries.copy()
+            unpriced, groups, rate_tables = self._snapshot_pricing()
+
+        # priced outside the lock, changes made meanwhile show up in the next call
+        with self.metrics.stage('price'):
+            for name, schedule in unpriced.items():
+                salaries[name] = self._price_schedule(schedule, rate_tables[groups.get(name, DEFAULT_GROUP)])
+        self.metrics.count('price', len(unpriced))
+
+        employees_payroll = tuple(salaries.items())
+        with self._lock:
+            if version == self._version:
+                # nothing changed meanwhile, the snapshot priced is the payroll
+                self._salaries = salaries
+                self._unpriced.clear()
+                self._employees_payroll = employees_payroll
+            elif rates_version == self._rates_version:
+                kept = self._unpriced
+                for name, schedule in unpriced.items():
+                    if kept.get(name) is schedule \
+                            and self._employee_groups.get(name, DEFAULT_GROUP) == groups.get(name, DEFAULT_GROUP):
+                        self._salaries[name] = salaries[name]
+                        del kept[name]
+
+        return employees_payroll
+
+    def iter_employees_payroll(self, min_salary: Optional[int] = None) -> Iterator[tuple[str, int]]:
+        """
+        Lazily yields employees salaries in payroll order, each employee gets priced only when reached,
+        salaries priced before are reused and the ones priced here are kept for later calls
 
-            payroll.append((employee.name, salary))
+        :param min_salary: only yield employees earning at least this amount
+        :return: an iterator of employee-salary tuples
+        """
+        with self._lock:
+            employees_payroll = self._employees_payroll
+            if employees_payroll is None:
+                salaries = list(self._salaries.items())
+                unpriced, groups, rate_tables = self._snapshot_pricing()
+                rates_version = self._rates_version
+
+        if employees_payroll is not None:
+            for name, salary in employees_payroll:
+                if min_salary is None or salary >= min_salary:
+                    yield name, salary
+            return
+
+        for name, salary in salaries:
+            schedule = unpriced.get(name)
+            if schedule is not None:
+                group = groups.get(name, DEFAULT_GROUP)
+                with self.metrics.stage('price', items=1):
+                    salary = self._price_schedule(schedule, rate_tables[group])
+                with self._lock:
+                    self._keep_salary(name, schedule, group, salary, rates_version)
+
+            if min_salary is None or salary >= min_salary:
+                yield name, salary
+
+    def get_top_employees_payroll(self, n: int) -> list[tuple[str, int]]:
+        """
+        Employees earning the most, keeping only n salaries in memory at a time
 
-        return tuple(payroll)
+        :param n: amount of employees
+        :return: list of employee-salary tuples, highest salary first, ties in payroll order
+        """
+        return heapq.nlargest(n, self.iter_employees_payroll(), key=lambda employee_salary: employee_salary[1])
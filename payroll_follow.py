@@ -0,0 +1,186 @@
+import argparse
+import os
+import sys
+import time
+from typing import Optional, TextIO
+
+from acme_payroll import OUTPUT_FORMATS, RejectLog, parse_employee_schedule_bytes, set_up_payroll
+from payroll import Payroll
+
+POLL_INTERVAL = 1.0
+READ_SIZE = 4 * 1024 * 1024
+
+
+class PayrollFollower:
+    """
+    Follows a schedules file that keeps getting lines appended, pricing only the new lines.
+    A line for an employee already in the payroll replaces the employee schedule, on purpose unlike a run over the
+    whole file, which stops on a duplicated employee or rejects the line, a time-clock feed appends corrections.
+    When the file gets truncated or replaced by a new one, as log rotation does, the payroll starts over,
+    so it only holds the employees of the current file
+    """
+
+    def __init__(self, filename: str, payroll: Optional[Payroll] = None, rejects: Optional[RejectLog] = None):
+        """
+        Creates a follower, nothing gets read until the first poll
+
+        :param filename: schedules filename, doesn't need to exist yet
+        :param payroll: payroll holding the pay rates, defaults to the weekday-weekend payroll
+        :param rejects: lenient mode, malformed lines are recorded here and skipped instead of raising
+        """
+        self.filename = filename
+        self.payroll = payroll or set_up_payroll()
+        self.rejects = rejects
+        # byte offset of the first line not parsed yet, and lines parsed so far
+        self.offset = 0
+        self.lines = 0
+        # device and inode of the followed file, a different one means the file got replaced
+        self._file_id: Optional[tuple[int, int]] = None
+
+    def _start_over(self):
+        """forgets every employee, the followed file is a new one"""
+        for schedule in self.payroll.employee_schedules:
+            self.payroll.remove_employee_schedule(schedule.name)
+        self.offset = 0
+        self.lines = 0
+
+    def poll(self) -> list[tuple[str, int]]:
+        """
+        Parses and prices the complete lines appended since the last poll, a line still being written waits for its
+        line break. Without rejects a malformed line stops the poll: the employees of the lines before it are returned,
+        and the next poll starts at that line and raises with its line number
+
+        :return: employee-salary tuples of the employees added or updated, in line order
+        """
+        try:
+            data_file = open(self.filename, 'rb')
+        except FileNotFoundError:
+            # rotated away, the new file isn't there yet
+            return []
+
+        with data_file:
+            stat = os.fstat(data_file.fileno())
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self._file_id or stat.st_size < self.offset:
+                self._file_id = file_id
+                self._start_over()
+
+            updated = {}
+            data_file.seek(self.offset)
+            try:
+                while data := data_file.read(READ_SIZE):
+                    complete_end = data.rfind(b'\n') + 1
+                    if complete_end == 0:
+                        break
+
+                    self._add_lines(data, complete_end, updated)
+                    data_file.seek(self.offset)
+            except ValueError:
+                # offset and lines stop at the malformed line, report the employees applied before it first
+                if not updated:
+                    raise
+
+        get_employee_salary = self.payroll.get_employee_salary
+        return [(name, get_employee_salary(name)) for name in updated]
+
+    def _add_lines(self, data: bytes, data_end: int, updated: dict[str, None]):
+        """
+        Adds or replaces the schedule of each line, adding the employee names to updated.
+        Offset and lines move past each line once it's applied, so a malformed line raises with the same line number
+        however many times it gets read again
+        """
+        payroll = self.payroll
+        data_offset = self.offset
+        line_start = 0
+
+        try:
+            while line_start < data_end:
+                line_end = data.find(b'\n', line_start, data_end)
+                next_line_start = line_end + 1
+                line = self.lines + 1
+
+                if line_end > line_start and data[line_end - 1] == 13:
+                    # drop the carriage return of windows line breaks
+                    line_end -= 1
+
+                try:
+                    schedule = parse_employee_schedule_bytes(data, line_start, line_end)
+                except ValueError as ve:
+                    if self.rejects is None:
+                        raise ValueError(f'line {line}: {ve}')
+                    self.rejects.reject(line, data[line_start:line_end], ve)
+                else:
+                    try:
+                        payroll.replace_employee_schedule(schedule)
+                    except ValueError:
+                        payroll.add_employee_schedule(schedule)
+                    updated[schedule.name] = None
+
+                self.lines = line
+                self.offset = data_offset + next_line_start
+                line_start = next_line_start
+        finally:
+            if self.rejects is not None:
+                self.rejects.flush()
+
+
+def follow(follower: PayrollFollower, output: TextIO, output_format: str = 'text', interval: float = POLL_INTERVAL,
+           max_polls: Optional[int] = None):
+    """
+    Polls the followed file, writing the salary of each employee added or updated as soon as it's priced
+
+    :param follower: payroll follower
+    :param output: file to write salaries to
+    :param output_format: one of OUTPUT_FORMATS
+    :param interval: seconds to wait between polls
+    :param max_polls: stop after this many polls, follows forever if None
+    """
+    try:
+        header, format_rows = OUTPUT_FORMATS[output_format]
+    except KeyError:
+        raise ValueError(f'Invalid output format: {output_format}')
+
+    output.write(header)
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        if polls:
+            time.sleep(interval)
+
+        salaries = follower.poll()
+        if salaries:
+            output.write(format_rows(salaries))
+        output.flush()
+        polls += 1
+
+
+def main(args: Optional[list[str]] = None):
+    """
+    Command line entry point
+
+    :param args: command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(
+        description='Follows an employee schedules file as lines get appended, printing each updated salary'
+    )
+    parser.add_argument('filename', help='employee schedules txt file')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='seconds between polls')
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='text', help='payroll output format')
+    parser.add_argument('--reject-file',
+                        help='lenient mode, write malformed lines to this file as json lines and keep going')
+    arguments = parser.parse_args(args)
+
+    reject_output = open(arguments.reject_file, 'a') if arguments.reject_file else None
+    follower = PayrollFollower(arguments.filename, rejects=RejectLog(reject_output) if reject_output else None)
+    try:
+        follow(follower, sys.stdout, arguments.format, arguments.interval)
+    except ValueError as ve:
+        print(f'Error while parsing the input data; {ve}')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if reject_output is not None:
+            reject_output.close()
+
+
+if __name__ == '__main__':
+    main()
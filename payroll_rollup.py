@@ -0,0 +1,230 @@
+import csv
+import json
+from array import array
+from operator import mul
+from typing import Iterator, TextIO
+
+from acme_payroll import WEEKDAYS
+from payroll import MINUTES_PER_DAY, EmployeeSchedule, Payroll, RateTable, WeekdayWorkHours, WorkHoursWage
+
+ROLLUP_FIELDS = ('name', 'weekday', 'band_start', 'band_end', 'amount', 'hours', 'pay')
+
+
+class PayrollRollup:
+    """
+    Hours and pay per employee, weekday and wage band, accumulated in a single pass over every shift.
+    Only hours get stored, pay is the hours times the band amount, hours are truncated per band as salaries are.
+    Hours are a flat array with a row of every band per employee, 8 bytes per cell, rows get widened when a rate table
+    brings new bands, tuples only get built when reading totals or rows
+    """
+
+    def __init__(self):
+        self.names: list[str] = []
+        # wage bands of every rate table added, as weekday and wage
+        self.bands: list[tuple[int, WorkHoursWage]] = []
+        self._band_ids: dict[tuple[int, int], int] = {}
+        self._table_bands: dict[RateTable, list[int]] = {}
+        self._table_hours: dict[RateTable, tuple[list[int], list[int], list[int]]] = {}
+        # hours of employee e and band b at e * row_size + b
+        self.hours = array('q')
+        self.row_size = 0
+
+    def _table_band_ids(self, rate_table: RateTable) -> list[int]:
+        """rollup band index of each rate table band, every table band gets registered at once"""
+        try:
+            return self._table_bands[rate_table]
+        except KeyError:
+            pass
+
+        band_ids = []
+        for weekday, rate in enumerate(rate_table.weekday_rates):
+            for hourly_wage in rate.hourly_wages:
+                key = (weekday, id(hourly_wage))
+                if key not in self._band_ids:
+                    self._band_ids[key] = len(self.bands)
+                    self.bands.append((weekday, hourly_wage))
+                band_ids.append(self._band_ids[key])
+
+        self._table_bands[rate_table] = band_ids
+        if len(self.bands) != self.row_size:
+            self._widen_rows()
+        return band_ids
+
+    def _widen_rows(self):
+        """gives every row a cell for each band, new bands start at 0 hours"""
+        row_size = len(self.bands)
+        hours = array('q', bytes(8 * row_size * len(self.names)))
+        for row_start in range(len(self.names)):
+            old_start = row_start * self.row_size
+            hours[row_start * row_size:row_start * row_size + self.row_size] = \
+                self.hours[old_start:old_start + self.row_size]
+        self.hours = hours
+        self.row_size = row_size
+
+    def _minute_hours(self, rate_table: RateTable) -> tuple[list[int], list[int], list[int]]:
+        """
+        Whole hours from each minute of the week to its band end, from its band start to the minute,
+        and of each full band, so a shift needs no band bounds
+        """
+        try:
+            return self._table_hours[rate_table]
+        except KeyError:
+            pass
+
+        head_hours = []
+        tail_hours = []
+        for minute_of_week, band in enumerate(rate_table.minute_bands):
+            minute = minute_of_week % MINUTES_PER_DAY
+            head_hours.append((rate_table.band_ends[band] - minute + 1) // 60)
+            tail_hours.append((minute - rate_table.band_starts[band] + 1) // 60)
+        band_hours = [(band_end - band_start + 1) // 60
+                      for band_start, band_end in zip(rate_table.band_starts, rate_table.band_ends)]
+
+        table_hours = self._table_hours[rate_table] = (head_hours, tail_hours, band_hours)
+        return table_hours
+
+    def add(self, schedule: EmployeeSchedule, rate_table: RateTable):
+        """
+        Accumulates the hours of every shift of an employee
+
+        :param schedule: employee schedule
+        :param rate_table: rate table paying the employee
+        """
+        band_ids = self._table_band_ids(rate_table)
+        row = len(self.hours)
+        self.names.append(schedule.name)
+        hours = self.hours
+        hours.frombytes(bytes(8 * self.row_size))
+        minute_bands = rate_table.minute_bands
+        if rate_table.compiled:
+            head_hours, tail_hours, band_hours = self._minute_hours(rate_table)
+
+        for work_hours in schedule.work_hours:
+            if not rate_table.compiled or not work_hours.minute_aligned:
+                self._add_exact(row, work_hours, rate_table)
+                continue
+
+            minute_start = work_hours.minute_start
+            minute_end = work_hours.minute_end
+            if minute_end == 0:
+                # shift 1 minute back to keep time in same day
+                minute_end = MINUTES_PER_DAY - 1
+            if minute_start > minute_end:
+                raise ValueError("Invalid time range")
+
+            # pieces of a band shorter than an hour are worth 0, same as the band bounds checks of get_wage
+            day_offset = work_hours.weekday * MINUTES_PER_DAY
+            start = day_offset + minute_start
+            end = day_offset + minute_end
+            first_band = minute_bands[start]
+            last_band = minute_bands[end]
+
+            if first_band == last_band:
+                shift_hours = (minute_end - minute_start + 1) // 60
+                hours[row + band_ids[first_band]] += shift_hours
+                continue
+
+            hours[row + band_ids[first_band]] += head_hours[start]
+            for band in range(first_band + 1, last_band):
+                hours[row + band_ids[band]] += band_hours[band]
+            hours[row + band_ids[last_band]] += tail_hours[end]
+
+    def _add_exact(self, row: int, work_hours: WeekdayWorkHours, rate_table: RateTable):
+        """accumulates a shift with seconds precision, or paid by wages with seconds precision"""
+        weekday = work_hours.weekday
+        for hourly_wage in rate_table.weekday_rates[weekday].hourly_wages:
+            self.hours[row + self._band_ids[(weekday, id(hourly_wage))]] += \
+                hourly_wage.get_hours(work_hours.time_start, work_hours.time_end)
+
+    def _iter_employee_rows(self) -> Iterator[tuple[str, array]]:
+        """name and hours row of each employee"""
+        hours = self.hours
+        row_size = self.row_size
+        for employee, name in enumerate(self.names):
+            yield name, hours[employee * row_size:(employee + 1) * row_size]
+
+    @property
+    def total_hours(self) -> int:
+        """hours worked by every employee"""
+        return sum(self.hours)
+
+    @property
+    def total_pay(self) -> int:
+        """amount of money paid to every employee, matches the payroll salaries total"""
+        return sum(band_pay for _, _, _, band_pay in self.totals_by_band())
+
+    def totals_by_band(self) -> list[tuple[int, WorkHoursWage, int, int]]:
+        """
+        Hours and pay of each wage band
+
+        :return: list of weekday, wage, hours, pay tuples, in rate table order
+        """
+        band_hours = [sum(self.hours[band::self.row_size]) for band in range(self.row_size)]
+
+        return [
+            (weekday, hourly_wage, hours, hours * hourly_wage.amount)
+            for (weekday, hourly_wage), hours in zip(self.bands, band_hours)
+        ]
+
+    def totals_by_weekday(self) -> list[tuple[int, int]]:
+        """
+        Hours and pay of each weekday
+
+        :return: list of 7 hours-pay tuples, monday first
+        """
+        totals = [(0, 0)] * 7
+        for weekday, _, hours, pay in self.totals_by_band():
+            weekday_hours, weekday_pay = totals[weekday]
+            totals[weekday] = (weekday_hours + hours, weekday_pay + pay)
+        return totals
+
+    def totals_by_employee(self) -> list[tuple[str, int, int]]:
+        """
+        Hours and pay of each employee
+
+        :return: list of name, hours, pay tuples, in the order employees were added
+        """
+        amounts = [hourly_wage.amount for _, hourly_wage in self.bands]
+        return [(name, sum(hours), sum(map(mul, hours, amounts))) for name, hours in self._iter_employee_rows()]
+
+    def iter_rows(self) -> Iterator[tuple[str, str, str, str, int, int, int]]:
+        """
+        Flattens the rollup, one row per employee, weekday and band worked
+
+        :return: an iterator of tuples with the ROLLUP_FIELDS
+        """
+        for name, row in self._iter_employee_rows():
+            for band, hours in enumerate(row):
+                if hours:
+                    weekday, hourly_wage = self.bands[band]
+                    yield (name, WEEKDAYS[weekday], f'{hourly_wage.time_start:%H:%M}',
+                           f'{hourly_wage.time_end:%H:%M}', hourly_wage.amount, hours, hours * hourly_wage.amount)
+
+    def write(self, output: TextIO, output_format: str = 'csv'):
+        """
+        Exports the rollup rows
+
+        :param output: file to write to
+        :param output_format: csv or jsonl
+        """
+        if output_format == 'csv':
+            writer = csv.writer(output, lineterminator='\n')
+            writer.writerow(ROLLUP_FIELDS)
+            writer.writerows(self.iter_rows())
+        elif output_format == 'jsonl':
+            output.writelines(json.dumps(dict(zip(ROLLUP_FIELDS, row))) + '\n' for row in self.iter_rows())
+        else:
+            raise ValueError(f'Invalid output format: {output_format}')
+
+
+def rollup_payroll(payroll: Payroll) -> PayrollRollup:
+    """
+    Rolls up every employee of a payroll, each one with the rate table of its group
+
+    :param payroll: payroll holding pay rates and schedules
+    :return: the rollup
+    """
+    rollup = PayrollRollup()
+    for schedule, group in payroll.snapshot():
+        rollup.add(schedule, payroll.get_rate_table(group))
+    return rollup
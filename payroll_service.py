@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import json
+from typing import Optional
+
+from acme_payroll import parse_employee_schedule_bytes, set_up_payroll
+from payroll import Payroll
+
+BATCH_SIZE = 1024
+# lines of a client waiting for their answer before reading more of it, and answers written between drains
+MAX_PENDING_RESPONSES = 1024
+DRAIN_EVERY = 64
+
+
+class PayrollService:
+    """Prices schedule lines from many clients in batches, keeping a payroll set up between requests"""
+
+    def __init__(self, payroll: Optional[Payroll] = None, batch_size: int = BATCH_SIZE,
+                 max_pending_responses: int = MAX_PENDING_RESPONSES, drain_every: int = DRAIN_EVERY):
+        """
+        Creates a service, start_server accepts clients
+
+        :param payroll: payroll holding the pay rates, defaults to the weekday-weekend payroll
+        :param batch_size: maximum amount of lines priced per batch
+        :param max_pending_responses: lines of a client waiting for their answer, reading the client waits beyond that
+        :param drain_every: answers written before waiting for the client to take them
+        """
+        if max_pending_responses < 1 or drain_every < 1:
+            raise ValueError('max_pending_responses and drain_every must be at least 1')
+
+        self.payroll = payroll or set_up_payroll()
+        self.batch_size = batch_size
+        self.max_pending_responses = max_pending_responses
+        self.drain_every = drain_every
+        # schedule lines waiting to be priced, along the future of their salary
+        self._pending: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    def submit(self, data_line: bytes) -> asyncio.Future:
+        """
+        Queues an employee schedule data line to be priced in the next batch
+
+        :param data_line: employee schedule data line, line break optional
+        :return: future of the employee-salary tuple
+        """
+        if self._batcher is None:
+            self._pending = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._price_batches())
+
+        salary = asyncio.get_running_loop().create_future()
+        self._pending.put_nowait((data_line, salary))
+        return salary
+
+    async def price(self, data_line: bytes) -> tuple[str, int]:
+        """
+        Prices an employee schedule data line along the lines of every other client
+
+        :param data_line: employee schedule data line, line break optional
+        :return: employee-salary tuple
+        """
+        return await self.submit(data_line)
+
+    async def _price_batches(self):
+        """Prices whatever lines are pending, up to batch_size at a time"""
+        while True:
+            batch = [await self._pending.get()]
+            # let every client with a line ready queue it before pricing
+            await asyncio.sleep(0)
+            while len(batch) < self.batch_size and not self._pending.empty():
+                batch.append(self._pending.get_nowait())
+
+            calculate_salary = self.payroll.calculate_salary
+            for data_line, salary in batch:
+                if salary.cancelled():
+                    continue
+                try:
+                    schedule = parse_employee_schedule_bytes(data_line, 0, len(data_line.rstrip(b'\r\n')))
+                    salary.set_result((schedule.name, calculate_salary(schedule)))
+                except Exception as e:
+                    # keep serving every other line, the traceback would keep this suspended frame alive
+                    salary.set_exception(e.with_traceback(None))
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Answers each schedule line with a json line, in the order they were sent,
+        lines sent without waiting for answers are priced in the same batch.
+        A client not reading its answers stops being read once max_pending_responses lines wait for theirs,
+        so a client can't grow the service memory
+
+        :param reader: client stream
+        :param writer: client stream
+        """
+        salaries: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending_responses)
+        responder = asyncio.create_task(self._respond(salaries, writer))
+
+        try:
+            while data_line := await reader.readline():
+                if data_line.strip():
+                    await salaries.put(self.submit(data_line))
+        finally:
+            await salaries.put(None)
+            await responder
+            writer.close()
+
+    async def _respond(self, salaries: asyncio.Queue, writer: asyncio.StreamWriter):
+        """
+        Writes each salary as it gets priced, keeping the request order, draining every drain_every answers
+        and whenever no answer is waiting. Once the client is gone salaries are still taken, so reading never waits
+        """
+        written = 0
+        while (salary := await salaries.get()) is not None:
+            try:
+                name, amount = await salary
+                response = {'name': name, 'salary': amount}
+            except ValueError as ve:
+                response = {'error': str(ve)}
+
+            if writer.is_closing():
+                continue
+            writer.write(json.dumps(response).encode() + b'\n')
+            written += 1
+            if written % self.drain_every == 0 or salaries.empty():
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    writer.close()
+
+    async def start_server(self, host: str = '127.0.0.1', port: int = 0,
+                           path: Optional[str] = None) -> asyncio.AbstractServer:
+        """
+        Starts accepting clients over localhost tcp, or a unix socket when a path is given
+
+        :param host: tcp host
+        :param port: tcp port, 0 picks a free one
+        :param path: unix socket path
+        :return: the listening server
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_client, path=path)
+        return await asyncio.start_server(self.handle_client, host=host, port=port)
+
+    async def close(self):
+        """Stops pricing batches"""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+
+async def serve(host: str, port: int, path: Optional[str]):
+    service = PayrollService()
+    server = await service.start_server(host=host, port=port, path=path)
+
+    for socket in server.sockets:
+        print(f'Serving payroll on {socket.getsockname()}')
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(args: Optional[list[str]] = None):
+    """
+    Command line entry point
+
+    :param args: command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description='Serves the ACME payroll, one employee schedule per line')
+    parser.add_argument('--host', default='127.0.0.1', help='tcp host')
+    parser.add_argument('--port', type=int, default=8765, help='tcp port')
+    parser.add_argument('--unix', help='serve over this unix socket path instead of tcp')
+    arguments = parser.parse_args(args)
+
+    try:
+        asyncio.run(serve(arguments.host, arguments.port, arguments.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
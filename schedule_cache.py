@@ -0,0 +1,159 @@
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Iterator, Optional
+
+from payroll import EmployeeSchedule, WeekdayWorkHours
+
+MAGIC = b'ACMESCH1'
+# magic, source size, source mtime in ns, source sha256 or zeros, employees, shifts, names size
+HEADER = struct.Struct('<8sQq32sQQQ')
+NO_DIGEST = bytes(32)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class SourceKey:
+    """Identifies the contents of a schedules file, by stat or by content hash"""
+
+    __slots__ = ('size', 'mtime_ns', 'digest')
+
+    def __init__(self, filename: str, verify_hash: bool = False):
+        """
+        Reads the key of a schedules file
+
+        :param filename: schedules filename
+        :param verify_hash: hash the file contents instead of trusting its modification time
+        """
+        stat = os.stat(filename)
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.digest = NO_DIGEST
+
+        if verify_hash:
+            digest = hashlib.sha256()
+            with open(filename, 'rb') as data_file:
+                while chunk := data_file.read(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+            self.digest = digest.digest()
+
+    def matches(self, size: int, mtime_ns: int, digest: bytes) -> bool:
+        """
+        Checks a cached key still describes the file
+
+        :param size: cached size
+        :param mtime_ns: cached modification time
+        :param digest: cached content hash
+        :return: the cache is up to date
+        """
+        if self.digest != NO_DIGEST:
+            return size == self.size and digest == self.digest
+        return size == self.size and mtime_ns == self.mtime_ns
+
+
+def cache_filename(filename: str, cache_dir: str) -> str:
+    """
+    Cache file of a schedules file, one per absolute path
+
+    :param filename: schedules filename
+    :param cache_dir: cache directory
+    :return: cache filename
+    """
+    path_digest = hashlib.sha256(os.path.abspath(filename).encode()).hexdigest()
+    return os.path.join(cache_dir, f'{path_digest[:32]}.schedules')
+
+
+def _swap_byte_order(values: array) -> array:
+    """arrays are stored little endian, swaps a copy on big endian machines"""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def write_schedules_cache(cache_file: str, key: SourceKey, names: list[str], shift_counts: array,
+                          weekdays: array, minute_starts: array, minute_ends: array):
+    """
+    Writes parsed schedules as columns, replacing any previous cache at once
+
+    :param cache_file: cache filename
+    :param key: key of the parsed schedules file
+    :param names: employee names
+    :param shift_counts: shifts per employee
+    :param weekdays: weekday of each shift
+    :param minute_starts: start minute of each shift
+    :param minute_ends: end minute of each shift
+    """
+    names_data = '\n'.join(names).encode()
+    cache_dir = os.path.dirname(cache_file)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    temp_file = tempfile.NamedTemporaryFile('wb', dir=cache_dir, delete=False)
+    try:
+        with temp_file:
+            temp_file.write(HEADER.pack(MAGIC, key.size, key.mtime_ns, key.digest, len(names), len(weekdays),
+                                        len(names_data)))
+            temp_file.write(names_data)
+            for values in (shift_counts, weekdays, minute_starts, minute_ends):
+                temp_file.write(_swap_byte_order(values).tobytes())
+        os.replace(temp_file.name, cache_file)
+    except BaseException:
+        os.remove(temp_file.name)
+        raise
+
+
+def read_schedules_cache(cache_file: str, key: SourceKey) -> Optional[tuple[list[str], array, array, array, array]]:
+    """
+    Loads parsed schedules columns with a few bulk reads
+
+    :param cache_file: cache filename
+    :param key: key of the schedules file
+    :return: names, shift counts, weekdays, start and end minutes, or None if there's no up to date cache
+    """
+    try:
+        with open(cache_file, 'rb') as data_file:
+            header = data_file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                return None
+
+            magic, size, mtime_ns, digest, employees, shifts, names_size = HEADER.unpack(header)
+            if magic != MAGIC or not key.matches(size, mtime_ns, digest):
+                return None
+
+            names = data_file.read(names_size).decode().split('\n') if employees else []
+            columns = []
+            for typecode, length in (('I', employees), ('B', shifts), ('H', shifts), ('H', shifts)):
+                values = array(typecode)
+                values.fromfile(data_file, length)
+                columns.append(_swap_byte_order(values))
+    except (OSError, EOFError, ValueError):
+        # missing or corrupt cache
+        return None
+
+    if len(names) != employees:
+        return None
+
+    return names, *columns
+
+
+def iter_cached_schedules(names: list[str], shift_counts: array, weekdays: array, minute_starts: array,
+                          minute_ends: array) -> Iterator[EmployeeSchedule]:
+    """
+    Lazily builds employee schedules out of cached columns
+
+    :param names: employee names
+    :param shift_counts: shifts per employee
+    :param weekdays: weekday of each shift
+    :param minute_starts: start minute of each shift
+    :param minute_ends: end minute of each shift
+    :return: an iterator of EmployeeSchedules
+    """
+    from_minutes = WeekdayWorkHours.from_minutes
+    shift = 0
+
+    for name, shift_count in zip(names, shift_counts):
+        shifts = range(shift, shift + shift_count)
+        yield EmployeeSchedule(name, [from_minutes(weekdays[i], minute_starts[i], minute_ends[i]) for i in shifts])
+        shift += shift_count
@@ -0,0 +1,317 @@
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from acme_payroll import MIN_LINES, iter_employees_schedules_from_file, set_up_payroll, write_payroll
+from batch_pricing import price_shifts
+from payroll import DEFAULT_GROUP, EmployeeSchedule, Payroll, WeekdayWorkHours
+
+BATCH_SIZE = 50000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS rosters (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    loaded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY,
+    roster_id INTEGER NOT NULL REFERENCES rosters (id),
+    name TEXT NOT NULL,
+    employee_group TEXT NOT NULL,
+    salary INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS employees_roster_name ON employees (roster_id, name);
+CREATE INDEX IF NOT EXISTS employees_name ON employees (name);
+CREATE TABLE IF NOT EXISTS shifts (
+    employee_id INTEGER NOT NULL REFERENCES employees (id),
+    weekday INTEGER NOT NULL,
+    minute_start INTEGER NOT NULL,
+    minute_end INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS shifts_employee ON shifts (employee_id);
+CREATE INDEX IF NOT EXISTS shifts_weekday ON shifts (weekday);
+'''
+
+
+class ScheduleStore:
+    """
+    Rosters of employee schedules and their salaries kept in a sqlite database, each roster is a load of schedules,
+    so salaries of past rosters can be queried
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+        """
+        Opens the store, creating its tables if needed
+
+        :param path: database filename, or :memory:
+        :param batch_size: rows per bulk insert or update
+        """
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        # index pages of a large roster load stay in memory
+        self.connection.execute('PRAGMA cache_size = -65536')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def save_roster(self, name: str, schedules: Iterable[EmployeeSchedule], group: str = DEFAULT_GROUP) -> int:
+        """
+        Bulk loads employee schedules as a new roster, in a single transaction
+
+        :param name: roster name, like the schedules filename
+        :param schedules: employee schedules, shifts must not have seconds precision
+        :param group: employee group of every schedule
+        :return: roster id
+        """
+        return self._save(name, ((schedule, group, None) for schedule in schedules))
+
+    def save_payroll(self, name: str, payroll: Payroll) -> int:
+        """
+        Bulk loads every employee of a payroll as a new roster, along their group and salary
+
+        :param name: roster name
+        :param payroll: payroll holding pay rates and schedules
+        :return: roster id
+        """
+        salaries = dict(payroll.get_employees_payroll())
+        return self._save(name, (
+            (schedule, group, salaries.get(schedule.name)) for schedule, group in payroll.snapshot()
+        ))
+
+    def _save(self, name: str, employees: Iterable[tuple[EmployeeSchedule, str, Optional[int]]]) -> int:
+        employees = iter(employees)
+        connection = self.connection
+
+        with connection:
+            loaded_at = datetime.now().isoformat(timespec='seconds')
+            roster_id = connection.execute(
+                'INSERT INTO rosters (name, loaded_at) VALUES (?, ?)', (name, loaded_at)
+            ).lastrowid
+            # employee ids get assigned here, so shifts don't need to wait for each insert
+            employee_id = connection.execute('SELECT COALESCE(MAX(id), 0) FROM employees').fetchone()[0]
+
+            while batch := list(islice(employees, self.batch_size)):
+                employee_rows = []
+                shift_rows = []
+                for schedule, group, salary in batch:
+                    employee_id += 1
+                    employee_rows.append((employee_id, roster_id, schedule.name, group, salary))
+                    for work_hours in schedule.work_hours:
+                        if not work_hours.minute_aligned:
+                            raise ValueError(f"{schedule.name}'s schedule has times with seconds, it can't be stored")
+                        shift_rows.append((employee_id, work_hours.weekday, work_hours.minute_start,
+                                           work_hours.minute_end))
+
+                try:
+                    connection.executemany(
+                        'INSERT INTO employees (id, roster_id, name, employee_group, salary) VALUES (?, ?, ?, ?, ?)',
+                        employee_rows
+                    )
+                except sqlite3.IntegrityError:
+                    raise ValueError('found duplicated employee in payroll')
+                connection.executemany(
+                    'INSERT INTO shifts (employee_id, weekday, minute_start, minute_end) VALUES (?, ?, ?, ?)',
+                    shift_rows
+                )
+
+        return roster_id
+
+    def save_salaries(self, roster_id: int, salaries: Iterable[tuple[str, int]]):
+        """
+        Stores the salaries of a roster employees, in a single transaction
+
+        :param roster_id: roster id
+        :param salaries: employee-salary tuples
+        """
+        salaries = iter(salaries)
+        with self.connection:
+            while batch := list(islice(salaries, self.batch_size)):
+                self.connection.executemany(
+                    'UPDATE employees SET salary = ? WHERE roster_id = ? AND name = ?',
+                    [(salary, roster_id, name) for name, salary in batch]
+                )
+
+    def get_rosters(self) -> list[tuple[int, str, str, int]]:
+        """
+        Every roster stored, oldest first
+
+        :return: list of id, name, loaded at, employees tuples
+        """
+        return self.connection.execute('''
+            SELECT rosters.id, rosters.name, rosters.loaded_at, COUNT(employees.id)
+            FROM rosters LEFT JOIN employees ON employees.roster_id = rosters.id
+            GROUP BY rosters.id ORDER BY rosters.id
+        ''').fetchall()
+
+    def get_employee_history(self, name: str) -> list[tuple[str, str, Optional[int]]]:
+        """
+        Salaries of an employee in every roster, oldest first
+
+        :param name: employee name
+        :return: list of roster name, loaded at, salary tuples, salary is None if the roster wasn't priced
+        """
+        return self.connection.execute('''
+            SELECT rosters.name, rosters.loaded_at, employees.salary
+            FROM employees JOIN rosters ON rosters.id = employees.roster_id
+            WHERE employees.name = ? ORDER BY rosters.id
+        ''', (name,)).fetchall()
+
+    def get_salaries(self, roster_id: int) -> list[tuple[str, Optional[int]]]:
+        """
+        Salaries stored for a roster, in load order
+
+        :param roster_id: roster id
+        :return: list of employee-salary tuples, salary is None if the roster wasn't priced
+        """
+        return self.connection.execute(
+            'SELECT name, salary FROM employees WHERE roster_id = ? ORDER BY id', (roster_id,)
+        ).fetchall()
+
+    def _get_employees(self, roster_id: int) -> list[tuple[int, str, str]]:
+        employees = self.connection.execute(
+            'SELECT id, name, employee_group FROM employees WHERE roster_id = ? ORDER BY id', (roster_id,)
+        ).fetchall()
+        if not employees:
+            raise ValueError(f'roster {roster_id} not found in store')
+        return employees
+
+    def _iter_shifts(self, employees: list[tuple[int, str, str]]) -> Iterator[tuple[int, int, int, int]]:
+        """shifts of a roster employees, in load order, the ids of a roster are contiguous"""
+        return self.connection.execute('''
+            SELECT employee_id, weekday, minute_start, minute_end FROM shifts
+            WHERE employee_id BETWEEN ? AND ? ORDER BY employee_id, rowid
+        ''', (employees[0][0], employees[-1][0]))
+
+    def iter_schedules(self, roster_id: int) -> Iterator[tuple[EmployeeSchedule, str]]:
+        """
+        Rebuilds the employee schedules of a roster straight from the stored shifts
+
+        :param roster_id: roster id
+        :return: an iterator of schedule-group tuples, in load order
+        """
+        employees = self._get_employees(roster_id)
+        from_minutes = WeekdayWorkHours.from_minutes
+        shifts = self._iter_shifts(employees)
+        shift = next(shifts, None)
+
+        for employee_id, name, group in employees:
+            work_hours = []
+            while shift is not None and shift[0] == employee_id:
+                work_hours.append(from_minutes(shift[1], shift[2], shift[3]))
+                shift = next(shifts, None)
+            yield EmployeeSchedule(name, work_hours), group
+
+    def load_payroll(self, roster_id: int, payroll: Optional[Payroll] = None) -> Payroll:
+        """
+        Adds every employee of a roster to a payroll
+
+        :param roster_id: roster id
+        :param payroll: payroll holding the pay rates, defaults to the weekday-weekend payroll
+        :return: the payroll
+        """
+        payroll = payroll or set_up_payroll()
+        for schedule, group in self.iter_schedules(roster_id):
+            payroll.add_employee_schedule(schedule, group)
+        return payroll
+
+    def price_roster(self, roster_id: int, payroll: Optional[Payroll] = None,
+                     backend: Optional[str] = None) -> list[tuple[str, int]]:
+        """
+        Prices a roster straight from the stored shift columns, in batches per rate table, and stores the salaries
+
+        :param roster_id: roster id
+        :param payroll: payroll holding the pay rates, defaults to the weekday-weekend payroll
+        :param backend: batch pricing backend, numpy or array
+        :return: list of employee-salary tuples, in load order
+        """
+        payroll = payroll or set_up_payroll()
+        employees = self._get_employees(roster_id)
+        first_id, last_id = employees[0][0], employees[-1][0]
+        groups = {group for _, _, group in employees}
+        salaries = [0] * len(employees)
+
+        for group in groups:
+            # employee ids relative to the first employee of the roster, the index of its salary
+            if len(groups) == 1:
+                shifts = self.connection.execute('''
+                    SELECT employee_id - ?, weekday, minute_start, minute_end FROM shifts
+                    WHERE employee_id BETWEEN ? AND ?
+                ''', (first_id, first_id, last_id)).fetchall()
+            else:
+                shifts = self.connection.execute('''
+                    SELECT shifts.employee_id - ?, shifts.weekday, shifts.minute_start, shifts.minute_end
+                    FROM shifts JOIN employees ON employees.id = shifts.employee_id
+                    WHERE employees.roster_id = ? AND employees.employee_group = ?
+                ''', (first_id, roster_id, group)).fetchall()
+            if not shifts:
+                continue
+
+            rate_table = payroll.get_rate_table(group)
+            if rate_table.compiled:
+                employee_ids, weekdays, minute_starts, minute_ends = zip(*shifts)
+                group_salaries = price_shifts(rate_table, employee_ids, weekdays, minute_starts, minute_ends,
+                                              len(employees), backend)
+                salaries = [salary + group_salary for salary, group_salary in zip(salaries, group_salaries)]
+            else:
+                # wages with seconds precision get priced one shift at a time
+                for employee, *shift in shifts:
+                    salaries[employee] += rate_table.calculate_salary(WeekdayWorkHours.from_minutes(*shift))
+
+        with self.connection:
+            self.connection.executemany('UPDATE employees SET salary = ? WHERE id = ?',
+                                        zip(salaries, range(first_id, last_id + 1)))
+        return [(name, salary) for (_, name, _), salary in zip(employees, salaries)]
+
+
+def main(args: Optional[list[str]] = None):
+    """
+    Command line entry point
+
+    :param args: command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description='Keeps employee schedules rosters and salaries in a sqlite database')
+    parser.add_argument('database', help='sqlite database filename')
+    commands = parser.add_subparsers(dest='command', required=True)
+    load = commands.add_parser('load', help='load a schedules file as a new roster, price it and print its payroll')
+    load.add_argument('filename', help='employee schedules txt file')
+    commands.add_parser('rosters', help='list the stored rosters')
+    payroll = commands.add_parser('payroll', help='price a stored roster again and print its payroll')
+    payroll.add_argument('roster_id', type=int, help='roster id')
+    history = commands.add_parser('history', help='print the salary of an employee in every roster')
+    history.add_argument('name', help='employee name')
+    arguments = parser.parse_args(args)
+
+    with ScheduleStore(arguments.database) as store:
+        try:
+            if arguments.command == 'load':
+                roster_id = store.save_roster(arguments.filename,
+                                              iter_employees_schedules_from_file(arguments.filename, MIN_LINES))
+                print(f'Loaded roster {roster_id}')
+                write_payroll(store.price_roster(roster_id), sys.stdout)
+            elif arguments.command == 'rosters':
+                for roster_id, name, loaded_at, employees in store.get_rosters():
+                    print(f'{roster_id}: {name}, loaded at {loaded_at}, {employees} employees')
+            elif arguments.command == 'payroll':
+                write_payroll(store.price_roster(arguments.roster_id), sys.stdout)
+            else:
+                for name, loaded_at, salary in store.get_employee_history(arguments.name):
+                    print(f'{name}, loaded at {loaded_at}: {"not priced" if salary is None else f"{salary} USD"}')
+        except (ValueError, OSError) as e:
+            print(f'Error while loading the input data; {e}')
+
+
+if __name__ == '__main__':
+    main()
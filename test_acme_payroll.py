@@ -1,10 +1,22 @@
+import json
+import os
+import shutil
+import tempfile
 import unittest
+from contextlib import redirect_stdout, redirect_stderr
 from datetime import time
 from io import StringIO
 
-from acme_payroll import parse_employee_schedule, parse_employees_schedules_from_txt
+from acme_payroll import parse_employee_schedule, parse_employees_schedules_from_txt, \
+    iter_employees_schedules_from_txt, iter_employees_payroll, set_up_payroll, find_file_chunks, \
+    iter_payroll_from_file_parallel, parse_employee_schedule_bytes, iter_employees_schedules_from_bytes, \
+    iter_employees_schedules_from_mmap, print_payroll_from_file, main, write_payroll, RejectLog, \
+    find_schedule_files, print_payroll_from_files, profile_payroll_memory
+from metrics import Metrics
 from payroll import WeekdayWorkHours
 
+TEST_DATA = os.path.join(os.path.dirname(__file__), 'test_data.txt')
+
 
 class TestAcmePayroll(unittest.TestCase):
     """test schedules load"""
@@ -50,6 +62,33 @@ class TestAcmePayroll(unittest.TestCase):
         data_line = 'TIFFANY=WE10:00-18:00,WE16:00-20:00'
         self.assertRaises(ValueError, parse_employee_schedule, data_line=data_line)
 
+    def test_parse_employee_schedule_irregular_spacing(self):
+        """periods outside the zero padded format are still accepted"""
+        employee_schedule = parse_employee_schedule('ANNA=MO 9:05-12:00,TU10:00-12:00 \n')
+
+        work_hours = [
+            WeekdayWorkHours(weekday=0, time_start=time(hour=9, minute=5), time_end=time(hour=12)),
+            WeekdayWorkHours(weekday=1, time_start=time(hour=10), time_end=time(hour=12)),
+        ]
+        self.assertEqual(work_hours, employee_schedule.work_hours)
+
+    def test_parse_employee_schedule_error_messages(self):
+        """errors report the offending period"""
+        errors = {
+            'KEVIN=WE25:00-26:00': "Error when trying to parse KEVIN's schedule - "
+                                   "time data '25:00' does not match format '%H:%M'",
+            'KEVIN=WE10:00-11:000': "Error when trying to parse KEVIN's schedule - unconverted data remains: 0",
+            'KEVIN=XX10:00-11:00': "Error when trying to parse KEVIN's schedule - Invalid day input: XX",
+            'KEVIN=WE10:00-11:00-12:00': "Error when trying to parse KEVIN's schedule - "
+                                         "Invalid time range: 10:00-11:00-12:00",
+            'KEVIN=WE10:00-06:00': "Error when trying to parse KEVIN's schedule - "
+                                   "time_start can't be grater than time_end",
+        }
+        for data_line, message in errors.items():
+            with self.assertRaises(ValueError) as context:
+                parse_employee_schedule(data_line)
+            self.assertEqual(message, str(context.exception))
+
     def test_parse_employees_schedules_from_txt_success(self):
         """load txt"""
         file_data = StringIO('NORM=FR17:00-21:00,SA17:00-22:00\nLARRY=TH06:00-08:00,TH19:00-21:00')
@@ -63,3 +102,438 @@ class TestAcmePayroll(unittest.TestCase):
         """load incomplete txt"""
         file_data = StringIO('NORM=FR17:00-21:00,SA17:00-22:00\nLARRY=TH06:00-08:00,TH19:00-21:00')
         self.assertRaises(ValueError, parse_employees_schedules_from_txt, file=file_data, min_lines=5)
+
+    def test_iter_employees_schedules_from_txt_lazy(self):
+        """lines are parsed as they are read"""
+        file_data = StringIO('NORM=FR17:00-21:00,SA17:00-22:00\nLARRY=TH06:00-08:00\nJOSEPH=MO08:00-16:00TU09:00-18:00')
+
+        schedules = iter_employees_schedules_from_txt(file_data, min_lines=2)
+
+        self.assertEqual('NORM', next(schedules).name)
+        self.assertEqual('LARRY', next(schedules).name)
+        self.assertRaises(ValueError, next, schedules)
+
+    def test_iter_employees_schedules_from_txt_error_not_enough_data(self):
+        """load incomplete txt"""
+        file_data = StringIO('NORM=FR17:00-21:00,SA17:00-22:00')
+        schedules = iter_employees_schedules_from_txt(file_data, min_lines=2)
+
+        self.assertRaises(ValueError, next, schedules)
+
+    def test_iter_employees_schedules_from_txt_lenient(self):
+        """malformed lines and duplicated employees are rejected with their line number, the rest parsed"""
+        lines = ['NORM=FR17:00-21:00\n', 'LARRY=TH06:00-08:00\n', 'JOSEPH=MO08:00-16:00TU09:00-18:00\n',
+                 'NORM=SA10:00-12:00\n', 'SUSAN=MO08:00-16:00']
+        rejects = RejectLog(StringIO(), batch_size=1)
+
+        schedules = list(iter_employees_schedules_from_txt(lines, min_lines=2, rejects=rejects))
+
+        self.assertEqual(['NORM', 'LARRY', 'SUSAN'], [schedule.name for schedule in schedules])
+        self.assertEqual(2, rejects.rejected)
+        rejected = [json.loads(line) for line in rejects.output.getvalue().splitlines()]
+        self.assertEqual([3, 4], [reject['line'] for reject in rejected])
+        self.assertEqual('NORM=SA10:00-12:00', rejected[1]['data'])
+        self.assertEqual('found duplicated employee in payroll', rejected[1]['error'])
+
+    def test_iter_employees_payroll(self):
+        """prices schedules as they are parsed"""
+        file_data = StringIO('RENE=MO10:00-12:00,TU10:00-12:00,TH01:00-03:00,SA14:00-18:00,SU20:00-21:00\n'
+                             'ASTRID=MO10:00-12:00,TH12:00-14:00,SU20:00-21:00\n')
+        schedules = iter_employees_schedules_from_txt(file_data, min_lines=2)
+
+        salaries = list(iter_employees_payroll(schedules, set_up_payroll()))
+
+        self.assertEqual([('RENE', 215), ('ASTRID', 85)], salaries)
+
+    def test_iter_employees_payroll_error_duplicate(self):
+        """duplicated employee while streaming"""
+        file_data = StringIO('ASTRID=MO10:00-12:00\nASTRID=TH12:00-14:00')
+        schedules = iter_employees_schedules_from_txt(file_data, min_lines=2)
+        salaries = iter_employees_payroll(schedules, set_up_payroll())
+
+        self.assertEqual(('ASTRID', 30), next(salaries))
+        self.assertRaises(ValueError, next, salaries)
+
+    def test_print_payroll_from_file_metrics(self):
+        """records every stage"""
+        metrics = Metrics()
+        with redirect_stdout(StringIO()) as output:
+            print_payroll_from_file(TEST_DATA, metrics=metrics)
+
+        self.assertEqual(7, len(output.getvalue().splitlines()))
+        self.assertEqual(['rates', 'write', 'price', 'parse'], list(metrics.stages))
+        self.assertEqual(7, metrics.stages['parse'].items)
+        self.assertEqual(7, metrics.stages['write'].items)
+
+    def test_main_profile(self):
+        """profile summary goes to stderr"""
+        with redirect_stdout(StringIO()) as output, redirect_stderr(StringIO()) as errors:
+            main([TEST_DATA, '--profile'])
+
+        self.assertIn('The amount to pay TOM is: 225 USD', output.getvalue())
+        self.assertIn('parse', errors.getvalue())
+
+    def test_main_bytes_reader(self):
+        """the bytes reader prints the same payroll in every mode"""
+        with redirect_stdout(StringIO()) as expected:
+            main([TEST_DATA])
+
+        for mode in ([], ['--workers', '2'], ['--memory-report']):
+            with redirect_stdout(StringIO()) as output, redirect_stderr(StringIO()):
+                main([TEST_DATA, '--bytes-reader'] + mode)
+            self.assertEqual(expected.getvalue(), output.getvalue())
+
+    def test_profile_payroll_memory(self):
+        """measures every stage, and the model objects the payroll keeps"""
+        with redirect_stdout(StringIO()) as output:
+            report = profile_payroll_memory(TEST_DATA)
+
+        self.assertEqual(7, len(output.getvalue().splitlines()))
+        self.assertEqual(['rates', 'read', 'parse', 'payroll', 'price', 'write'], list(report.stages))
+        self.assertEqual((7, 27), (report.employees, report.shifts))
+        self.assertEqual(7, report.types['EmployeeSchedule'].objects)
+        self.assertEqual(27, report.types['WeekdayWorkHours'].objects)
+        self.assertGreater(report.stages['parse'].retained, 0)
+
+    def test_main_memory_report(self):
+        """memory report goes to stderr"""
+        with redirect_stdout(StringIO()) as output, redirect_stderr(StringIO()) as errors:
+            main([TEST_DATA, '--memory-report'])
+
+        self.assertIn('The amount to pay TOM is: 225 USD', output.getvalue())
+        self.assertIn('WeekdayWorkHours', errors.getvalue())
+        with redirect_stderr(StringIO()):
+            self.assertRaises(SystemExit, main, [TEST_DATA, '--memory-report', '--workers', '2'])
+
+    def test_main_memory_report_missing_file(self):
+        """a missing file gets reported as in every other mode"""
+        with redirect_stdout(StringIO()) as output, redirect_stderr(StringIO()) as errors:
+            main(['missing.txt', '--memory-report'])
+
+        self.assertEqual('File missing.txt does not exist\n', output.getvalue())
+        self.assertEqual('', errors.getvalue())
+
+    def test_main_reject_file(self):
+        """malformed lines go to the reject file, valid ones get printed"""
+        data_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        with open(TEST_DATA, 'r') as test_data:
+            data_file.write(test_data.read().rstrip('\n') + '\nKEVIN=XX10:00-11:00\n')
+        data_file.close()
+        reject_file = data_file.name + '.rejects'
+        try:
+            with redirect_stdout(StringIO()) as output, redirect_stderr(StringIO()) as errors:
+                main([data_file.name, '--reject-file', reject_file])
+            with open(reject_file, 'r') as rejects:
+                rejected = [json.loads(line) for line in rejects]
+        finally:
+            os.remove(data_file.name)
+            os.remove(reject_file)
+
+        self.assertEqual(7, len(output.getvalue().splitlines()))
+        self.assertEqual([8], [reject['line'] for reject in rejected])
+        self.assertIn('Rejected 1 lines', errors.getvalue())
+
+    def test_main_reject_file_error(self):
+        """a reject file that can't be opened gets reported in a line"""
+        reject_file = os.path.join(tempfile.gettempdir(), 'missing-directory', 'rejects.jsonl')
+        with redirect_stdout(StringIO()) as output:
+            main([TEST_DATA, '--reject-file', reject_file])
+
+        self.assertTrue(output.getvalue().startswith('Error while opening the reject file; '))
+        self.assertEqual(1, len(output.getvalue().splitlines()))
+
+    def test_main_workers_rejected(self):
+        """workers below 1 are a usage error, not an input data error"""
+        for args in (['-j', '0'], ['-j', '-1'], ['--batch', '-j', '0']):
+            with redirect_stdout(StringIO()) as output, redirect_stderr(StringIO()) as errors:
+                self.assertRaises(SystemExit, main, [TEST_DATA, *args])
+
+            self.assertEqual('', output.getvalue())
+            self.assertIn('--workers must be at least 1', errors.getvalue())
+
+    def test_main_cache_dir_rejected(self):
+        """the cache only applies to single process runs"""
+        for args in (['--cache-dir', 'cache', '--workers', '2'], ['--cache-dir', 'cache', '--batch'],
+                     ['--verify-hash', '--workers', '2'], ['--verify-hash']):
+            with redirect_stderr(StringIO()):
+                self.assertRaises(SystemExit, main, [TEST_DATA, *args])
+
+
+class TestAcmePayrollOutput(unittest.TestCase):
+    """test payroll output formats"""
+
+    def setUp(self):
+        self.salaries = [('TOM', 225), ('O\'NEIL, JR', 220), ('MATT', 85)]
+
+    def test_write_payroll_text(self):
+        """current human readable output"""
+        output = StringIO()
+
+        self.assertEqual(3, write_payroll(self.salaries, output, batch_size=2))
+        self.assertEqual('The amount to pay TOM is: 225 USD\n'
+                         'The amount to pay O\'NEIL, JR is: 220 USD\n'
+                         'The amount to pay MATT is: 85 USD\n', output.getvalue())
+
+    def test_write_payroll_csv(self):
+        """csv with header, quoting names"""
+        output = StringIO()
+
+        write_payroll(self.salaries, output, output_format='csv', batch_size=2)
+
+        self.assertEqual('name,salary\nTOM,225\n"O\'NEIL, JR",220\nMATT,85\n', output.getvalue())
+
+    def test_write_payroll_jsonl(self):
+        """a json object per line"""
+        output = StringIO()
+
+        write_payroll(self.salaries, output, output_format='jsonl')
+
+        self.assertEqual('{"name": "TOM", "salary": 225}', output.getvalue().splitlines()[0])
+        self.assertEqual(3, len(output.getvalue().splitlines()))
+
+    def test_write_payroll_error_format(self):
+        """unknown output format"""
+        self.assertRaises(ValueError, write_payroll, self.salaries, StringIO(), output_format='xml')
+
+    def test_write_payroll_error_salaries(self):
+        """salaries received before an error are written"""
+        def failing_salaries():
+            yield 'TOM', 225
+            raise ValueError('found duplicated employee in payroll')
+
+        output = StringIO()
+
+        self.assertRaises(ValueError, write_payroll, failing_salaries(), output, output_format='csv')
+        self.assertEqual('name,salary\nTOM,225\n', output.getvalue())
+
+    def test_main_output_file(self):
+        """payroll written to a file in the selected format"""
+        output_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        output_file.close()
+        try:
+            main([TEST_DATA, '--format', 'csv', '--output', output_file.name])
+            with open(output_file.name, 'r') as data_file:
+                lines = data_file.read().splitlines()
+        finally:
+            os.remove(output_file.name)
+
+        self.assertEqual(['name,salary', 'TOM,225'], lines[:2])
+        self.assertEqual(8, len(lines))
+
+    def test_main_output_file_error(self):
+        """an output file that can't be opened gets reported in a line"""
+        output_file = os.path.join(tempfile.gettempdir(), 'missing-directory', 'payroll.csv')
+        with redirect_stdout(StringIO()) as output:
+            main([TEST_DATA, '--output', output_file])
+
+        self.assertTrue(output.getvalue().startswith('Error while opening the output file; '))
+        self.assertEqual(1, len(output.getvalue().splitlines()))
+
+
+class TestAcmePayrollBytes(unittest.TestCase):
+    """test schedules load from bytes"""
+
+    def test_parse_employee_schedule_bytes(self):
+        """matches the str parser, for fast path and fallback lines"""
+        data_lines = [
+            'SUSAN=MO08:00-16:00,TU09:00-18:00,WE15:00-20:00,SA09:00-15:00',
+            'ANNA=MO 9:05-12:00,TU10:00-12:00 ',
+            'JOSÉ=SU20:00-00:00',
+        ]
+        for data_line in data_lines:
+            data = f'NEXT\n{data_line}\nNEXT'.encode()
+            employee_schedule = parse_employee_schedule_bytes(data, 5, 5 + len(data_line.encode()))
+            expected = parse_employee_schedule(data_line)
+
+            self.assertEqual(expected.name, employee_schedule.name)
+            self.assertEqual(expected.work_hours, employee_schedule.work_hours)
+
+    def test_parse_employee_schedule_bytes_error_messages(self):
+        """errors match the str parser"""
+        data_lines = [
+            'KEVIN=WE25:00-26:00',
+            'KEVIN=XX10:00-11:00',
+            'KEVIN=WE10:00-06:00',
+            'TIFFANY=WE10:00-18:00,WE16:00-20:00',
+            'LISAWE10:00-13:00',
+        ]
+        for data_line in data_lines:
+            with self.assertRaises(ValueError) as expected:
+                parse_employee_schedule(data_line)
+            with self.assertRaises(ValueError) as context:
+                parse_employee_schedule_bytes(data_line.encode(), 0, len(data_line))
+            self.assertEqual(str(expected.exception), str(context.exception))
+
+    def test_iter_employees_schedules_from_bytes(self):
+        """lines are split on line feeds, dropping carriage returns"""
+        data = b'NORM=FR17:00-21:00,SA17:00-22:00\r\nLARRY=TH06:00-08:00\nJOSEPH=MO08:00-16:00TU09:00-18:00'
+
+        schedules = iter_employees_schedules_from_bytes(data, min_lines=2)
+
+        self.assertEqual('NORM', next(schedules).name)
+        self.assertEqual('LARRY', next(schedules).name)
+        self.assertRaises(ValueError, next, schedules)
+
+    def test_iter_employees_schedules_from_bytes_lenient(self):
+        """malformed lines and duplicated employees are rejected with their line number, the rest parsed"""
+        data = b'NORM=FR17:00-21:00\nLARRY=TH06:00-08:00\nJOSEPH=MO08:00-16:00TU09:00-18:00\nNORM=SA10:00-12:00\n' \
+               b'SUSAN=MO08:00-16:00'
+        rejects = RejectLog(StringIO(), batch_size=1)
+
+        schedules = list(iter_employees_schedules_from_bytes(data, min_lines=2, rejects=rejects))
+
+        self.assertEqual(['NORM', 'LARRY', 'SUSAN'], [schedule.name for schedule in schedules])
+        self.assertEqual(2, rejects.rejected)
+        rejected = [json.loads(line) for line in rejects.output.getvalue().splitlines()]
+        self.assertEqual([3, 4], [reject['line'] for reject in rejected])
+        self.assertEqual('NORM=SA10:00-12:00', rejected[1]['data'])
+        self.assertEqual('found duplicated employee in payroll', rejected[1]['error'])
+
+    def test_iter_employees_schedules_from_bytes_error_not_enough_data(self):
+        """load incomplete bytes"""
+        schedules = iter_employees_schedules_from_bytes(b'NORM=FR17:00-21:00\n', min_lines=2)
+
+        self.assertRaises(ValueError, next, schedules)
+
+    def test_iter_employees_schedules_from_mmap(self):
+        """matches the txt reader"""
+        with open(TEST_DATA, 'r') as data_file:
+            expected = parse_employees_schedules_from_txt(data_file, min_lines=5)
+
+        schedules = list(iter_employees_schedules_from_mmap(TEST_DATA, min_lines=5))
+
+        self.assertEqual([schedule.name for schedule in expected], [schedule.name for schedule in schedules])
+        self.assertEqual([schedule.work_hours for schedule in expected],
+                         [schedule.work_hours for schedule in schedules])
+
+    def test_iter_employees_schedules_from_mmap_empty(self):
+        """empty files can't be mapped"""
+        data_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        data_file.close()
+        try:
+            schedules = iter_employees_schedules_from_mmap(data_file.name, min_lines=1)
+            self.assertRaises(ValueError, next, schedules)
+        finally:
+            os.remove(data_file.name)
+
+
+class TestAcmePayrollParallel(unittest.TestCase):
+    """test sharded payroll"""
+
+    def setUp(self):
+        data_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        with data_file:
+            data_file.write('\n'.join(f'EMPLOYEE{i}=MO10:00-12:00,SA0{i % 10}:00-1{i % 10}:00' for i in range(50)))
+        self.filename = data_file.name
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_find_file_chunks(self):
+        """chunks cover the whole file and end on line boundaries"""
+        chunks = find_file_chunks(self.filename, chunk_size=100)
+
+        with open(self.filename, 'rb') as data_file:
+            data = data_file.read()
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(0, chunks[0][0])
+        self.assertEqual(len(data), chunks[-1][1])
+        for (_, chunk_end), (chunk_start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(chunk_end, chunk_start)
+            self.assertEqual(b'\n'[0], data[chunk_end - 1])
+
+    def test_iter_payroll_from_file_parallel(self):
+        """matches the sequential payroll, in file order"""
+        with open(self.filename, 'r') as data_file:
+            schedules = iter_employees_schedules_from_txt(data_file, min_lines=5)
+            expected = list(iter_employees_payroll(schedules, set_up_payroll()))
+
+        salaries = list(iter_payroll_from_file_parallel(self.filename, min_lines=5, workers=2, chunk_size=100))
+
+        self.assertEqual(expected, salaries)
+
+    def test_iter_payroll_from_file_parallel_error_duplicate(self):
+        """duplicated employee across chunks"""
+        with open(self.filename, 'a') as data_file:
+            data_file.write('\nEMPLOYEE0=TU10:00-12:00')
+
+        salaries = iter_payroll_from_file_parallel(self.filename, min_lines=5, workers=2, chunk_size=100)
+
+        self.assertRaises(ValueError, list, salaries)
+
+    def test_iter_payroll_from_file_parallel_error_not_enough_data(self):
+        """load incomplete txt"""
+        salaries = iter_payroll_from_file_parallel(self.filename, min_lines=100, workers=2)
+
+        self.assertRaises(ValueError, next, salaries)
+
+
+class TestAcmePayrollBatch(unittest.TestCase):
+    """test batch runs over many schedules files"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.write('sales.txt', [f'SALES{i}=MO10:00-12:00' for i in range(5)])
+        self.write('support.txt', [f'SUPPORT{i}=SA10:00-12:00' for i in range(6)])
+        self.write('warehouse.txt', ['WAREHOUSE0=MO10:00-12:00'])
+        self.write('notes.md', ['not a schedules file'])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def write(self, filename: str, data_lines: list[str]):
+        with open(os.path.join(self.data_dir, filename), 'w') as data_file:
+            data_file.write('\n'.join(data_lines))
+
+    def test_find_schedule_files(self):
+        """directories pick their txt files, anything else is a glob pattern"""
+        expected = [os.path.join(self.data_dir, filename) for filename in ('sales.txt', 'support.txt', 'warehouse.txt')]
+
+        self.assertEqual(expected, find_schedule_files(self.data_dir))
+        self.assertEqual(expected[:2], find_schedule_files(os.path.join(self.data_dir, 's*.txt')))
+        self.assertEqual([], find_schedule_files(os.path.join(self.data_dir, 'missing')))
+
+    def test_print_payroll_from_files(self):
+        """every file gets priced, a failing one gets reported, then the roll-up"""
+        output = StringIO()
+
+        file_payrolls = print_payroll_from_files(self.data_dir, workers=2, output=output)
+
+        self.assertEqual([150, 240, 0], [file_payroll.total for file_payroll in file_payrolls])
+        self.assertIn('Insufficient data', file_payrolls[2].error)
+        lines = output.getvalue().splitlines()
+        self.assertIn('The amount to pay SUPPORT5 is: 40 USD', lines)
+        self.assertEqual('Total: 2 files priced, 1 failed, 11 employees, 390 USD', lines[-1])
+
+    def test_print_payroll_from_files_output_dir(self):
+        """each file payroll gets written to its own file, only the roll-up gets printed"""
+        output_dir = os.path.join(self.data_dir, 'payrolls')
+        output = StringIO()
+
+        print_payroll_from_files(self.data_dir, workers=1, output=output, output_format='csv', output_dir=output_dir)
+
+        self.assertEqual(['sales.csv', 'support.csv'], sorted(os.listdir(output_dir)))
+        with open(os.path.join(output_dir, 'sales.csv')) as payroll_file:
+            self.assertEqual(['name,salary', 'SALES0,30'], payroll_file.read().splitlines()[:2])
+        self.assertTrue(output.getvalue().startswith('== roll-up ==\n'))
+
+    def test_print_payroll_from_files_output_dir_nested(self):
+        """files named alike in different directories keep their relative path, colliding names are rejected"""
+        for department in ('sales', 'support'):
+            os.mkdir(os.path.join(self.data_dir, department))
+            self.write(os.path.join(department, 'schedule.txt'), [f'{department.upper()}{i}=MO10:00-12:00'
+                                                                  for i in range(5)])
+        output_dir = os.path.join(self.data_dir, 'payrolls')
+
+        print_payroll_from_files(os.path.join(self.data_dir, '*', 'schedule.txt'), workers=1, output=StringIO(),
+                                 output_format='csv', output_dir=output_dir)
+
+        for department in ('sales', 'support'):
+            with open(os.path.join(output_dir, department, 'schedule.csv')) as payroll_file:
+                self.assertEqual(f'{department.upper()}0,30', payroll_file.read().splitlines()[1])
+
+        self.write('sales.dat', [f'SALES{i}=MO10:00-12:00' for i in range(5)])
+        with self.assertRaisesRegex(ValueError, 'would both be written to'):
+            print_payroll_from_files(os.path.join(self.data_dir, 'sales.*'), workers=1, output=StringIO(),
+                                     output_dir=output_dir)
@@ -0,0 +1,62 @@
+import unittest
+from array import array
+from datetime import time
+
+from acme_payroll import parse_employee_schedule, set_up_payroll
+from batch_pricing import employee_ids_from_counts, price_payroll, price_shifts, numpy
+from benchmarks.workload import generate_schedule_lines
+from payroll import EmployeeSchedule, WeekdayWorkHours, PayRate, DayRange, WorkHoursWage, RateSet
+
+
+class TestBatchPricing(unittest.TestCase):
+    """test batch pricing matches the payroll, with every backend"""
+
+    backend = 'array'
+
+    def setUp(self):
+        self.payroll = set_up_payroll()
+        for data_line in generate_schedule_lines(200, shifts=9, midnight_share=0.3):
+            self.payroll.add_employee_schedule(parse_employee_schedule(data_line))
+
+    def test_price_payroll(self):
+        self.assertEqual(self.payroll.get_employees_payroll(), price_payroll(self.payroll, backend=self.backend))
+
+    def test_price_payroll_groups_and_seconds(self):
+        """employees of groups with their own rates, and shifts with seconds precision"""
+        wage = [WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=0, minute=0), amount=7)]
+        self.payroll.add_rate_set(RateSet(rates=[PayRate(day_range=DayRange(0, 6), hourly_wages=wage)],
+                                          groups=['nurses']))
+        self.payroll.add_employee_schedule(parse_employee_schedule('NURSE=MO08:00-12:00,SU20:00-00:00'), group='nurses')
+        self.payroll.add_employee_schedule(EmployeeSchedule(name='SECONDS', work_hours=[
+            WeekdayWorkHours(weekday=0, time_start=time(hour=8, second=30), time_end=time(hour=12)),
+            WeekdayWorkHours(weekday=1, time_start=time(hour=8), time_end=time(hour=12)),
+        ]))
+
+        salaries = price_payroll(self.payroll, backend=self.backend)
+
+        self.assertEqual(self.payroll.get_employees_payroll(), salaries)
+        self.assertEqual(('NURSE', 56), salaries[-2])
+
+    def test_price_shifts_columns(self):
+        """prices schedule cache columns"""
+        shift_counts = array('I', [2, 0, 1])
+        salaries = price_shifts(self.payroll.rate_table, employee_ids_from_counts(shift_counts),
+                                weekdays=array('B', [0, 5, 6]), minute_starts=array('H', [600, 1320, 0]),
+                                minute_ends=array('H', [720, 0, 60]), employees=3, backend=self.backend)
+
+        self.assertEqual([30 + 50, 0, 30], salaries)
+
+    def test_price_shifts_error_invalid_range(self):
+        self.assertRaises(ValueError, price_shifts, self.payroll.rate_table, [0], [0], [720], [600], 1, self.backend)
+
+    def test_price_shifts_error_backend(self):
+        self.assertRaises(ValueError, price_shifts, self.payroll.rate_table, [0], [0], [600], [720], 1, 'gpu')
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestBatchPricingNumpy(TestBatchPricing):
+    backend = 'numpy'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import random
+import unittest
+from datetime import time
+
+from acme_payroll import parse_employee_schedule, set_up_payroll
+from benchmarks.differential import ENGINES, compare_engines, generate_rates, generate_schedules, reference_engine
+from payroll import EmployeeSchedule, WeekdayWorkHours
+
+
+class TestDifferential(unittest.TestCase):
+    """test every pricing engine against the get_wage reference"""
+
+    def test_engines_match_reference(self):
+        """adversarial rates and shifts are priced the same by every engine"""
+        rng = random.Random(0)
+        for _ in range(10):
+            rates = generate_rates(rng, seconds_share=0.3)
+            results = compare_engines(rates, generate_schedules(rng, rates, 200, seconds_share=0.1))
+
+            self.assertEqual(['reference', *ENGINES], list(results))
+            for name, result in results.items():
+                self.assertEqual([], result.mismatches, name)
+
+    def test_generate_rates(self):
+        """every generated rate set is valid, seconds cuts included, and some of them have seconds"""
+        with_seconds = 0
+        for seed in range(10):
+            rng = random.Random(seed)
+            for _ in range(100):
+                rates = generate_rates(rng, seconds_share=1.0)
+                with_seconds += not all(hourly_wage.minute_aligned
+                                        for rate in rates for hourly_wage in rate.hourly_wages)
+
+        self.assertGreater(with_seconds, 0)
+
+    def test_reference_quirks(self):
+        """00:00 ends are 23:59, a minute is added before truncating hours, 00:01 starts are 00:00"""
+        schedules = [
+            parse_employee_schedule('MIDNIGHT=MO23:00-00:00'),
+            parse_employee_schedule('EXTRA=MO10:00-10:59'),
+            parse_employee_schedule('SHORT=MO10:00-10:58'),
+            parse_employee_schedule('SNAPPED=MO00:01-00:59'),
+            EmployeeSchedule('SECONDS', [
+                WeekdayWorkHours(0, time(hour=10, second=30), time(hour=10, minute=59, second=29)),
+            ]),
+        ]
+
+        salaries = reference_engine(set_up_payroll().rates, schedules)()
+
+        self.assertEqual([20, 15, 0, 25, 0], salaries)
+
+    def test_mismatches(self):
+        """an engine pricing differently gets every mismatch reported"""
+        schedules = [parse_employee_schedule('TOM=MO10:00-12:00'), parse_employee_schedule('ANNA=SA10:00-12:00')]
+        engines = {'off_by_one': lambda rates, schedules: lambda: [30, 41]}
+
+        results = compare_engines(set_up_payroll().rates, schedules, engines)
+
+        self.assertEqual([('ANNA', 40, 41)], [(name, expected, salary)
+                                              for name, _, expected, salary in results['off_by_one'].mismatches])
+        self.assertGreaterEqual(results['off_by_one'].seconds, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import tracemalloc
+import unittest
+
+from acme_payroll import parse_employee_schedule
+from memory_report import MemoryReport
+
+
+class TestMemoryReport(unittest.TestCase):
+    """test memory accounting per stage and per type"""
+
+    def setUp(self) -> None:
+        self.report = MemoryReport()
+
+    def test_stage(self):
+        """memory kept and peak of each stage"""
+        with self.report.tracing():
+            with self.report.stage('keep'):
+                kept = bytearray(100000)
+            with self.report.stage('drop'):
+                bytearray(200000)
+
+        self.assertGreaterEqual(self.report.stages['keep'].retained, 100000)
+        self.assertLess(self.report.stages['drop'].retained, 1000)
+        self.assertGreaterEqual(self.report.stages['drop'].peak, 200000)
+        self.assertGreaterEqual(self.report.peak, 300000)
+        self.assertFalse(tracemalloc.is_tracing())
+        del kept
+
+    def test_count_objects(self):
+        """objects reachable from the roots by type, skipping the ones that existed before tracing"""
+        shared = parse_employee_schedule('TOM=MO10:00-12:00')
+        with self.report.tracing():
+            schedules = [parse_employee_schedule('ANNA=SA10:00-12:00,SU10:00-12:00'), shared]
+            self.report.count_objects(schedules)
+
+        self.assertEqual(1, self.report.types['EmployeeSchedule'].objects)
+        self.assertEqual(2, self.report.types['WeekdayWorkHours'].objects)
+        self.assertEqual(2, self.report.types['list'].objects)
+
+    def test_summary(self):
+        """a line per stage and per type, with figures per employee and shift"""
+        self.report.employees = 2
+        self.report.shifts = 4
+        with self.report.tracing():
+            with self.report.stage('parse'):
+                schedules = [parse_employee_schedule('ANNA=SA10:00-12:00')]
+            self.report.count_objects(schedules)
+
+        lines = self.report.summary().splitlines()
+        self.assertEqual(['stage', 'parse', 'total', 'type'], [line.split(' ')[0] for line in lines[:3] + lines[4:5]])
+        self.assertEqual('total', lines[-1].split(' ')[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from time import sleep
+
+from metrics import Metrics, NO_METRICS
+
+
+class TestMetrics(unittest.TestCase):
+    """test stage instrumentation"""
+
+    def setUp(self) -> None:
+        self.metrics = Metrics()
+
+    def test_stage(self):
+        """measures calls, items and time"""
+        for _ in range(2):
+            with self.metrics.stage('rates', items=3):
+                sleep(0.01)
+
+        stage = self.metrics.stages['rates']
+        self.assertEqual(2, stage.calls)
+        self.assertEqual(6, stage.items)
+        self.assertGreaterEqual(stage.seconds, 0.02)
+
+    def test_stage_nested(self):
+        """time spent in an inner stage isn't added to the outer one"""
+        with self.metrics.stage('print'):
+            with self.metrics.stage('price'):
+                sleep(0.02)
+
+        self.assertGreaterEqual(self.metrics.stages['price'].seconds, 0.02)
+        self.assertLess(self.metrics.stages['print'].seconds, 0.01)
+
+    def test_iter(self):
+        """measures the time spent producing each item"""
+        def slow_items():
+            for item in range(3):
+                sleep(0.01)
+                yield item
+
+        items = self.metrics.iter('parse', slow_items())
+        with self.metrics.stage('print'):
+            self.assertEqual([0, 1, 2], list(items))
+
+        self.assertEqual(3, self.metrics.stages['parse'].items)
+        self.assertEqual(4, self.metrics.stages['parse'].calls)
+        self.assertGreaterEqual(self.metrics.stages['parse'].seconds, 0.03)
+        self.assertLess(self.metrics.stages['print'].seconds, 0.01)
+
+    def test_iter_error(self):
+        """stages are closed when an item fails"""
+        def failing_items():
+            yield 1
+            raise ValueError('invalid item')
+
+        items = self.metrics.iter('parse', failing_items())
+
+        self.assertEqual(1, next(items))
+        self.assertRaises(ValueError, next, items)
+        with self.metrics.stage('print'):
+            pass
+        self.assertEqual(1, self.metrics.stages['print'].calls)
+
+    def test_count(self):
+        """adds items without time"""
+        self.metrics.count('print', 5)
+        self.metrics.count('print', 2)
+
+        self.assertEqual(7, self.metrics.stages['print'].items)
+        self.assertEqual(0, self.metrics.stages['print'].calls)
+
+    def test_summary(self):
+        """one line per stage plus header and total"""
+        with self.metrics.stage('rates', items=2):
+            pass
+        self.metrics.count('print', 5)
+
+        lines = self.metrics.summary().splitlines()
+
+        self.assertEqual(4, len(lines))
+        self.assertTrue(lines[1].startswith('rates'))
+        self.assertTrue(lines[2].startswith('print'))
+        self.assertTrue(lines[3].startswith('total'))
+
+    def test_disabled(self):
+        """nothing gets measured and iterables pass through"""
+        items = [1, 2]
+        with NO_METRICS.stage('rates', items=3):
+            pass
+        NO_METRICS.count('print', 1)
+
+        self.assertEqual(items, list(NO_METRICS.iter('parse', items)))
+        self.assertEqual({}, NO_METRICS.stages)
+
+
+if __name__ == '__main__':
+    unittest.main()
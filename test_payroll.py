@@ -1,7 +1,10 @@
+import threading
 import unittest
-from datetime import time
+from datetime import date, time
 
-from payroll import Payroll, PayRate, DayRange, WorkHours, WorkHoursWage, EmployeeSchedule, WeekdayWorkHours
+from metrics import Metrics
+from payroll import Payroll, PayRate, DayRange, WorkHours, WorkHoursWage, EmployeeSchedule, WeekdayWorkHours, \
+    RateTable, ShiftPriceCache, RateSet
 
 
 class TestPayroll(unittest.TestCase):
@@ -64,6 +67,37 @@ class TestPayroll(unittest.TestCase):
 
         self.assertRaises(ValueError, self.payroll.add_employee_schedule, schedule=schedule)
 
+    def test_get_employee_schedule(self):
+        """looks up an employee schedule by name"""
+        self.assertEqual('DIANE', self.payroll.get_employee_schedule('DIANE').name)
+        self.assertRaises(ValueError, self.payroll.get_employee_schedule, name='PETER')
+
+    def test_replace_employee_schedule(self):
+        """replaces an employee schedule keeping its order"""
+        work_hours = [
+            WeekdayWorkHours(weekday=2, time_start=time(hour=8, minute=0), time_end=time(hour=10, minute=00))
+        ]
+        schedule = EmployeeSchedule(name='MONICA', work_hours=work_hours)
+
+        self.payroll.replace_employee_schedule(schedule)
+
+        self.assertEqual([schedule.name, 'DIANE'], [employee.name for employee in self.payroll.employee_schedules])
+        self.assertIs(schedule, self.payroll.get_employee_schedule('MONICA'))
+
+    def test_replace_employee_schedule_error_missing(self):
+        """replaces a schedule not in payroll"""
+        schedule = EmployeeSchedule(name='PETER', work_hours=[])
+
+        self.assertRaises(ValueError, self.payroll.replace_employee_schedule, schedule=schedule)
+
+    def test_remove_employee_schedule(self):
+        """removes an employee schedule"""
+        schedule = self.payroll.remove_employee_schedule('MONICA')
+
+        self.assertEqual('MONICA', schedule.name)
+        self.assertNotIn(schedule, self.payroll.employee_schedules)
+        self.assertRaises(ValueError, self.payroll.remove_employee_schedule, name='MONICA')
+
     def test_get_employees_payroll(self):
         payroll_wages = self.payroll.get_employees_payroll()
 
@@ -71,6 +105,253 @@ class TestPayroll(unittest.TestCase):
         self.assertIn(('MONICA', 90), payroll_wages)
         self.assertIn(('DIANE', 230), payroll_wages)
 
+    def test_get_employees_payroll_cached(self):
+        """only changed employees get priced again"""
+        self.assertEqual((('MONICA', 90), ('DIANE', 230)), self.payroll.get_employees_payroll())
+
+        priced = []
+        price_schedule = self.payroll._price_schedule
+        self.payroll._price_schedule = lambda schedule, rate_table: priced.append(schedule.name) \
+            or price_schedule(schedule, rate_table)
+
+        self.assertEqual((('MONICA', 90), ('DIANE', 230)), self.payroll.get_employees_payroll())
+        self.assertEqual([], priced)
+
+        work_hours = [
+            WeekdayWorkHours(weekday=2, time_start=time(hour=8, minute=0), time_end=time(hour=10, minute=00))
+        ]
+        self.payroll.replace_employee_schedule(EmployeeSchedule(name='MONICA', work_hours=work_hours))
+        self.payroll.add_employee_schedule(EmployeeSchedule(name='PETER', work_hours=[]))
+        self.payroll.remove_employee_schedule('DIANE')
+
+        self.assertEqual((('MONICA', 20), ('PETER', 0)), self.payroll.get_employees_payroll())
+        self.assertEqual(['MONICA', 'PETER'], priced)
+
+    def test_iter_employees_payroll_lazy(self):
+        """employees get priced only when reached, and are kept for later calls"""
+        priced = []
+        price_schedule = self.payroll._price_schedule
+        self.payroll._price_schedule = lambda schedule, rate_table: priced.append(schedule.name) \
+            or price_schedule(schedule, rate_table)
+
+        employees_payroll = self.payroll.iter_employees_payroll()
+        self.assertEqual(('MONICA', 90), next(employees_payroll))
+        self.assertEqual(['MONICA'], priced)
+
+        self.assertEqual([('DIANE', 230)], list(employees_payroll))
+        self.assertEqual((('MONICA', 90), ('DIANE', 230)), self.payroll.get_employees_payroll())
+        self.assertEqual(['MONICA', 'DIANE'], priced)
+
+    def test_iter_employees_payroll_min_salary(self):
+        self.assertEqual([('DIANE', 230)], list(self.payroll.iter_employees_payroll(min_salary=100)))
+        self.payroll.get_employees_payroll()
+        self.assertEqual([('MONICA', 90), ('DIANE', 230)], list(self.payroll.iter_employees_payroll(min_salary=90)))
+
+    def test_get_top_employees_payroll(self):
+        """highest salaries first, ties in payroll order"""
+        self.payroll.add_employee_schedule(EmployeeSchedule(name='PETER', work_hours=[
+            WeekdayWorkHours(weekday=6, time_start=time(hour=10, minute=0), time_end=time(hour=20, minute=00)),
+        ]))
+
+        self.assertEqual([('DIANE', 230), ('PETER', 230)], self.payroll.get_top_employees_payroll(2))
+        self.assertEqual([('DIANE', 230)], self.payroll.get_top_employees_payroll(1))
+
+    def test_get_employees_payroll_rates_changed(self):
+        """changing pay rates prices every employee again"""
+        self.payroll.get_employees_payroll()
+
+        everyday_wage = [WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=0, minute=0), amount=1)]
+        self.payroll.rates = [PayRate(day_range=DayRange(0, 6), hourly_wages=everyday_wage)]
+
+        self.assertEqual((('MONICA', 8), ('DIANE', 10)), self.payroll.get_employees_payroll())
+        self.assertEqual(10, self.payroll.get_employee_salary('DIANE'))
+        self.assertRaises(ValueError, self.payroll.get_employee_salary, name='PETER')
+
+    def test_get_employees_payroll_metrics(self):
+        """records the rates and price stages"""
+        metrics = Metrics()
+        payroll = Payroll(rates=self.payroll.rates, metrics=metrics)
+        for schedule in self.payroll.employee_schedules:
+            payroll.add_employee_schedule(schedule)
+
+        payroll.get_employees_payroll()
+        payroll.get_employees_payroll()
+
+        self.assertEqual((1, 2), (metrics.stages['rates'].calls, metrics.stages['rates'].items))
+        self.assertEqual((1, 2), (metrics.stages['price'].calls, metrics.stages['price'].items))
+
+
+class TestPayrollThreads(unittest.TestCase):
+    """Test payroll shared between threads"""
+
+    def setUp(self) -> None:
+        wage = [WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=0, minute=0), amount=10)]
+        self.payroll = Payroll(rates=[PayRate(day_range=DayRange(0, 6), hourly_wages=wage)])
+        self.work_hours = [
+            WeekdayWorkHours(weekday=0, time_start=time(hour=8, minute=0), time_end=time(hour=12, minute=00))
+        ]
+
+    @staticmethod
+    def run_threads(targets: list):
+        threads = [threading.Thread(target=target) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_add_employee_schedule_duplicates(self):
+        """each employee is added once however many threads add it"""
+        added = []
+        duplicated = []
+
+        def add_employees():
+            for employee in range(200):
+                try:
+                    self.payroll.add_employee_schedule(EmployeeSchedule(name=f'E{employee}', work_hours=[]))
+                    added.append(employee)
+                except ValueError:
+                    duplicated.append(employee)
+
+        self.run_threads([add_employees] * 8)
+
+        self.assertEqual(list(range(200)), sorted(added))
+        self.assertEqual(200 * 7, len(duplicated))
+
+    def test_get_employees_payroll_while_adding(self):
+        """reports taken while adding are consistent snapshots, the last one sees every employee"""
+        reports = []
+        adding = threading.Event()
+        adding.set()
+
+        def add_employees(feed: int):
+            for employee in range(300):
+                schedule = EmployeeSchedule(name=f'F{feed}E{employee}', work_hours=self.work_hours)
+                self.payroll.add_employee_schedule(schedule)
+
+        def report():
+            while adding.is_set():
+                reports.append(self.payroll.get_employees_payroll())
+
+        reader = threading.Thread(target=report)
+        reader.start()
+        self.run_threads([lambda feed=feed: add_employees(feed) for feed in range(4)])
+        adding.clear()
+        reader.join()
+
+        for employees_payroll in reports:
+            self.assertTrue(all(salary == 40 for _, salary in employees_payroll))
+        self.assertEqual(1200, len(self.payroll.get_employees_payroll()))
+        self.assertEqual(40 * 1200, sum(salary for _, salary in self.payroll.get_employees_payroll()))
+
+    def test_get_employees_payroll_replaced_while_pricing(self):
+        """writers don't wait for pricing, salaries of schedules replaced meanwhile aren't kept"""
+        self.payroll.add_employee_schedule(EmployeeSchedule(name='MONICA', work_hours=self.work_hours))
+        price_schedule = self.payroll._price_schedule
+
+        def replace_while_pricing(schedule, rate_table):
+            self.payroll.replace_employee_schedule(EmployeeSchedule(name='MONICA', work_hours=[]))
+            return price_schedule(schedule, rate_table)
+
+        self.payroll._price_schedule = replace_while_pricing
+        self.assertEqual((('MONICA', 40),), self.payroll.get_employees_payroll())
+
+        self.payroll._price_schedule = price_schedule
+        self.assertEqual((('MONICA', 0),), self.payroll.get_employees_payroll())
+        self.assertEqual(0, self.payroll.get_employee_salary('MONICA'))
+
+    def test_get_employees_payroll_rates_changed_while_pricing(self):
+        """a payroll is priced with the rates of a single point in time, salaries of older rates aren't kept"""
+        for name in ('MONICA', 'DIANE'):
+            self.payroll.add_employee_schedule(EmployeeSchedule(name=name, work_hours=self.work_hours))
+        price_schedule = self.payroll._price_schedule
+        wage = [WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=0, minute=0), amount=100)]
+
+        def change_rates_while_pricing(schedule, rate_table):
+            self.payroll._price_schedule = price_schedule
+            self.payroll.rates = [PayRate(day_range=DayRange(0, 6), hourly_wages=wage)]
+            return price_schedule(schedule, rate_table)
+
+        self.payroll._price_schedule = change_rates_while_pricing
+        self.assertEqual((('MONICA', 40), ('DIANE', 40)), self.payroll.get_employees_payroll())
+        self.assertEqual((('MONICA', 400), ('DIANE', 400)), self.payroll.get_employees_payroll())
+
+
+class TestPayrollRateSets(unittest.TestCase):
+    """Test employee groups paid with rate sets"""
+
+    def setUp(self) -> None:
+        everyday_wage = [WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=0, minute=0), amount=10)]
+        self.payroll = Payroll(rates=[PayRate(day_range=DayRange(0, 6), hourly_wages=everyday_wage)])
+
+        # 4 hours on monday and sunday
+        self.schedule = EmployeeSchedule(name='MONICA', work_hours=[
+            WeekdayWorkHours(weekday=0, time_start=time(hour=8, minute=0), time_end=time(hour=12, minute=00)),
+            WeekdayWorkHours(weekday=6, time_start=time(hour=8, minute=0), time_end=time(hour=12, minute=00)),
+        ])
+
+    @staticmethod
+    def flat_rates(amount: int) -> list[PayRate]:
+        wage = [WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=0, minute=0), amount=amount)]
+        return [PayRate(day_range=DayRange(0, 6), hourly_wages=wage)]
+
+    def test_group_rate_set(self):
+        """only employees of the group are paid with the rate set"""
+        self.payroll.add_rate_set(RateSet(rates=self.flat_rates(20), groups=['nurses']))
+        self.payroll.add_employee_schedule(self.schedule, group='nurses')
+        self.payroll.add_employee_schedule(EmployeeSchedule(name='PETER', work_hours=self.schedule.work_hours))
+
+        self.assertEqual((('MONICA', 160), ('PETER', 80)), self.payroll.get_employees_payroll())
+        self.assertEqual('nurses', self.payroll.get_employee_group('MONICA'))
+        self.assertEqual('default', self.payroll.get_employee_group('PETER'))
+
+    def test_group_rate_set_effective_dates(self):
+        """each day of the period is paid with the latest rate set effective that day"""
+        self.payroll.add_rate_set(RateSet(rates=self.flat_rates(20), groups=['nurses'],
+                                          effective_from=date(2026, 1, 1)))
+        self.payroll.add_rate_set(RateSet(rates=self.flat_rates(30), groups=['nurses'],
+                                          effective_from=date(2026, 1, 11), effective_to=date(2026, 1, 31)))
+        self.payroll.add_employee_schedule(self.schedule, group='nurses')
+
+        # rate sets with a date range don't apply without a period
+        self.assertEqual(80, self.payroll.get_employee_salary('MONICA'))
+
+        self.payroll.period_start = date(2026, 1, 5)
+        self.assertEqual(80 + 120, self.payroll.get_employee_salary('MONICA'))
+
+        self.payroll.period_start = date(2026, 2, 2)
+        self.assertEqual(160, self.payroll.get_employee_salary('MONICA'))
+
+        self.payroll.period_start = date(2025, 12, 29)
+        self.assertEqual(40 + 80, self.payroll.get_employee_salary('MONICA'))
+
+        self.assertRaises(ValueError, setattr, self.payroll, 'period_start', date(2026, 1, 6))
+
+    def test_group_rate_tables_shared(self):
+        """groups paid the same share their rate table"""
+        rate_set = RateSet(rates=self.flat_rates(20), groups=['nurses', 'doctors'])
+        self.payroll.add_rate_set(rate_set)
+
+        self.assertIs(self.payroll.get_rate_table('nurses'), self.payroll.get_rate_table('doctors'))
+        self.assertIs(self.payroll.rate_table, self.payroll.get_rate_table('janitors'))
+
+    def test_replace_employee_group(self):
+        """replacing a schedule keeps the employee group unless a new one is given"""
+        self.payroll.add_rate_set(RateSet(rates=self.flat_rates(20), groups=['nurses']))
+        self.payroll.add_employee_schedule(self.schedule, group='nurses')
+        self.payroll.replace_employee_schedule(self.schedule)
+        self.assertEqual(160, self.payroll.get_employee_salary('MONICA'))
+
+        self.payroll.replace_employee_schedule(self.schedule, group='default')
+        self.assertEqual(80, self.payroll.get_employee_salary('MONICA'))
+
+    def test_create_error(self):
+        """rate sets need a group, all 7 days and a valid date range"""
+        self.assertRaises(ValueError, RateSet, rates=self.flat_rates(20), groups=[])
+        self.assertRaises(ValueError, RateSet, rates=self.flat_rates(20), groups='nurses')
+        self.assertRaises(ValueError, RateSet, rates=self.flat_rates(20)[:0], groups=['nurses'])
+        self.assertRaises(ValueError, RateSet, rates=self.flat_rates(20), groups=['nurses'],
+                          effective_from=date(2026, 2, 1), effective_to=date(2026, 1, 1))
+
 
 class TestPayrollIncomplete(unittest.TestCase):
     def test_create_error_incomplete(self):
@@ -158,6 +439,26 @@ class TestWorkHoursCreation(unittest.TestCase):
 
         self.assertRaises(ValueError, WorkHours, time_start=time_start, time_end=time_end)
 
+    def test_create_minutes(self):
+        """times are stored as minutes of the day"""
+        work_hours = WorkHours(time_start=time(hour=9, minute=30), time_end=time(hour=0, minute=0))
+
+        self.assertEqual(570, work_hours.minute_start)
+        self.assertEqual(1439, work_hours.minute_end)
+        self.assertTrue(work_hours.minute_aligned)
+        self.assertFalse(hasattr(work_hours, '__dict__'))
+
+    def test_create_seconds(self):
+        """times with seconds precision are kept"""
+        time_start = time(hour=9, minute=30, second=15)
+        time_end = time(hour=12, minute=0)
+        work_hours = WorkHours(time_start=time_start, time_end=time_end)
+
+        self.assertEqual(570, work_hours.minute_start)
+        self.assertEqual(time_start, work_hours.time_start)
+        self.assertEqual(time_end, work_hours.time_end)
+        self.assertFalse(work_hours.minute_aligned)
+
 
 class TestWorkHoursWageCreation(unittest.TestCase):
     """tests workhours setup"""
@@ -219,6 +520,13 @@ class TestWeekdayWorkHours(unittest.TestCase):
 
         self.assertRaises(ValueError, WeekdayWorkHours, weekday=7, time_start=time_start, time_end=time_end)
 
+    def test_from_minutes(self):
+        """matches work hours created from times"""
+        work_hours = WeekdayWorkHours.from_minutes(weekday=1, minute_start=720, minute_end=1439)
+
+        self.assertEqual(WeekdayWorkHours(weekday=1, time_start=time(hour=12), time_end=time(hour=0)), work_hours)
+        self.assertTrue(work_hours.minute_aligned)
+
 
 class TestPayRateCreation(unittest.TestCase):
     """test payrate initialization"""
@@ -280,5 +588,112 @@ class TestWeekdayPayRates(unittest.TestCase):
         self.assertEqual(0, salary)
 
 
+class TestRateTable(unittest.TestCase):
+    """test compiled rates pricing"""
+
+    def setUp(self) -> None:
+        weekdays = DayRange(0, 4)
+        weekend = DayRange(5, 6)
+
+        weekdays_wage = [
+            WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=9, minute=0), amount=25),
+            WorkHoursWage(time_start=time(hour=9, minute=1), time_end=time(hour=9, minute=30), amount=40),
+            WorkHoursWage(time_start=time(hour=9, minute=31), time_end=time(hour=18, minute=0), amount=15),
+            WorkHoursWage(time_start=time(hour=18, minute=1), time_end=time(hour=0, minute=0), amount=20)
+        ]
+        weekend_wage = [
+            WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=16, minute=0), amount=25),
+            WorkHoursWage(time_start=time(hour=16, minute=1), time_end=time(hour=0, minute=0), amount=20),
+        ]
+
+        self.rates = [
+            PayRate(day_range=weekdays, hourly_wages=weekdays_wage),
+            PayRate(day_range=weekend, hourly_wages=weekend_wage)
+        ]
+        self.rate_table = RateTable(self.rates)
+
+    def test_calculate_salary_matches_pay_rates(self):
+        """compiled pricing matches pay rates on every weekday"""
+        minutes = list(range(0, 24 * 60, 13)) + [1, 540, 541, 570, 571, 1080, 1081, 1439]
+        for weekday in (0, 5):
+            for minute_start in minutes:
+                for minute_end in minutes:
+                    if minute_end != 0 and minute_end < minute_start:
+                        continue
+                    schedule = WeekdayWorkHours(
+                        weekday=weekday,
+                        time_start=time(hour=minute_start // 60, minute=minute_start % 60),
+                        time_end=time(hour=minute_end // 60, minute=minute_end % 60)
+                    )
+                    expected = sum(rate.calculate_salary(schedule) for rate in self.rates)
+                    self.assertEqual(expected, self.rate_table.calculate_salary(schedule), schedule)
+
+    def test_calculate_salary_seconds(self):
+        """shifts with seconds are priced by the pay rates"""
+        schedule = WeekdayWorkHours(weekday=1, time_start=time(hour=8, minute=0, second=30),
+                                    time_end=time(hour=10, minute=0, second=15))
+        expected = sum(rate.calculate_salary(schedule) for rate in self.rates)
+        self.assertEqual(expected, self.rate_table.calculate_salary(schedule))
+
+
+class TestShiftPriceCache(unittest.TestCase):
+    """test memoized shift pricing"""
+
+    def setUp(self) -> None:
+        everyday_wage = [
+            WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=12, minute=0), amount=10),
+            WorkHoursWage(time_start=time(hour=12, minute=1), time_end=time(hour=0, minute=0), amount=20),
+        ]
+        self.rate_table = RateTable([PayRate(day_range=DayRange(0, 6), hourly_wages=everyday_wage)])
+        self.shift_cache = ShiftPriceCache(maxsize=2)
+
+    def test_calculate_salary(self):
+        """identical shifts are priced once"""
+        for _ in range(3):
+            schedule = WeekdayWorkHours(weekday=0, time_start=time(hour=10), time_end=time(hour=14))
+            self.assertEqual(60, self.shift_cache.calculate_salary(self.rate_table, schedule))
+
+        self.assertEqual((2, 1, 0), (self.shift_cache.hits, self.shift_cache.misses, self.shift_cache.evictions))
+
+    def test_calculate_salary_rate_tables(self):
+        """prices are kept per rate table"""
+        schedule = WeekdayWorkHours(weekday=0, time_start=time(hour=10), time_end=time(hour=14))
+        other_wage = [WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=0, minute=0), amount=1)]
+        other_rate_table = RateTable([PayRate(day_range=DayRange(0, 6), hourly_wages=other_wage)])
+
+        self.assertEqual(60, self.shift_cache.calculate_salary(self.rate_table, schedule))
+        self.assertEqual(4, self.shift_cache.calculate_salary(other_rate_table, schedule))
+        self.assertEqual(2, self.shift_cache.misses)
+
+    def test_calculate_salary_eviction(self):
+        """least recently used prices are evicted"""
+        schedules = [
+            WeekdayWorkHours(weekday=weekday, time_start=time(hour=10), time_end=time(hour=14)) for weekday in range(3)
+        ]
+        self.shift_cache.calculate_salary(self.rate_table, schedules[0])
+        self.shift_cache.calculate_salary(self.rate_table, schedules[1])
+        self.shift_cache.calculate_salary(self.rate_table, schedules[0])
+        self.shift_cache.calculate_salary(self.rate_table, schedules[2])
+
+        self.assertEqual(2, len(self.shift_cache))
+        self.assertEqual(1, self.shift_cache.evictions)
+        self.shift_cache.calculate_salary(self.rate_table, schedules[0])
+        self.assertEqual(2, self.shift_cache.hits)
+
+        self.shift_cache.clear()
+        self.assertEqual((0, 0, 0, 0), (len(self.shift_cache), self.shift_cache.hits, self.shift_cache.misses,
+                                        self.shift_cache.evictions))
+
+    def test_payroll_shift_cache(self):
+        """payroll prices shifts through the cache"""
+        payroll = Payroll(rates=list(self.rate_table.rates), shift_cache=self.shift_cache)
+        work_hours = [
+            WeekdayWorkHours(weekday=weekday, time_start=time(hour=10), time_end=time(hour=14)) for weekday in range(2)
+        ]
+
+        self.assertEqual(120, payroll.calculate_salary(EmployeeSchedule(name='MONICA', work_hours=work_hours)))
+        self.assertEqual(2, self.shift_cache.misses)
+
+
 if __name__ == '__main__':
     unittest.main()
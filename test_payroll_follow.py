@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+
+from acme_payroll import RejectLog
+from payroll_follow import PayrollFollower, follow
+
+
+class TestPayrollFollower(unittest.TestCase):
+    """test following an appended schedules file"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.data_dir, 'schedules.txt')
+        self.follower = PayrollFollower(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def append(self, data: str):
+        with open(self.filename, 'a') as data_file:
+            data_file.write(data)
+
+    def test_poll_appended_lines(self):
+        """only lines appended since the last poll get priced"""
+        self.assertEqual([], self.follower.poll())
+
+        self.append('TOM=WE08:00-15:00\nGEORGE=MO18:00-22:00\n')
+        self.assertEqual([('TOM', 115), ('GEORGE', 80)], self.follower.poll())
+        self.assertEqual([], self.follower.poll())
+
+        self.append('TOM=WE08:00-16:00\r\nANNA=SA10:00-12:00\n')
+        self.assertEqual([('TOM', 130), ('ANNA', 40)], self.follower.poll())
+        self.assertEqual((('TOM', 130), ('GEORGE', 80), ('ANNA', 40)), self.follower.payroll.get_employees_payroll())
+
+    def test_poll_partial_line(self):
+        """a line still being written waits for its line break"""
+        self.append('TOM=WE08:00-15:00\nGEORGE=MO18:')
+        self.assertEqual([('TOM', 115)], self.follower.poll())
+
+        self.append('00-22:00\n')
+        self.assertEqual([('GEORGE', 80)], self.follower.poll())
+
+    def test_poll_truncated(self):
+        """a truncated file starts over"""
+        self.append('TOM=WE08:00-15:00\nGEORGE=MO18:00-22:00\n')
+        self.follower.poll()
+
+        with open(self.filename, 'w') as data_file:
+            data_file.write('ANNA=SA10:00-12:00\n')
+
+        self.assertEqual([('ANNA', 40)], self.follower.poll())
+        self.assertEqual((('ANNA', 40),), self.follower.payroll.get_employees_payroll())
+
+    def test_poll_rotated(self):
+        """a file replaced by a new one starts over, a missing file waits"""
+        self.append('TOM=WE08:00-15:00\n')
+        self.follower.poll()
+
+        os.rename(self.filename, self.filename + '.1')
+        self.assertEqual([], self.follower.poll())
+
+        self.append('TOM=WE08:00-09:00\nANNA=SA10:00-12:00\n')
+        self.assertEqual([('TOM', 25), ('ANNA', 40)], self.follower.poll())
+        self.assertEqual((('TOM', 25), ('ANNA', 40)), self.follower.payroll.get_employees_payroll())
+
+    def test_poll_rejects(self):
+        """malformed lines raise with their line number, unless rejected"""
+        self.append('TOM=WE08:00-15:00\nKEVIN=XX10:00-11:00\n')
+        # the lines before a malformed one are applied and reported, the next polls keep raising at that line
+        self.assertEqual([('TOM', 115)], self.follower.poll())
+        for _ in range(2):
+            with self.assertRaisesRegex(ValueError, '^line 2: '):
+                self.follower.poll()
+        self.assertEqual((('TOM', 115),), self.follower.payroll.get_employees_payroll())
+
+        rejects = RejectLog(StringIO())
+        follower = PayrollFollower(self.filename, rejects=rejects)
+        self.append('ANNA=SA10:00-12:00\n')
+
+        self.assertEqual([('TOM', 115), ('ANNA', 40)], follower.poll())
+        self.assertEqual(2, json.loads(rejects.output.getvalue())['line'])
+
+    def test_follow(self):
+        """writes the header once, then every update"""
+        self.append('TOM=WE08:00-15:00\n')
+        output = StringIO()
+
+        follow(self.follower, output, output_format='csv', interval=0, max_polls=2)
+
+        self.assertEqual('name,salary\nTOM,115\n', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
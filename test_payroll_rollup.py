@@ -0,0 +1,75 @@
+import json
+import unittest
+from datetime import time
+from io import StringIO
+
+from acme_payroll import parse_employee_schedule, set_up_payroll
+from benchmarks.workload import generate_schedule_lines
+from payroll import EmployeeSchedule, WeekdayWorkHours, PayRate, DayRange, WorkHoursWage, RateSet
+from payroll_rollup import rollup_payroll
+
+
+class TestPayrollRollup(unittest.TestCase):
+    """test hours and pay rollups"""
+
+    def setUp(self):
+        self.payroll = set_up_payroll()
+        # 08:00-09:00 at 25, 09:01-12:00 at 15 on monday, 20:00-00:00 at 25 on sunday
+        self.payroll.add_employee_schedule(parse_employee_schedule('TOM=MO08:00-12:00,SU20:00-00:00'))
+        # 10:00-12:00 at 20 on saturday
+        self.payroll.add_employee_schedule(parse_employee_schedule('ANNA=SA10:00-12:00'))
+
+    def test_totals(self):
+        rollup = rollup_payroll(self.payroll)
+
+        self.assertEqual([('TOM', 8, 170), ('ANNA', 2, 40)], rollup.totals_by_employee())
+        self.assertEqual((10, 210), (rollup.total_hours, rollup.total_pay))
+        self.assertEqual((4, 70), rollup.totals_by_weekday()[0])
+        self.assertEqual((2, 40), rollup.totals_by_weekday()[5])
+        self.assertEqual((0, 0), rollup.totals_by_weekday()[1])
+
+    def test_totals_by_band(self):
+        """every band of the rate table, worked or not"""
+        totals = rollup_payroll(self.payroll).totals_by_band()
+
+        self.assertEqual(21, len(totals))
+        weekday, hourly_wage, hours, pay = totals[1]
+        self.assertEqual((0, time(hour=9, minute=1), 3, 45), (weekday, hourly_wage.time_start, hours, pay))
+
+    def test_matches_payroll(self):
+        """pay matches the salaries, for groups and shifts with seconds precision"""
+        for data_line in generate_schedule_lines(100, shifts=9, midnight_share=0.3):
+            self.payroll.add_employee_schedule(parse_employee_schedule(data_line))
+        wage = [WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=0, minute=0), amount=7)]
+        self.payroll.add_rate_set(RateSet(rates=[PayRate(day_range=DayRange(0, 6), hourly_wages=wage)],
+                                          groups=['nurses']))
+        self.payroll.add_employee_schedule(parse_employee_schedule('NURSE=MO08:00-12:00'), group='nurses')
+        self.payroll.add_employee_schedule(EmployeeSchedule(name='SECONDS', work_hours=[
+            WeekdayWorkHours(weekday=0, time_start=time(hour=8, second=30), time_end=time(hour=12)),
+        ]))
+
+        rollup = rollup_payroll(self.payroll)
+
+        self.assertEqual(list(self.payroll.get_employees_payroll()),
+                         [(name, pay) for name, _, pay in rollup.totals_by_employee()])
+
+    def test_write(self):
+        rollup = rollup_payroll(self.payroll)
+
+        output = StringIO()
+        rollup.write(output, 'csv')
+        lines = output.getvalue().splitlines()
+        self.assertEqual('name,weekday,band_start,band_end,amount,hours,pay', lines[0])
+        self.assertEqual('TOM,MO,00:00,09:00,25,1,25', lines[1])
+        self.assertEqual(5, len(lines))
+
+        output = StringIO()
+        rollup.write(output, 'jsonl')
+        self.assertEqual({'name': 'ANNA', 'weekday': 'SA', 'band_start': '09:01', 'band_end': '18:00', 'amount': 20,
+                          'hours': 2, 'pay': 40}, json.loads(output.getvalue().splitlines()[-1]))
+
+        self.assertRaises(ValueError, rollup.write, output, 'xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
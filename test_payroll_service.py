@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from payroll_service import PayrollService
+
+
+class TestPayrollService(unittest.IsolatedAsyncioTestCase):
+    """test payroll service"""
+
+    async def asyncSetUp(self):
+        self.service = PayrollService(batch_size=4)
+        self.server = await self.service.start_server()
+        self.host, self.port = self.server.sockets[0].getsockname()[:2]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.service.close()
+
+    async def request(self, data_lines: list[bytes]) -> list[dict]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(b''.join(data_lines))
+        writer.write_eof()
+
+        responses = [json.loads(response) async for response in reader]
+        writer.close()
+        await writer.wait_closed()
+        return responses
+
+    async def test_price(self):
+        """prices a line"""
+        self.assertEqual(('RENE', 215), await self.service.price(
+            b'RENE=MO10:00-12:00,TU10:00-12:00,TH01:00-03:00,SA14:00-18:00,SU20:00-21:00\n'
+        ))
+
+    async def test_price_error(self):
+        """invalid lines raise ValueError"""
+        with self.assertRaises(ValueError):
+            await self.service.price(b'JOSEPH=MO08:00-16:00TU09:00-18:00')
+
+    async def test_handle_client(self):
+        """answers each line in order, reporting errors"""
+        responses = await self.request([
+            b'ASTRID=MO10:00-12:00,TH12:00-14:00,SU20:00-21:00\n',
+            b'\n',
+            b'KEVIN=XX10:00-11:00\r\n',
+            b'ASTRID=MO10:00-12:00',
+        ])
+
+        self.assertEqual([
+            {'name': 'ASTRID', 'salary': 85},
+            {'error': "Error when trying to parse KEVIN's schedule - Invalid day input: XX"},
+            {'name': 'ASTRID', 'salary': 30},
+        ], responses)
+
+    async def test_handle_clients_concurrently(self):
+        """concurrent clients get their own answers"""
+        clients = [
+            [f'EMPLOYEE{client}_{line}=MO10:00-1{line}:00\n'.encode() for line in range(9)] for client in range(5)
+        ]
+
+        responses = await asyncio.gather(*(self.request(data_lines) for data_lines in clients))
+
+        for client, client_responses in enumerate(responses):
+            self.assertEqual([f'EMPLOYEE{client}_{line}' for line in range(9)],
+                             [response['name'] for response in client_responses])
+            self.assertEqual([line * 15 for line in range(9)],
+                             [response['salary'] for response in client_responses])
+
+    @unittest.skipUnless(hasattr(asyncio, 'start_unix_server'), 'unix sockets not available')
+    async def test_unix_socket(self):
+        """serves over a unix socket"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'payroll.sock')
+            server = await self.service.start_server(path=path)
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+                writer.write(b'ASTRID=MO10:00-12:00\n')
+                self.assertEqual({'name': 'ASTRID', 'salary': 30}, json.loads(await reader.readline()))
+                writer.close()
+                await writer.wait_closed()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+    async def test_handle_client_backpressure(self):
+        """a client not taking its answers stops being read, and gets every answer once it does"""
+        service = PayrollService(batch_size=4, max_pending_responses=2, drain_every=1)
+        reader = asyncio.StreamReader()
+        for line in range(10):
+            reader.feed_data(f'EMPLOYEE{line}=MO10:00-12:00\n'.encode())
+        reader.feed_eof()
+        writer = BlockedWriter()
+
+        handler = asyncio.create_task(service.handle_client(reader, writer))
+        for _ in range(20):
+            await asyncio.sleep(0)
+        self.assertFalse(reader.at_eof())
+        self.assertEqual(1, len(writer.lines))
+
+        writer.unblocked.set()
+        await handler
+        await service.close()
+        self.assertEqual([f'EMPLOYEE{line}' for line in range(10)],
+                         [json.loads(line)['name'] for line in writer.lines])
+        self.assertRaises(ValueError, PayrollService, max_pending_responses=0)
+
+
+class BlockedWriter:
+    """stream writer of a client that doesn't take its answers until unblocked"""
+
+    def __init__(self):
+        self.lines: list[bytes] = []
+        self.unblocked = asyncio.Event()
+
+    def write(self, data: bytes):
+        self.lines.append(data)
+
+    async def drain(self):
+        await self.unblocked.wait()
+
+    def is_closing(self) -> bool:
+        return False
+
+    def close(self):
+        pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from acme_payroll import iter_employees_schedules_cached, iter_employees_schedules_from_mmap
+from schedule_cache import SourceKey, cache_filename, read_schedules_cache
+
+DATA_LINES = 'TOM=WE08:00-15:00,TH01:00-03:00,SA09:00-12:00\nGEORGE=MO18:00-22:00,FR18:00-00:00,SU16:00-00:00\n'
+
+
+class TestScheduleCache(unittest.TestCase):
+    """test parsed schedules cache"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.cache_dir, 'schedules.txt')
+        self.write_data(DATA_LINES)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def write_data(self, data_lines: str, mtime_ns: int = 10 ** 18):
+        with open(self.filename, 'w') as data_file:
+            data_file.write(data_lines)
+        os.utime(self.filename, ns=(mtime_ns, mtime_ns))
+
+    def load(self, verify_hash: bool = False) -> list[tuple]:
+        schedules = iter_employees_schedules_cached(self.filename, 2, self.cache_dir, verify_hash=verify_hash)
+        return [(schedule.name, schedule.work_hours) for schedule in schedules]
+
+    def cached(self, verify_hash: bool = False) -> bool:
+        key = SourceKey(self.filename, verify_hash)
+        return read_schedules_cache(cache_filename(self.filename, self.cache_dir), key) is not None
+
+    def test_cache(self):
+        """cached schedules match the parsed ones"""
+        expected = [(schedule.name, schedule.work_hours)
+                    for schedule in iter_employees_schedules_from_mmap(self.filename, 2)]
+
+        self.assertFalse(self.cached())
+        self.assertEqual(expected, self.load())
+        self.assertTrue(self.cached())
+        self.assertEqual(expected, self.load())
+
+    def test_cache_stale(self):
+        """a changed file gets parsed again"""
+        self.load()
+        self.write_data(DATA_LINES.replace('TOM', 'TIM'), mtime_ns=2 * 10 ** 18)
+
+        self.assertFalse(self.cached())
+        self.assertEqual(['TIM', 'GEORGE'], [name for name, _ in self.load()])
+
+    def test_cache_verify_hash(self):
+        """with hashes, touching the file keeps the cache but changing contents doesn't"""
+        self.load(verify_hash=True)
+
+        os.utime(self.filename, ns=(2 * 10 ** 18, 2 * 10 ** 18))
+        self.assertTrue(self.cached(verify_hash=True))
+
+        self.write_data(DATA_LINES.replace('TOM', 'TIM'))
+        self.assertFalse(self.cached(verify_hash=True))
+
+    def test_cache_corrupt(self):
+        """a truncated cache gets parsed again"""
+        self.load()
+        cache_file = cache_filename(self.filename, self.cache_dir)
+        with open(cache_file, 'r+b') as data_file:
+            data_file.truncate(os.path.getsize(cache_file) - 1)
+
+        self.assertFalse(self.cached())
+        self.assertEqual(['TOM', 'GEORGE'], [name for name, _ in self.load()])
+
+    def test_cache_error_not_written(self):
+        """files failing to parse aren't cached"""
+        self.write_data(DATA_LINES + 'KEVIN=XX10:00-11:00\n')
+
+        self.assertRaises(ValueError, self.load)
+        self.assertFalse(self.cached())
+
+    def test_cache_error_not_enough_data(self):
+        """cached schedules are checked against min_lines"""
+        self.load()
+
+        schedules = iter_employees_schedules_cached(self.filename, 3, self.cache_dir)
+        self.assertRaises(ValueError, next, schedules)
+
+
+    def test_cache_write_fails(self):
+        """a cache directory that can't be written to only skips caching"""
+        cache_dir = os.path.join(self.cache_dir, 'not_a_directory')
+        with open(cache_dir, 'w'):
+            pass
+
+        schedules = iter_employees_schedules_cached(self.filename, 2, cache_dir)
+
+        self.assertEqual(['TOM', 'GEORGE'], [schedule.name for schedule in schedules])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import time
+from io import StringIO
+
+from acme_payroll import parse_employee_schedule, set_up_payroll
+from benchmarks.workload import generate_schedule_lines
+from payroll import DayRange, EmployeeSchedule, PayRate, RateSet, WeekdayWorkHours, WorkHoursWage
+from schedule_store import ScheduleStore, main
+
+
+class TestScheduleStore(unittest.TestCase):
+    """test storing rosters and pricing them from the stored shifts"""
+
+    def setUp(self):
+        self.store = ScheduleStore(':memory:', batch_size=7)
+        self.schedules = [parse_employee_schedule(data_line)
+                          for data_line in generate_schedule_lines(50, shifts=5, midnight_share=0.3)]
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_save_and_reload(self):
+        """schedules come back in load order, with the same shifts"""
+        roster_id = self.store.save_roster('week 1', self.schedules)
+
+        reloaded = list(self.store.iter_schedules(roster_id))
+
+        self.assertEqual([schedule.name for schedule in self.schedules], [schedule.name for schedule, _ in reloaded])
+        self.assertEqual(
+            [[(wh.weekday, wh.time_start, wh.time_end) for wh in schedule.work_hours] for schedule in self.schedules],
+            [[(wh.weekday, wh.time_start, wh.time_end) for wh in schedule.work_hours] for schedule, _ in reloaded]
+        )
+        self.assertEqual({'default'}, {group for _, group in reloaded})
+
+    def test_empty_schedule(self):
+        """an employee without shifts doesn't take the next employee shifts"""
+        schedules = [EmployeeSchedule('NOBODY', []), parse_employee_schedule('TOM=WE08:00-15:00')]
+        roster_id = self.store.save_roster('week 1', schedules)
+
+        self.assertEqual([0, 1], [len(schedule.work_hours) for schedule, _ in self.store.iter_schedules(roster_id)])
+        self.assertEqual([('NOBODY', 0), ('TOM', 115)], self.store.price_roster(roster_id))
+
+    def test_price_roster(self):
+        """salaries priced from the stored shifts match the payroll, and get stored"""
+        payroll = set_up_payroll()
+        for schedule in self.schedules:
+            payroll.add_employee_schedule(schedule)
+        roster_id = self.store.save_roster('week 1', self.schedules)
+
+        for backend in ('array', None):
+            self.assertEqual(list(payroll.get_employees_payroll()), self.store.price_roster(roster_id, backend=backend))
+        self.assertEqual(list(payroll.get_employees_payroll()), self.store.get_salaries(roster_id))
+
+    def test_save_payroll(self):
+        """groups and salaries get stored, reloading into a payroll prices the same"""
+        payroll = set_up_payroll()
+        wage = [WorkHoursWage(time_start=time(hour=0, minute=1), time_end=time(hour=0, minute=0), amount=7)]
+        payroll.add_rate_set(RateSet(rates=[PayRate(day_range=DayRange(0, 6), hourly_wages=wage)], groups=['nurses']))
+        payroll.add_employee_schedule(parse_employee_schedule('TOM=MO08:00-12:00'))
+        payroll.add_employee_schedule(parse_employee_schedule('NURSE=MO08:00-12:00'), group='nurses')
+
+        roster_id = self.store.save_payroll('week 1', payroll)
+
+        self.assertEqual([('TOM', 70), ('NURSE', 28)], self.store.get_salaries(roster_id))
+        self.assertEqual([('TOM', 70), ('NURSE', 28)], self.store.price_roster(roster_id, payroll))
+        reloaded = self.store.load_payroll(roster_id, payroll=set_up_payroll())
+        self.assertEqual('nurses', reloaded.get_employee_group('NURSE'))
+
+    def test_history(self):
+        """salaries of an employee across rosters, unpriced rosters have no salary"""
+        first = self.store.save_roster('week 1', [parse_employee_schedule('TOM=WE08:00-15:00')])
+        self.store.save_roster('week 2', [parse_employee_schedule('TOM=WE08:00-16:00')])
+        self.store.price_roster(first)
+
+        history = self.store.get_employee_history('TOM')
+
+        self.assertEqual([('week 1', 115), ('week 2', None)], [(name, salary) for name, _, salary in history])
+        self.assertEqual([(first, 'week 1', 1), (first + 1, 'week 2', 1)],
+                         [roster[:2] + roster[3:] for roster in self.store.get_rosters()])
+
+    def test_invalid(self):
+        """duplicates and seconds leave no roster behind, unknown rosters raise"""
+        schedules = [parse_employee_schedule('TOM=WE08:00-15:00'), parse_employee_schedule('TOM=WE08:00-16:00')]
+        self.assertRaises(ValueError, self.store.save_roster, 'week 1', schedules)
+
+        seconds = EmployeeSchedule('SECONDS', [WeekdayWorkHours(0, time(hour=8, second=30), time(hour=12))])
+        self.assertRaises(ValueError, self.store.save_roster, 'week 1', [seconds])
+
+        self.assertEqual([], self.store.get_rosters())
+        self.assertRaises(ValueError, self.store.price_roster, 1)
+
+
+class TestScheduleStoreMain(unittest.TestCase):
+    """test the store command line"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.database = os.path.join(self.data_dir, 'payroll.sqlite')
+        self.filename = os.path.join(self.data_dir, 'schedules.txt')
+        with open(self.filename, 'w') as data_file:
+            data_file.write('TOM=WE08:00-15:00\nGEORGE=MO18:00-22:00\nANNA=SA10:00-12:00\nKEVIN=SU10:00-11:00\n'
+                            'MARY=TH20:00-00:00\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def run_main(self, *args: str) -> str:
+        output = StringIO()
+        with redirect_stdout(output):
+            main([self.database, *args])
+        return output.getvalue()
+
+    def test_main(self):
+        output = self.run_main('load', self.filename).splitlines()
+        self.assertEqual(['Loaded roster 1', 'The amount to pay TOM is: 115 USD'], output[:2])
+        self.assertEqual(output[1:], self.run_main('payroll', '1').splitlines())
+
+        self.assertTrue(self.run_main('rosters').endswith(', 5 employees\n'))
+        self.assertTrue(self.run_main('history', 'TOM').endswith(': 115 USD\n'))
+        self.assertEqual('Error while loading the input data; roster 2 not found in store\n',
+                         self.run_main('payroll', '2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from acme_payroll import WEEKDAYS, parse_employee_schedule
+from benchmarks.workload import generate_schedule_lines
+
+
+class TestWorkload(unittest.TestCase):
+    """test the synthetic schedules generator"""
+
+    def test_generate_schedule_lines(self):
+        """every line parses into the requested shifts, for any amount of shifts"""
+        for shifts in (1, 5, 7, 9, 20):
+            schedules = [parse_employee_schedule(data_line)
+                         for data_line in generate_schedule_lines(50, shifts=shifts, midnight_share=0.5)]
+
+            self.assertEqual([shifts] * 50, [len(schedule.work_hours) for schedule in schedules])
+
+    def test_midnight_share(self):
+        """the share applies to every shift, days with more than one shift included"""
+        work_periods = [work_period for data_line in generate_schedule_lines(2000, shifts=9, midnight_share=0.1)
+                        for work_period in data_line.split('=')[1].split(',')]
+        midnight = [work_period for work_period in work_periods if work_period.endswith('-00:00')]
+
+        self.assertAlmostEqual(0.1, len(midnight) / len(work_periods), delta=0.01)
+        self.assertEqual(set(WEEKDAYS), {work_period[:2] for work_period in midnight})
+
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, list, generate_schedule_lines(1, shifts=0))
+        self.assertRaises(ValueError, list, generate_schedule_lines(1, shifts=7 * 721))
+        self.assertRaises(ValueError, list, generate_schedule_lines(1, midnight_share=1.5))
+
+
+if __name__ == '__main__':
+    unittest.main()